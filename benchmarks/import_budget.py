@@ -0,0 +1,91 @@
+"""
+Orçamento de tempo de inicialização das linhas de comando.
+
+Executa cada comando com '--help' sob 'python -X importtime' e soma o tempo
+cumulativo dos imports de primeiro nível. O processo termina com código 1
+quando algum comando passa do orçamento ou carrega um módulo pesado (pandas,
+numpy, pymongo, ...), que só deve ser importado pelo comando que o usa.
+
+Uso (a partir da raiz do repositório):
+    python benchmarks/import_budget.py
+    python benchmarks/import_budget.py --budget-ms 150 --repeat 5
+
+A mesma verificação roda nos testes ('tests/test_import_budget.py', via './climate test').
+"""
+import argparse
+import os
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+DEFAULT_BUDGET_MS = 250
+# Módulos que nenhum '--help' deve importar
+FORBIDDEN_MODULES = ("pandas", "numpy", "pymongo", "bson", "gspread", "gspread_dataframe", "pyarrow",
+                     "sklearn", "requests")
+
+# Nome -> (pasta de execução, argumentos do Python)
+COMMANDS: Dict[str, Tuple[str, List[str]]] = {
+    "climate": (REPO_ROOT, ["-m", "common.cli", "--help"]),
+    "ingest": (os.path.join(REPO_ROOT, "data"), ["main.py", "--help"]),
+    "analyze": (os.path.join(REPO_ROOT, "pipelines"), ["main.py", "--help"]),
+    "export": (os.path.join(REPO_ROOT, "pipelines"), ["export_to_gsheets.py", "--help"]),
+    "run": (REPO_ROOT, ["-m", "common.orchestration", "--help"]),
+}
+
+
+def measure(cwd: str, args: List[str]) -> Tuple[float, List[str]]:
+    """Tempo (ms) dos imports de primeiro nível e a lista de todos os módulos importados."""
+    # Variável vazia: o '--help' não pode depender da configuração do MongoDB (validada só ao conectar)
+    env = {**os.environ, "MONGO_CONNECTION_STRING": ""}
+    completed = subprocess.run([sys.executable, "-X", "importtime", *args], cwd=cwd, env=env,
+                               capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else "falhou")
+
+    total_us, modules = 0, []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        modules.append(name.strip())
+        # Linha: 'import time: <próprio> | <cumulativo> | <nome>'; os imports aninhados têm o nome recuado
+        if not name.startswith("  "):
+            total_us += int(cumulative)
+    return total_us / 1000, modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verifica o tempo de inicialização das linhas de comando.")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS,
+                        help=f"Tempo máximo de imports por comando, em ms (padrão: {DEFAULT_BUDGET_MS}).")
+    parser.add_argument("--repeat", type=int, default=3, help="Execuções por comando (vale a menor).")
+    args = parser.parse_args()
+
+    failures = []
+    print(f"{'comando':<12}{'imports (ms)':>14}  módulos pesados")
+    for name, (cwd, command) in COMMANDS.items():
+        try:
+            runs = [measure(cwd, command) for _ in range(max(1, args.repeat))]
+        except RuntimeError as e:
+            failures.append(f"{name}: falhou ({e})")
+            print(f"{name:<12}{'ERRO':>14}")
+            continue
+        elapsed = min(ms for ms, _ in runs)
+        heavy = sorted(set(runs[0][1]).intersection(FORBIDDEN_MODULES))
+        print(f"{name:<12}{elapsed:>14.1f}  {', '.join(heavy) or '-'}")
+        if elapsed > args.budget_ms:
+            failures.append(f"{name}: {elapsed:.1f} ms > {args.budget_ms:.0f} ms")
+        if heavy:
+            failures.append(f"{name}: importa {', '.join(heavy)}")
+
+    if failures:
+        print(f"\n❌ Inicialização fora do orçamento ({len(failures)} problemas):")
+        for failure in failures:
+            print(f"  - {failure}")
+        sys.exit(1)
+    print(f"\n✅ Todos os comandos abaixo de {args.budget_ms:.0f} ms, sem módulos pesados.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""
+Suíte de benchmarks de ponta a ponta (ETL, MongoDB/Parquet e análise).
+
+Cada etapa roda em um processo próprio, para que o pico de memória (RSS) medido
+seja só dela. O resultado (tempo, linhas/s e pico de RSS por etapa) é salvo em
+JSON e comparado com uma linha de base: etapas mais lentas (ou com mais
+memória) que a base além do limite configurado são apontadas como regressão e
+o processo termina com código 1.
+
+Uso (a partir da raiz do repositório):
+    pip install -r benchmarks/requirements.txt
+    python benchmarks/run.py --days 3650 --locations 100
+    python benchmarks/run.py --stages metrics_engine,grouped_metrics --threshold 0.15
+    python benchmarks/run.py --mongo-uri mongodb://localhost:27017 --mongo-rows 0
+    python benchmarks/run.py --update-baseline
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baseline.json")
+DEFAULT_OUTPUT = os.path.join(BENCH_DIR, "results", "latest.json")
+# Abaixo deste tempo (s) o ruído de medição domina e o tempo não é comparado com a base
+MIN_COMPARABLE_SECONDS = 0.05
+
+
+def peak_rss_mb() -> float | None:
+    """Pico de memória residente do processo atual, em MB (None fora de sistemas Unix)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa KB; macOS, bytes
+    return peak / 1024 ** 2 if sys.platform == "darwin" else peak / 1024
+
+
+def run_child(stage_name: str, params: dict):
+    """Executado no processo filho: prepara a etapa, mede e imprime o resultado em JSON."""
+    from stages import STAGES, use_package
+
+    package, stage_func = STAGES[stage_name]
+    use_package(package)
+    rows, work = stage_func(params)
+    setup_rss = peak_rss_mb()
+
+    start = time.perf_counter()
+    work()
+    wall = time.perf_counter() - start
+
+    print(json.dumps({
+        "rows": rows,
+        "wall_s": round(wall, 4),
+        "rows_per_s": round(rows / wall, 1) if wall > 0 else None,
+        "setup_peak_rss_mb": round(setup_rss, 1) if setup_rss is not None else None,
+        "peak_rss_mb": round(peak_rss_mb(), 1) if setup_rss is not None else None,
+    }))
+
+
+def run_stage(stage_name: str, params: dict) -> dict:
+    command = [sys.executable, os.path.abspath(__file__), "--child", stage_name, "--params", json.dumps(params)]
+    completed = subprocess.run(command, capture_output=True, text=True)
+    if completed.returncode != 0:
+        return {"error": completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else "falhou"}
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=BENCH_DIR, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """Lista as regressões: tempo ou pico de RSS acima de (1 + threshold) x a base, nos mesmos parâmetros."""
+    if baseline.get("params") != results["params"]:
+        print("⚠️ A linha de base foi medida com outros parâmetros; a comparação é apenas indicativa.")
+    regressions = []
+    for name, current in results["stages"].items():
+        base = baseline.get("stages", {}).get(name)
+        if not base or "error" in base or "error" in current:
+            continue
+        for metric in ("wall_s", "peak_rss_mb"):
+            if metric == "wall_s" and max(base.get(metric) or 0, current.get(metric) or 0) < MIN_COMPARABLE_SECONDS:
+                continue
+            if base.get(metric) and current.get(metric) and current[metric] > base[metric] * (1 + threshold):
+                regressions.append(f"{name}.{metric}: {base[metric]} -> {current[metric]} "
+                                   f"(+{(current[metric] / base[metric] - 1) * 100:.0f}%)")
+    return regressions
+
+
+def print_table(results: dict, baseline: dict | None):
+    print(f"\n{'etapa':<38}{'linhas':>12}{'tempo (s)':>12}{'linhas/s':>14}{'pico (MB)':>12}{'vs. base':>10}")
+    for name, result in results["stages"].items():
+        if "error" in result:
+            print(f"{name:<38}  ERRO: {result['error']}")
+            continue
+        base = (baseline or {}).get("stages", {}).get(name, {})
+        delta = f"{(result['wall_s'] / base['wall_s'] - 1) * 100:+.0f}%" if base.get("wall_s") else "-"
+        print(f"{name:<38}{result['rows']:>12,}{result['wall_s']:>12.3f}{result['rows_per_s'] or 0:>14,.0f}"
+              f"{result['peak_rss_mb'] or 0:>12,.1f}{delta:>10}")
+
+
+def main():
+    from stages import STAGES
+
+    parser = argparse.ArgumentParser(description="Benchmarks de ponta a ponta do ETL e do pipeline de análise.")
+    parser.add_argument("--days", type=int, default=3650, help="Dias por localidade.")
+    parser.add_argument("--locations", type=int, default=20, help="Número de localidades.")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--stages", help=f"Etapas separadas por vírgula (padrão: todas). Disponíveis: {', '.join(STAGES)}.")
+    parser.add_argument("--mongo-uri", help="Usa um mongod real em vez do mongomock.")
+    parser.add_argument("--mongo-rows", type=int, default=200_000,
+                        help="Limite de linhas nas etapas do MongoDB (0 = sem limite).")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="Arquivo JSON com os resultados.")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Arquivo JSON da linha de base.")
+    parser.add_argument("--threshold", type=float, default=0.20, help="Piora tolerada em relação à base (0.20 = 20%%).")
+    parser.add_argument("--update-baseline", action="store_true", help="Grava os resultados como nova linha de base.")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--params", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, json.loads(args.params))
+        return
+
+    names = [name.strip() for name in args.stages.split(",")] if args.stages else list(STAGES)
+    unknown = [name for name in names if name not in STAGES]
+    if unknown:
+        parser.error(f"Etapas desconhecidas: {', '.join(unknown)}")
+
+    params = {"days": args.days, "locations": args.locations, "seed": args.seed,
+              "mongo_uri": args.mongo_uri, "mongo_rows": args.mongo_rows or None}
+    print(f"Benchmarks com {args.days:,} dias x {args.locations:,} localidades "
+          f"({args.days * args.locations:,} linhas)...")
+
+    results = {
+        "params": params,
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "stages": {},
+    }
+    for name in names:
+        print(f"  - {name}...", flush=True)
+        results["stages"][name] = run_stage(name, params)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+
+    baseline = None
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_table(results, baseline)
+    print(f"\nResultados salvos em '{args.output}'.")
+
+    if args.update_baseline:
+        # Uma execução parcial (--stages) com os mesmos parâmetros só substitui as
+        # etapas medidas; as demais entradas da linha de base são preservadas.
+        updated = results
+        if baseline is not None and baseline.get("params") == params:
+            updated = {**results, "stages": {**baseline.get("stages", {}), **results["stages"]}}
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(updated, f, indent=2)
+        print(f"Linha de base atualizada em '{args.baseline}'.")
+        return
+
+    if baseline is None:
+        print("Nenhuma linha de base encontrada (use --update-baseline para criá-la).")
+        return
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f"\n❌ {len(regressions)} regressões acima de {args.threshold:.0%}:")
+        for regression in regressions:
+            print(f"  - {regression}")
+        sys.exit(1)
+    print(f"\n✅ Nenhuma regressão acima de {args.threshold:.0%} em relação à linha de base.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Verificação de escala linear de uma etapa da suíte de benchmarks.
+
+Executa a etapa (em processos separados, como 'run.py') com o número de
+localidades multiplicado por cada fator e ajusta, em escala log-log, o expoente
+de tempo ~ linhas^k. O processo termina com código 1 quando o expoente passa do
+limite (custo mais que linear no número de linhas).
+
+Uso (a partir da raiz do repositório):
+    python benchmarks/scaling.py --stage rolling_metrics
+    python benchmarks/scaling.py --stage grouped_metrics --days 1825 --factors 1,2,4 --max-exponent 1.2
+"""
+import argparse
+import sys
+
+import numpy as np
+
+from run import run_stage
+from stages import STAGES
+
+DEFAULT_FACTORS = "1,2,4,8"
+# Expoente máximo aceito: acima de 1 por ruído de medição e efeitos de cache
+DEFAULT_MAX_EXPONENT = 1.15
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verifica se o tempo de uma etapa cresce linearmente com as linhas.")
+    parser.add_argument("--stage", default="rolling_metrics", help=f"Etapa medida. Disponíveis: {', '.join(STAGES)}.")
+    parser.add_argument("--days", type=int, default=3650, help="Dias por localidade.")
+    parser.add_argument("--locations", type=int, default=10, help="Localidades no menor tamanho.")
+    parser.add_argument("--factors", default=DEFAULT_FACTORS, help="Multiplicadores do número de localidades.")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--max-exponent", type=float, default=DEFAULT_MAX_EXPONENT)
+    args = parser.parse_args()
+    if args.stage not in STAGES:
+        parser.error(f"Etapa desconhecida: {args.stage}")
+
+    rows, seconds = [], []
+    print(f"{'linhas':>12}{'tempo (s)':>12}{'linhas/s':>14}")
+    for factor in (int(value) for value in args.factors.split(",")):
+        params = {"days": args.days, "locations": args.locations * factor, "seed": args.seed,
+                  "mongo_uri": None, "mongo_rows": None}
+        result = run_stage(args.stage, params)
+        if "error" in result:
+            print(f"❌ {args.stage} falhou com {params['locations']} localidades: {result['error']}")
+            sys.exit(1)
+        rows.append(result["rows"])
+        seconds.append(result["wall_s"])
+        print(f"{result['rows']:>12,}{result['wall_s']:>12.3f}{result['rows_per_s'] or 0:>14,.0f}")
+
+    exponent = np.polyfit(np.log(rows), np.log(seconds), 1)[0]
+    if exponent > args.max_exponent:
+        print(f"\n❌ '{args.stage}' cresce como linhas^{exponent:.2f} (limite: {args.max_exponent:.2f}).")
+        sys.exit(1)
+    print(f"\n✅ '{args.stage}' cresce como linhas^{exponent:.2f} (limite: {args.max_exponent:.2f}).")
+
+
+if __name__ == "__main__":
+    main()
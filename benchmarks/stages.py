@@ -0,0 +1,221 @@
+"""
+Etapas medidas pela suíte de benchmarks.
+
+Cada etapa prepara seus dados (fora da medição) e devolve o número de linhas
+processadas e uma função sem argumentos com o trabalho a medir. As etapas são
+executadas em processos separados; 'use_package' coloca no sys.path o pacote
+('data' ou 'pipelines') de que a etapa depende, já que os dois têm um pacote
+'src' próprio.
+"""
+import contextlib
+import io
+import os
+import sys
+import tempfile
+from typing import Callable, Dict, Tuple
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+# O upsert do mongomock percorre a coleção a cada operação (custo quadrático);
+# sem um mongod real, a etapa de upsert usa no máximo estas linhas.
+MOCK_UPSERT_ROWS = 2_000
+
+Stage = Callable[[dict], Tuple[int, Callable[[], object]]]
+STAGES: Dict[str, Tuple[str, Stage]] = {}
+
+
+def use_package(package: str):
+    """Torna importável o 'src' de 'data' ou 'pipelines' (e o pacote 'common' da raiz)."""
+    os.environ.setdefault("MONGO_CONNECTION_STRING", "mongodb://localhost:27017")
+    sys.path.insert(0, os.path.join(REPO_ROOT, package))
+    if REPO_ROOT not in sys.path:
+        sys.path.append(REPO_ROOT)
+
+
+def stage(name: str, package: str):
+    def register(func: Stage) -> Stage:
+        STAGES[name] = (package, func)
+        return func
+    return register
+
+
+def quiet(func: Callable[[], object]) -> Callable[[], object]:
+    """Descarta os prints das funções medidas."""
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()):
+            return func()
+    return run
+
+
+def _input_frame(params: dict, rows_limit: int | None = None):
+    from synthetic import make_input_frame
+    days, locations = params["days"], params["locations"]
+    if rows_limit and days * locations > rows_limit:
+        locations = max(1, rows_limit // days)
+    return make_input_frame(days, locations, params["seed"])
+
+
+def _mongo_handler(params: dict):
+    from common.database import MongoHandler
+    if params.get("mongo_uri"):
+        return MongoHandler(params["mongo_uri"], "benchmarks")
+    import mongomock
+    return MongoHandler("mongomock://", "benchmarks", client=mongomock.MongoClient())
+
+
+def _input_schema() -> dict:
+    from src.config import INPUT_SCHEMA
+    return {**INPUT_SCHEMA, "localidade": "category"}
+
+
+# --- ETL (pacote 'data') ---
+@stage("transform_daily_data", "data")
+def transform_daily_data_stage(params: dict):
+    from synthetic import make_payloads
+    from src.processing.data_transformer import transform_daily_data
+    payloads = make_payloads(params["days"], params["locations"], params["seed"])
+    return params["days"] * params["locations"], quiet(
+        lambda: [transform_daily_data(payload, location_key=key) for key, payload in payloads]
+    )
+
+
+@stage("transform_daily_batch", "data")
+def transform_daily_batch_stage(params: dict):
+    from synthetic import make_payloads
+    from src.processing.data_transformer import transform_daily_batch
+    payloads = make_payloads(params["days"], params["locations"], params["seed"])
+    return params["days"] * params["locations"], quiet(lambda: transform_daily_batch(payloads))
+
+
+@stage("hourly_to_buckets", "data")
+def hourly_to_buckets_stage(params: dict):
+    """Tabela horária -> um registro por (localidade, dia) com arrays de 24 horas (linhas = horas)."""
+    from synthetic import make_hourly_frame
+    from src.processing.resampling import hourly_to_buckets
+    df = make_hourly_frame(params["days"], params["locations"], params["seed"])
+    return len(df), lambda: hourly_to_buckets(df)
+
+
+@stage("buckets_to_daily", "pipelines")
+def buckets_to_daily_stage(params: dict):
+    """Blocos horários (como lidos do armazenamento) -> colunas diárias das métricas (linhas = horas)."""
+    from synthetic import make_hourly_frame
+    from src.processing.resampling import buckets_to_daily, hourly_to_buckets
+    buckets = hourly_to_buckets(make_hourly_frame(params["days"], params["locations"], params["seed"]))
+    return len(buckets) * 24, lambda: buckets_to_daily(buckets)
+
+
+# --- MongoDB e Parquet (pacote 'common') ---
+@stage("mongo_overwrite", "pipelines")
+def mongo_overwrite_stage(params: dict):
+    df = _input_frame(params, params["mongo_rows"])
+    handler = _mongo_handler(params).__enter__()
+    return len(df), quiet(lambda: handler.overwrite_collection("bench_input", df))
+
+
+@stage("mongo_upsert", "pipelines")
+def mongo_upsert_stage(params: dict):
+    rows_limit = params["mongo_rows"]
+    if not params.get("mongo_uri"):
+        rows_limit = min(rows_limit or MOCK_UPSERT_ROWS, MOCK_UPSERT_ROWS)
+    df = _input_frame(params, rows_limit)
+    handler = _mongo_handler(params).__enter__()
+    quiet(lambda: handler.overwrite_collection("bench_input", df))()
+    handler.ensure_unique_index("bench_input", ["localidade", "dia"])
+    return len(df), quiet(lambda: handler.upsert_collection("bench_input", df, ["localidade", "dia"]))
+
+
+@stage("mongo_load_dataframe", "pipelines")
+def mongo_load_dataframe_stage(params: dict):
+    df = _input_frame(params, params["mongo_rows"])
+    handler = _mongo_handler(params).__enter__()
+    quiet(lambda: handler.overwrite_collection("bench_input", df))()
+    schema = _input_schema()
+    return len(df), quiet(lambda: handler.load_dataframe("bench_input", schema))
+
+
+@stage("parquet_write", "pipelines")
+def parquet_write_stage(params: dict):
+    from common.storage import ParquetStore
+    df = _input_frame(params)
+    store = ParquetStore(tempfile.mkdtemp(prefix="bench_parquet_")).__enter__()
+    return len(df), quiet(lambda: store.overwrite_collection("bench_input", df))
+
+
+@stage("parquet_load_dataframe", "pipelines")
+def parquet_load_dataframe_stage(params: dict):
+    from common.storage import ParquetStore
+    df = _input_frame(params)
+    store = ParquetStore(tempfile.mkdtemp(prefix="bench_parquet_")).__enter__()
+    quiet(lambda: store.overwrite_collection("bench_input", df))()
+    schema = _input_schema()
+    return len(df), quiet(lambda: store.load_dataframe("bench_input", schema))
+
+
+# --- Análise (pacote 'pipelines') ---
+def _materialize_stage(function_name: str):
+    def run_stage(params: dict):
+        from src.processing import data_materialize
+        df = _input_frame(params).drop(columns="localidade")
+        func = getattr(data_materialize, function_name)
+        return len(df), quiet(lambda: func(df))
+    return run_stage
+
+
+for _name in ("calculate_descriptive_stats", "calculate_correlation_matrix",
+              "calculate_weather_code_probabilities", "forecast_temperature"):
+    stage(_name, "pipelines")(_materialize_stage(_name))
+
+
+@stage("metrics_engine", "pipelines")
+def metrics_engine_stage(params: dict):
+    from src.processing.data_materialize import ClimateMetricsEngine
+    df = _input_frame(params).drop(columns="localidade")
+    return len(df), quiet(lambda: ClimateMetricsEngine(df).compute_all(days_to_predict=7))
+
+
+@stage("grouped_metrics", "pipelines")
+def grouped_metrics_stage(params: dict):
+    from src.processing.grouped_metrics import compute_grouped_metrics
+    df = _input_frame(params)
+    return len(df), quiet(lambda: compute_grouped_metrics(df, ["localidade"], period="month", max_workers=1))
+
+
+@stage("rolling_metrics", "pipelines")
+def rolling_metrics_stage(params: dict):
+    """Normal climatológica, janelas móveis, anomalias e eventos extremos por localidade e mês."""
+    from src.processing.grouped_metrics import PERIOD_COLUMN, add_period_column
+    from src.processing.rolling_metrics import (
+        Climatology,
+        extreme_events,
+        rolling_statistics,
+        temperature_anomalies,
+    )
+    df = add_period_column(_input_frame(params), "month")
+    series, groups = ["localidade"], ["localidade", PERIOD_COLUMN]
+
+    def run():
+        climatology = Climatology.build(df, series)
+        return (rolling_statistics(df, series, groups), temperature_anomalies(df, series, groups, climatology),
+                extreme_events(df, series, groups, climatology))
+    return len(df), run
+
+
+@stage("metrics_serialization", "pipelines")
+def metrics_serialization_stage(params: dict):
+    """Documentos de métricas do pipeline (pipelines/main.py) até o BSON enviado ao MongoDB."""
+    import bson
+    import pandas as pd
+    from common.database.mongo_handler import _iter_record_chunks
+    from main import build_metric_documents
+    from src.processing.data_materialize import ClimateMetricsEngine
+    from src.processing.grouped_metrics import compute_grouped_metrics
+
+    df = _input_frame(params)
+    grouped_docs = quiet(lambda: compute_grouped_metrics(df, ["localidade"], period="month", max_workers=1))()
+
+    def serialize():
+        frame = pd.DataFrame(grouped_docs)
+        return sum(len(bson.encode(record)) for chunk in _iter_record_chunks(frame, 10_000) for record in chunk)
+
+    metrics = quiet(lambda: ClimateMetricsEngine(df.drop(columns="localidade")).compute_all())()
+    return len(grouped_docs), lambda: (build_metric_documents(metrics), serialize())
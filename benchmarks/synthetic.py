@@ -0,0 +1,99 @@
+"""
+Geradores de dados sintéticos no formato da API Open-Meteo e da coleção de
+entrada do pipeline, vetorizados para chegar a dezenas de milhões de linhas.
+"""
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+START_DAY = date(1990, 1, 1)
+WEATHER_CODES = np.array([0, 1, 2, 3, 51, 61, 63, 80, 95], dtype=np.int16)
+DAILY_UNITS = {
+    "time": "iso8601", "weathercode": "wmo code", "temperature_2m_max": "°C",
+    "temperature_2m_min": "°C", "relative_humidity_2m_mean": "%", "uv_index_max": ""
+}
+
+
+def _measurements(rng: np.random.Generator, day_of_year: np.ndarray) -> dict[str, np.ndarray]:
+    n = len(day_of_year)
+    season = np.cos(2 * np.pi * (day_of_year - 15) / 365.25)
+    t_max = np.round(28 + 4 * season + rng.normal(0, 1.5, n), 1)
+    return {
+        "codigo_clima": rng.choice(WEATHER_CODES, n),
+        "temperatura_max_c": t_max,
+        "temperatura_min_c": np.round(t_max - 9 - rng.random(n) * 3, 1),
+        "umidade_media_percent": np.round(np.clip(65 + 15 * season + rng.normal(0, 8, n), 10, 100)),
+        "indice_uv_max": np.round(np.clip(9 + 3 * season + rng.normal(0, 1, n), 0, None), 2),
+    }
+
+
+def make_payloads(days: int, locations: int, seed: int = 42) -> list[tuple[str, dict]]:
+    """Gera uma resposta da API (listas JSON) por localidade, cada uma com 'days' dias."""
+    rng = np.random.default_rng(seed)
+    calendar = np.datetime64(START_DAY) + np.arange(days)
+    time_strings = np.datetime_as_string(calendar, unit="D").tolist()
+    day_of_year = (calendar - calendar.astype("datetime64[Y]")).astype(int)
+
+    payloads = []
+    for i in range(locations):
+        values = _measurements(rng, day_of_year)
+        payloads.append((f"loc{i:05d}", {
+            "latitude": -20.0 - i * 0.01, "longitude": -47.0, "timezone": "America/Sao_Paulo",
+            "daily_units": DAILY_UNITS,
+            "daily": {
+                "time": time_strings,
+                "weathercode": values["codigo_clima"].tolist(),
+                "temperature_2m_max": values["temperatura_max_c"].tolist(),
+                "temperature_2m_min": values["temperatura_min_c"].tolist(),
+                "relative_humidity_2m_mean": values["umidade_media_percent"].tolist(),
+                "uv_index_max": values["indice_uv_max"].tolist(),
+            },
+        }))
+    return payloads
+
+
+def make_input_frame(days: int, locations: int, seed: int = 42, missing_rate: float = 0.02) -> pd.DataFrame:
+    """Gera a tabela de entrada do pipeline ('localidade' + colunas de INPUT_SCHEMA), com alguns nulos."""
+    rng = np.random.default_rng(seed)
+    rows = days * locations
+    day_index = np.tile(np.arange(days), locations)
+    calendar = np.datetime64(START_DAY, "ns") + day_index.astype("timedelta64[D]")
+    values = _measurements(rng, day_index % 365)
+
+    df = pd.DataFrame({
+        "localidade": pd.Categorical.from_codes(
+            np.repeat(np.arange(locations), days), [f"loc{i:05d}" for i in range(locations)]
+        ),
+        "dia": calendar,
+        "codigo_clima": pd.array(values.pop("codigo_clima"), dtype="Int64"),
+        **values,
+    })
+    for col in ["temperatura_max_c", "temperatura_min_c", "umidade_media_percent", "indice_uv_max"]:
+        df.loc[rng.random(rows) < missing_rate, col] = np.nan
+    return df
+
+
+def make_hourly_frame(days: int, locations: int, seed: int = 42, missing_rate: float = 0.02) -> pd.DataFrame:
+    """Gera a tabela horária ('localidade', 'hora' e as variáveis dos blocos horários), 24 linhas por dia."""
+    rng = np.random.default_rng(seed)
+    rows = days * locations * 24
+    hour_index = np.tile(np.arange(days * 24), locations)
+    hours = np.datetime64(START_DAY, "s") + hour_index.astype("timedelta64[h]")
+    season = np.cos(2 * np.pi * ((hour_index // 24) % 365 - 15) / 365.25)
+    cycle = -np.cos(2 * np.pi * (hour_index % 24 - 5) / 24)
+    sun = np.clip(np.sin(np.pi * (hour_index % 24 - 6) / 12), 0, None)
+
+    df = pd.DataFrame({
+        "localidade": pd.Categorical.from_codes(
+            np.repeat(np.arange(locations), days * 24), [f"loc{i:05d}" for i in range(locations)]
+        ),
+        "hora": hours,
+        "codigo_clima": pd.array(rng.choice(WEATHER_CODES, rows), dtype="Int16"),
+        "temperatura_c": np.round(23 + 3 * season + 5 * cycle + rng.normal(0, 1, rows), 1).astype(np.float32),
+        "umidade_percent": np.round(np.clip(65 + 15 * season - 20 * cycle, 10, 100)).astype(np.float32),
+        "indice_uv": np.round((9 + 3 * season) * sun, 2).astype(np.float32),
+    })
+    for col in ["temperatura_c", "umidade_percent", "indice_uv"]:
+        df.loc[rng.random(rows) < missing_rate, col] = np.nan
+    return df
@@ -0,0 +1 @@
+"""Código compartilhado entre os pacotes 'data' (ETL) e 'pipelines' (análise)."""
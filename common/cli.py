@@ -0,0 +1,69 @@
+"""
+Linha de comando única do projeto.
+
+Uso (a partir de qualquer pasta):
+    ./climate ingest --locations locations.json
+    ./climate analyze --group-by localidade --period month
+    ./climate export --mode diff
+    ./climate bench --stages metrics_engine
+    ./climate run --export diff
+    ./climate test -k sheets
+    python -m common.cli analyze --help
+
+Cada subcomando executa o script do pacote correspondente como se fosse
+chamado diretamente (mesmos argumentos e o 'src' do pacote no sys.path). Este
+módulo usa apenas a biblioteca padrão: o pandas, os drivers e os clientes HTTP
+só são carregados pelo subcomando que precisa deles.
+"""
+import os
+import runpy
+import sys
+from typing import List
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# Subcomando -> (pasta do script, script ou módulo, descrição)
+COMMANDS = {
+    "ingest": ("data", "main.py", "ETL da API Open-Meteo para o MongoDB ou Parquet (data/main.py)."),
+    "analyze": ("pipelines", "main.py", "Cálculo e publicação das métricas climáticas (pipelines/main.py)."),
+    "export": ("pipelines", "export_to_gsheets.py", "Exportação das métricas para o Google Sheets."),
+    "bench": ("benchmarks", "run.py", "Benchmarks de ponta a ponta com comparação à linha de base."),
+    "run": (None, "common.orchestration", "Fluxo completo como DAG com checkpoints (ETL, análise e exportação)."),
+    "test": (None, "common.testing", "Testes de cada pacote, um processo 'pytest' por suíte."),
+}
+
+
+def usage() -> str:
+    lines = ["uso: climate <comando> [opções]", "", "comandos:"]
+    lines += [f"  {name:<10}{description}" for name, (_, _, description) in COMMANDS.items()]
+    lines += ["", "Use 'climate <comando> --help' para ver as opções de cada comando."]
+    return "\n".join(lines)
+
+
+def main(argv: List[str] | None = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] in ("-h", "--help"):
+        print(usage())
+        return 0 if argv else 2
+    command, args = argv[0], argv[1:]
+    if command not in COMMANDS:
+        print(f"climate: comando desconhecido '{command}'.\n\n{usage()}", file=sys.stderr)
+        return 2
+
+    folder, target, _ = COMMANDS[command]
+    if REPO_ROOT not in sys.path:
+        sys.path.insert(0, REPO_ROOT)
+    if folder is None:
+        sys.argv = [f"climate {command}", *args]
+        runpy.run_module(target, run_name="__main__")
+    else:
+        # Mesmos sys.path e sys.argv de 'python <script>': a pasta do script primeiro (com o seu 'src')
+        script = os.path.join(REPO_ROOT, folder, target)
+        sys.path.insert(0, os.path.dirname(script))
+        sys.argv = [script, *args]
+        runpy.run_path(script, run_name="__main__")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
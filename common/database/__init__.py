@@ -0,0 +1,4 @@
+from common.database.client import close_client, get_client, set_client
+from common.database.mongo_handler import MongoHandler
+
+__all__ = ["MongoHandler", "close_client", "get_client", "set_client"]
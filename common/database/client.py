@@ -0,0 +1,126 @@
+import atexit
+import importlib.util
+import os
+import threading
+from typing import Any, Dict
+
+from pymongo import MongoClient, monitoring
+from pymongo.errors import ConnectionFailure
+
+from common.instrumentation import count
+
+# Compressores de rede na ordem de preferência, com o módulo Python de que cada um depende
+COMPRESSOR_MODULES = {"zstd": "zstandard", "snappy": "snappy", "zlib": "zlib"}
+
+_lock = threading.Lock()
+_clients: Dict[str, MongoClient] = {}
+_injected: MongoClient | None = None
+_owner_pid = os.getpid()
+
+
+class MongoCommandCounter(monitoring.CommandListener):
+    """Conta os comandos enviados ao MongoDB (por nome), falhas e o tempo gasto no servidor (ver common.instrumentation)."""
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        count(f"mongo.commands.{event.command_name}")
+        count("mongo.duration_s", event.duration_micros / 1e6)
+
+    def failed(self, event):
+        count(f"mongo.commands.{event.command_name}")
+        count("mongo.failures")
+        count("mongo.duration_s", event.duration_micros / 1e6)
+
+
+MONGO_COMMAND_COUNTER = MongoCommandCounter()
+
+
+def available_compressors(requested: str) -> list[str]:
+    """Filtra a lista de compressores ('zstd,snappy,zlib') pelos que estão instalados."""
+    names = [name.strip() for name in requested.split(",") if name.strip()]
+    return [
+        name for name in names
+        if name in COMPRESSOR_MODULES and importlib.util.find_spec(COMPRESSOR_MODULES[name]) is not None
+    ]
+
+
+def client_options() -> Dict[str, Any]:
+    """
+    Opções do MongoClient lidas das variáveis de ambiente.
+
+    MONGO_MAX_POOL_SIZE, MONGO_MIN_POOL_SIZE, MONGO_SERVER_SELECTION_TIMEOUT_MS,
+    MONGO_CONNECT_TIMEOUT_MS, MONGO_SOCKET_TIMEOUT_MS, MONGO_WRITE_CONCERN
+    ('1', 'majority', ...), MONGO_WRITE_JOURNAL e MONGO_COMPRESSORS.
+    """
+    write_concern = os.getenv("MONGO_WRITE_CONCERN", "1")
+    options: Dict[str, Any] = {
+        "maxPoolSize": int(os.getenv("MONGO_MAX_POOL_SIZE", "50")),
+        "minPoolSize": int(os.getenv("MONGO_MIN_POOL_SIZE", "0")),
+        "serverSelectionTimeoutMS": int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "10000")),
+        "connectTimeoutMS": int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "10000")),
+        "socketTimeoutMS": int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "0")) or None,
+        "w": int(write_concern) if write_concern.isdigit() else write_concern,
+        # Contagem de comandos por etapa (common.instrumentation)
+        "event_listeners": [MONGO_COMMAND_COUNTER],
+    }
+    if os.getenv("MONGO_WRITE_JOURNAL"):
+        options["journal"] = os.getenv("MONGO_WRITE_JOURNAL").lower() in ("1", "true", "yes")
+    compressors = available_compressors(os.getenv("MONGO_COMPRESSORS", "zstd,snappy,zlib"))
+    if compressors:
+        options["compressors"] = ",".join(compressors)
+    return options
+
+
+def get_client(connection_string: str) -> MongoClient:
+    """
+    Retorna o MongoClient compartilhado do processo para a string de conexão.
+
+    O cliente (e seu pool de conexões) é criado na primeira chamada e
+    reaproveitado por todas as etapas seguintes, evitando um novo handshake
+    TCP/TLS e uma nova seleção de servidor a cada etapa. Após um fork, o
+    processo filho cria o seu próprio cliente. A string de conexão só é
+    validada aqui, no primeiro uso.
+    """
+    global _owner_pid
+    if _injected is not None:
+        return _injected
+    if not connection_string:
+        raise ValueError("A variável de ambiente MONGO_CONNECTION_STRING não foi definida. Crie um arquivo .env.")
+
+    with _lock:
+        if _owner_pid != os.getpid():
+            # Clientes herdados do processo pai não podem ser usados (nem fechados) no filho
+            _clients.clear()
+            _owner_pid = os.getpid()
+
+        client = _clients.get(connection_string)
+        if client is None:
+            try:
+                client = MongoClient(connection_string, **client_options())
+            except ConnectionFailure as e:
+                print(f"Erro de conexão com o MongoDB: {e}")
+                raise
+            _clients[connection_string] = client
+            print("Conexão com MongoDB estabelecida com sucesso!")
+        return client
+
+
+def set_client(client: MongoClient | None):
+    """Injeta um cliente usado por todo o processo (ex.: mongomock.MongoClient()); None remove a injeção."""
+    global _injected
+    _injected = client
+
+
+def close_client():
+    """Fecha os clientes criados por este processo (chamado automaticamente na saída)."""
+    with _lock:
+        if _owner_pid == os.getpid():
+            for client in _clients.values():
+                client.close()
+            if _clients:
+                print("Conexão com MongoDB fechada.")
+        _clients.clear()
+
+
+atexit.register(close_client)
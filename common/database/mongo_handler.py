@@ -0,0 +1,474 @@
+from datetime import datetime, timezone
+from typing import Dict, Any, Iterator, List
+import uuid
+
+from pymongo import MongoClient, ASCENDING, DESCENDING, UpdateOne
+from pymongo.errors import OperationFailure
+import numpy as np
+import pandas as pd
+
+from common.database.client import get_client
+
+try:  # Caminho opcional via Arrow, usado quando o pymongoarrow estiver instalado
+    import pyarrow as pa
+    from pymongoarrow.api import Schema as ArrowSchema, find_pandas_all
+except ImportError:
+    find_pandas_all = None
+
+
+# Registros convertidos e enviados ao MongoDB por vez
+WRITE_CHUNK_SIZE = 10_000
+# Sufixo das coleções temporárias usadas na substituição atômica
+STAGING_SUFFIX = "__staging_"
+# Versão e horário da última gravação de cada coleção (upsert ou substituição),
+# usados como impressão digital barata do conteúdo (ver 'collection_fingerprint')
+VERSIONS_COLLECTION = "_collection_versions"
+
+
+def _bson_ready(chunk: pd.DataFrame) -> pd.DataFrame:
+    """
+    Ajusta as colunas de um bloco para tipos que o BSON representa.
+
+    Colunas float32 viram float64 pelo menor texto decimal do float32 (23.4
+    continua 23.4, e não 23.399999618530273). Nulos de colunas anuláveis
+    (pd.NA) e NaN/NaT viram None.
+    """
+    converted = {}
+    for col in chunk.columns:
+        series = chunk[col]
+        if series.dtype == np.float32:
+            series = pd.Series(series.to_numpy().astype(str).astype(np.float64), index=series.index)
+        if series.hasnans:
+            series = series.astype(object).where(series.notna(), None)
+        converted[col] = series
+    return pd.DataFrame(converted, index=chunk.index)
+
+
+def _iter_record_chunks(df: pd.DataFrame, chunk_size: int) -> Iterator[List[Dict[str, Any]]]:
+    """Converte o DataFrame em listas de registros de até 'chunk_size' itens, bloco a bloco."""
+    for start in range(0, len(df), chunk_size):
+        yield _bson_ready(df.iloc[start:start + chunk_size]).to_dict('records')
+
+
+class MongoHandler:
+    """Gerenciador de conexão e operações com MongoDB."""
+    def __init__(self, connection_string, db_name, client: MongoClient | None = None):
+        self._connection_string = connection_string
+        self._db_name = db_name
+        self._client = client
+        self.client = None
+        self.db = None
+
+    def __enter__(self):
+        """
+        Método para entrar no contexto 'with', usando o cliente compartilhado do processo.
+
+        A conexão não é refeita a cada contexto: todos os handlers reaproveitam o
+        pool de 'common.database.client' (ou o cliente informado no construtor).
+        """
+        self.client = self._client or get_client(self._connection_string)
+        self.db = self.client[self._db_name]
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """Método para sair do contexto 'with'. O pool é fechado apenas na saída do processo."""
+        self.db = None
+
+    def overwrite_collection(self, collection_name: str, df: pd.DataFrame,
+                             chunk_size: int = WRITE_CHUNK_SIZE, atomic: bool = True):
+        """
+        Substitui todos os dados de uma coleção pelos registros de um DataFrame.
+
+        Os registros são convertidos e gravados em blocos de 'chunk_size'
+        (insert_many com ordered=False). Com 'atomic', a gravação é feita em uma
+        coleção temporária, que recebe os índices da coleção original e depois
+        a substitui com 'renameCollection' (dropTarget=True): leitores nunca
+        veem a coleção vazia ou pela metade.
+        """
+        if df is None or df.empty:
+            print("DataFrame vazio. Nenhuma operação será realizada no MongoDB.")
+            return
+
+        target = self.db[collection_name]
+        try:
+            if not atomic:
+                delete_result = target.delete_many({})
+                print(f"{delete_result.deleted_count} documentos antigos removidos da coleção '{collection_name}'.")
+                inserted = self._insert_chunks(target, df, chunk_size)
+                self._touch(collection_name)
+                print(f"{inserted} novos documentos inseridos com sucesso!")
+                return
+
+            staging_name = f"{collection_name}{STAGING_SUFFIX}{uuid.uuid4().hex[:8]}"
+            try:
+                inserted = self._insert_chunks(self.db[staging_name], df, chunk_size)
+                self.promote_collection(staging_name, collection_name)
+            except Exception:
+                self.db[staging_name].drop()
+                raise
+            print(f"{inserted} documentos gravados e coleção '{collection_name}' substituída atomicamente.")
+
+        except OperationFailure as e:
+            print(f"Erro de operação no MongoDB: {e}")
+            raise
+
+    def promote_collection(self, staging_name: str, collection_name: str) -> bool:
+        """
+        Substitui a coleção pela coleção temporária 'staging_name', já gravada.
+
+        A temporária recebe os índices da coleção original e a substitui com
+        'renameCollection' (dropTarget=True). Se ela estiver vazia, nada é feito.
+
+        Returns:
+            bool: Se a coleção foi substituída.
+        """
+        staging = self.db[staging_name]
+        if staging.estimated_document_count() == 0:
+            print(f"Coleção temporária '{staging_name}' vazia: a coleção '{collection_name}' não foi substituída.")
+            return False
+        self._copy_indexes(self.db[collection_name], staging)
+        staging.rename(collection_name, dropTarget=True)
+        self._touch(collection_name)
+        return True
+
+    def drop_collection(self, collection_name: str):
+        """Remove a coleção, se ela existir."""
+        self.db[collection_name].drop()
+
+    def upsert_collection(self, collection_name: str, df: pd.DataFrame, keys: List[str],
+                          chunk_size: int = WRITE_CHUNK_SIZE):
+        """
+        Insere ou atualiza os registros de um DataFrame usando os campos 'keys' como chave.
+
+        As operações são enviadas em lotes de 'chunk_size' com bulk_write(ordered=False),
+        sem montar a lista completa de registros em memória.
+        """
+        if df is None or df.empty:
+            print("DataFrame vazio. Nenhuma operação será realizada no MongoDB.")
+            return
+
+        try:
+            collection = self.db[collection_name]
+            upserted, modified = 0, 0
+            for records in _iter_record_chunks(df, chunk_size):
+                operations = [
+                    UpdateOne({key: record[key] for key in keys}, {"$set": record}, upsert=True)
+                    for record in records
+                ]
+                result = collection.bulk_write(operations, ordered=False)
+                upserted += result.upserted_count
+                modified += result.modified_count
+            self._touch(collection_name)
+            print(f"{upserted} documentos inseridos e {modified} atualizados na coleção '{collection_name}'.")
+
+        except OperationFailure as e:
+            print(f"Erro de operação no MongoDB: {e}")
+            raise
+
+    def _touch(self, collection_name: str):
+        """Registra uma gravação na coleção (nova versão e horário)."""
+        self.db[VERSIONS_COLLECTION].update_one(
+            {"_id": collection_name},
+            {"$inc": {"version": 1}, "$set": {"updated_at": datetime.now(timezone.utc)}},
+            upsert=True
+        )
+
+    def collection_fingerprint(self, collection_name: str, field: str = "dia") -> Dict[str, Any]:
+        """
+        Impressão digital barata do conteúdo da coleção: total de documentos, maior 'field' e última gravação.
+
+        A versão e o horário vêm das gravações feitas por este handler
+        (upsert_collection / overwrite_collection), de qualquer processo.
+        """
+        version = self.db[VERSIONS_COLLECTION].find_one({"_id": collection_name}) or {}
+        return {
+            "count": self.db[collection_name].estimated_document_count(),
+            "latest": self.get_latest_value(collection_name, field),
+            "version": version.get("version", 0),
+            "updated_at": version.get("updated_at"),
+        }
+
+    # --- Gravações fora da ordem (backfill) ---
+    def mark_backfill(self, collection_name: str, first_day):
+        """
+        Registra que foram gravados dias a partir de 'first_day' fora da ordem (ex.: um bloco da fila de falhas).
+
+        Leitores incrementais, que só leem os dias depois da sua marca d'água,
+        usam o registro para saber que precisam refazer o estado (ver
+        'get_backfill'). Registros seguintes mantêm o dia mais antigo.
+        """
+        self.db[VERSIONS_COLLECTION].update_one(
+            {"_id": collection_name},
+            {"$min": {"backfill.first_day": pd.Timestamp(first_day).to_pydatetime()}, "$inc": {"backfill.marks": 1}},
+            upsert=True
+        )
+
+    def get_backfill(self, collection_name: str) -> Dict[str, Any] | None:
+        """Registro pendente de gravações fora da ordem ({'first_day', 'marks'}), ou None."""
+        version = self.db[VERSIONS_COLLECTION].find_one({"_id": collection_name}) or {}
+        return version.get("backfill")
+
+    def clear_backfill(self, collection_name: str, backfill: Dict[str, Any]):
+        """Apaga o registro lido em 'get_backfill', se nenhuma gravação fora da ordem tiver sido registrada depois."""
+        self.db[VERSIONS_COLLECTION].update_one(
+            {"_id": collection_name, "backfill.marks": backfill["marks"]}, {"$unset": {"backfill": ""}}
+        )
+
+    @staticmethod
+    def _insert_chunks(collection, df: pd.DataFrame, chunk_size: int) -> int:
+        inserted = 0
+        for records in _iter_record_chunks(df, chunk_size):
+            inserted += len(collection.insert_many(records, ordered=False).inserted_ids)
+        return inserted
+
+    @staticmethod
+    def _copy_indexes(source, destination):
+        """Recria na coleção de destino os índices (exceto _id) da coleção de origem."""
+        for index in source.list_indexes():
+            if index["name"] == "_id_":
+                continue
+            options = {key: value for key, value in index.items() if key not in ("key", "v", "ns")}
+            destination.create_index(list(index["key"].items()), **options)
+
+    def get_document(self, collection_name: str, query: Dict[str, Any]) -> Dict[str, Any] | None:
+        """Retorna o primeiro documento que atende à query, ou None."""
+        try:
+            return self.db[collection_name].find_one(query)
+        except OperationFailure as e:
+            print(f"Erro ao executar a query no MongoDB: {e}")
+            raise
+
+    def replace_document(self, collection_name: str, query: Dict[str, Any], document: Dict[str, Any]):
+        """Substitui (ou cria, se não existir) o documento que atende à query."""
+        try:
+            self.db[collection_name].replace_one(query, document, upsert=True)
+        except OperationFailure as e:
+            print(f"Erro de operação no MongoDB: {e}")
+            raise
+
+    def find_documents(self, collection_name: str, query: Dict[str, Any] = None,
+                       projection: Dict[str, Any] = None, sort: List[tuple] = None,
+                       limit: int = 0) -> List[Dict[str, Any]]:
+        """Retorna a lista de documentos que atendem à query (todos, se omitida), na ordem de 'sort'."""
+        try:
+            return list(self.db[collection_name].find(query or {}, projection=projection, sort=sort, limit=limit))
+        except OperationFailure as e:
+            print(f"Erro ao executar a query no MongoDB: {e}")
+            raise
+
+    def insert_documents(self, collection_name: str, documents: List[Dict[str, Any]],
+                         chunk_size: int = WRITE_CHUNK_SIZE) -> int:
+        """Insere os documentos em lotes de até 'chunk_size' e retorna quantos foram inseridos."""
+        collection = self.db[collection_name]
+        inserted = 0
+        try:
+            for start in range(0, len(documents), chunk_size):
+                result = collection.insert_many(documents[start:start + chunk_size], ordered=False)
+                inserted += len(result.inserted_ids)
+        except OperationFailure as e:
+            print(f"Erro de operação no MongoDB: {e}")
+            raise
+        return inserted
+
+    def delete_documents(self, collection_name: str, query: Dict[str, Any]) -> int:
+        """Remove os documentos que atendem à query e retorna quantos foram removidos."""
+        try:
+            return self.db[collection_name].delete_many(query).deleted_count
+        except OperationFailure as e:
+            print(f"Erro de operação no MongoDB: {e}")
+            raise
+
+    def find_all(self, collection_name: str, query: Dict[str, Any] = None) -> pd.DataFrame:
+        """
+        Executa uma query em uma coleção e retorna todos os documentos encontrados.
+
+        Args:
+            collection_name (str): O nome da coleção para consultar.
+            query (dict, optional): O filtro da query do MongoDB. 
+                                    Se for None ou omitido, retorna todos os documentos. 
+                                    Defaults to None.
+
+        Returns:
+            pd.DataFrame: Os documentos encontrados. Retorna um DataFrame vazio se nada for encontrado.
+        """
+        if query is None:
+            query = {}  # Um dicionário vazio em find() retorna todos os documentos
+
+        try:
+            collection = self.db[collection_name]
+            documents = list(collection.find(query))
+            print(f"Encontrados {len(documents)} documentos na coleção '{collection_name}' com a query: {query}")
+            
+            if documents:
+                df = pd.DataFrame(documents)
+                return df
+            else:
+                print("Nenhum documento encontrado para a query.")
+    
+        except OperationFailure as e:
+            print(f"Erro ao executar a query no MongoDB: {e}")
+            raise
+        return pd.DataFrame()
+
+    def load_dataframe(self, collection_name: str, schema: Dict[str, str], query: Dict[str, Any] = None,
+                       batch_size: int = 10_000, use_arrow: bool = True) -> pd.DataFrame:
+        """
+        Carrega uma coleção em um DataFrame tipado, lendo o cursor em lotes.
+
+        Apenas os campos do 'schema' são transferidos (projeção sem '_id'). Os
+        valores de cada lote são copiados diretamente para colunas NumPy
+        pré-alocadas, sem montar a lista completa de documentos em memória.
+
+        Args:
+            collection_name (str): O nome da coleção para consultar.
+            schema (dict): Mapeamento coluna -> dtype (ex.: {'dia': 'datetime64[ns]'}).
+                           Colunas inteiras com valores nulos devem usar um dtype
+                           anulável ('Int64') ou de ponto flutuante. Colunas 'object'
+                           recebem o valor de cada documento como está (ex.: arrays).
+            query (dict, optional): O filtro da query do MongoDB. Defaults to None.
+            batch_size (int, optional): Documentos por lote do cursor. Defaults to 10_000.
+            use_arrow (bool, optional): Usa o pymongoarrow, se instalado. Defaults to True.
+
+        Returns:
+            pd.DataFrame: DataFrame com as colunas e dtypes do schema (vazio se nada for encontrado).
+        """
+        if query is None:
+            query = {}
+
+        try:
+            collection = self.db[collection_name]
+            # Colunas 'object' (ex.: os arrays dos blocos horários) não têm um tipo Arrow fixo
+            has_object = any(pd.api.types.pandas_dtype(dtype) == object for dtype in schema.values())
+            if use_arrow and find_pandas_all is not None and not has_object:
+                df = self._load_with_arrow(collection, schema, query)
+            else:
+                total = collection.count_documents(query)
+                chunks = list(self._iter_typed_chunks(collection, schema, query, max(total, 1), batch_size))
+                df = chunks[0] if len(chunks) == 1 else pd.concat(chunks, ignore_index=True)
+        except OperationFailure as e:
+            print(f"Erro ao executar a query no MongoDB: {e}")
+            raise
+
+        print(f"Carregados {len(df)} documentos da coleção '{collection_name}' com a query: {query}")
+        return df
+
+    def iter_dataframes(self, collection_name: str, schema: Dict[str, str], query: Dict[str, Any] = None,
+                        chunk_size: int = 500_000, batch_size: int = 10_000) -> Iterator[pd.DataFrame]:
+        """
+        Lê uma coleção como uma sequência de DataFrames tipados de até 'chunk_size' linhas.
+
+        Útil para coleções que não cabem inteiras em memória. Os argumentos têm o
+        mesmo significado de 'load_dataframe'.
+        """
+        if query is None:
+            query = {}
+
+        try:
+            collection = self.db[collection_name]
+            yield from self._iter_typed_chunks(collection, schema, query, chunk_size, batch_size)
+        except OperationFailure as e:
+            print(f"Erro ao executar a query no MongoDB: {e}")
+            raise
+
+    @staticmethod
+    def _storage_dtype(dtype) -> np.dtype:
+        """Dtype NumPy usado para preencher a coluna antes da conversão final."""
+        dtype = pd.api.types.pandas_dtype(dtype)
+        if isinstance(dtype, np.dtype) and dtype.kind in "fiubM":
+            return dtype
+        if pd.api.types.is_numeric_dtype(dtype):
+            return np.dtype("float64")  # Inteiros anuláveis: NaN marca os nulos até o astype final
+        return np.dtype(object)
+
+    def _iter_typed_chunks(self, collection, schema: Dict[str, str], query: Dict[str, Any],
+                           chunk_size: int, batch_size: int) -> Iterator[pd.DataFrame]:
+        columns = list(schema)
+        storage = {col: self._storage_dtype(dtype) for col, dtype in schema.items()}
+        projection = {col: 1 for col in columns}
+        projection["_id"] = 0
+
+        def allocate():
+            return {col: np.empty(chunk_size, dtype=storage[col]) for col in columns}
+
+        def build(arrays, size):
+            df = pd.DataFrame({col: arrays[col][:size] for col in columns}, copy=False)
+            for col, dtype in schema.items():
+                if storage[col] != pd.api.types.pandas_dtype(dtype):
+                    df[col] = df[col].astype(dtype)
+            return df
+
+        cursor = collection.find(query, projection=projection, batch_size=batch_size)
+        arrays, filled, produced = allocate(), 0, False
+        batch: List[Dict[str, Any]] = []
+
+        def flush():
+            nonlocal filled
+            n = len(batch)
+            for col in columns:
+                values = [doc.get(col) for doc in batch]
+                if storage[col] == object:
+                    # fromiter mantém listas como um valor por célula (a atribuição direta tentaria expandi-las)
+                    values = np.fromiter(values, dtype=object, count=n)
+                arrays[col][filled:filled + n] = values
+            filled += n
+            batch.clear()
+
+        for document in cursor:
+            batch.append(document)
+            if len(batch) == min(batch_size, chunk_size - filled):
+                flush()
+                if filled == chunk_size:
+                    yield build(arrays, filled)
+                    produced = True
+                    arrays, filled = allocate(), 0
+        if batch:
+            flush()
+        if filled or not produced:
+            yield build(arrays, filled)
+
+    @staticmethod
+    def _load_with_arrow(collection, schema: Dict[str, str], query: Dict[str, Any]) -> pd.DataFrame:
+        """Carrega via pymongoarrow, que decodifica o BSON direto para colunas Arrow."""
+        arrow_types = {}
+        for col, dtype in schema.items():
+            dtype = pd.api.types.pandas_dtype(dtype)
+            if dtype.kind == "M":
+                arrow_types[col] = pa.timestamp("ms")
+            elif dtype.kind == "f":
+                arrow_types[col] = pa.float64()
+            elif dtype.kind in "iu" or pd.api.types.is_integer_dtype(dtype):
+                arrow_types[col] = pa.int64()
+            elif dtype.kind == "b":
+                arrow_types[col] = pa.bool_()
+            else:
+                arrow_types[col] = pa.string()
+        df = find_pandas_all(collection, query, schema=ArrowSchema(arrow_types))
+        return df[list(schema)].astype(schema)
+
+    def ensure_index(self, collection_name: str, keys: List[str], unique: bool = False) -> str:
+        """Garante a existência de um índice composto (ascendente) sobre os campos informados."""
+        return self.db[collection_name].create_index([(key, ASCENDING) for key in keys], unique=unique)
+
+    def ensure_unique_index(self, collection_name: str, keys: List[str]):
+        """Garante a existência de um índice único sobre os campos informados."""
+        index_name = self.ensure_index(collection_name, keys, unique=True)
+        print(f"Índice único '{index_name}' garantido na coleção '{collection_name}'.")
+
+    def get_latest_value(self, collection_name: str, field: str) -> datetime | None:
+        """Retorna o maior valor armazenado de um campo (ex.: o último 'dia'), ou None se a coleção estiver vazia."""
+        collection = self.db[collection_name]
+        document = collection.find_one(
+            {field: {"$ne": None}},
+            projection={field: 1, "_id": 0},
+            sort=[(field, DESCENDING)]
+        )
+        return document[field] if document else None
+
+    def get_latest_values_by(self, collection_name: str, field: str, group_field: str) -> Dict[str, datetime]:
+        """Retorna o maior valor de 'field' para cada valor de 'group_field' (ex.: último 'dia' por localidade)."""
+        collection = self.db[collection_name]
+        pipeline = [
+            {"$match": {field: {"$ne": None}}},
+            {"$group": {"_id": f"${group_field}", "latest": {"$max": f"${field}"}}}
+        ]
+        return {doc["_id"]: doc["latest"] for doc in collection.aggregate(pipeline)}
@@ -0,0 +1,284 @@
+"""
+Instrumentação por etapa do ETL e do pipeline de análise.
+
+Cada etapa é medida com o gerenciador de contexto (ou decorador) 'stage':
+
+    with stage("etl.transform") as st:
+        df = transform_daily_data(payload)
+        st.rows(len(df))
+
+Ao final da etapa são registrados o tempo, as linhas e bytes informados, o
+pico de memória do processo e quantos comandos MongoDB e requisições HTTP
+foram feitos durante ela. Os registros podem ser enviados como logs JSON (uma
+linha por etapa) e exportados em um arquivo no formato texto do Prometheus
+(compatível com o textfile collector do node_exporter). Opcionalmente, cada
+etapa gera um perfil do cProfile e um resumo de alocações do tracemalloc.
+
+Variáveis de ambiente:
+    METRICS_LOG_PATH      Arquivo de logs JSON ('-' = stderr). Vazio desativa.
+    PROMETHEUS_TEXTFILE   Arquivo .prom reescrito a cada etapa concluída.
+    PROFILE_DIR           Pasta dos perfis; ativa o cProfile por etapa.
+    PROFILE_TRACEMALLOC   '1' ativa também o tracemalloc (top alocações por etapa).
+"""
+import contextlib
+import contextvars
+import cProfile
+import json
+import os
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, deque
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+
+PROMETHEUS_PREFIX = "climate_stage"
+TRACEMALLOC_TOP = 25
+# Registros mantidos em memória (os mais antigos são descartados)
+MAX_RECORDS = 10_000
+
+_lock = threading.Lock()
+_counters: Counter = Counter()
+_records: deque = deque(maxlen=MAX_RECORDS)
+_current_stage: contextvars.ContextVar = contextvars.ContextVar("current_stage", default=None)
+
+
+def _peak_rss_bytes() -> int | None:
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def count(name: str, value: float = 1):
+    """Incrementa um contador global (ex.: 'http.requests'); cada etapa registra a diferença."""
+    with _lock:
+        _counters[name] += value
+
+
+def _snapshot() -> Counter:
+    with _lock:
+        return Counter(_counters)
+
+
+# --- Fontes de contadores: HTTP (os comandos MongoDB são contados em common.database.client) ---
+def record_http_response(response, *args, **kwargs):
+    """Hook de resposta do 'requests': conta requisições, status e bytes recebidos."""
+    count("http.requests")
+    count(f"http.status.{response.status_code}")
+    count("http.bytes", len(response.content or b""))
+    return response
+
+
+# --- Etapas ---
+class StageContext:
+    """Dados informados pela etapa em andamento (linhas, bytes e campos extras)."""
+    def __init__(self, name: str, labels: Dict[str, Any]):
+        self.name = name
+        self.labels = labels
+        self.fields: Dict[str, Any] = {}
+
+    def rows(self, rows_out: int, rows_in: int | None = None):
+        self.fields["rows_out"] = int(rows_out)
+        if rows_in is not None:
+            self.fields["rows_in"] = int(rows_in)
+
+    def add_bytes(self, nbytes: int):
+        self.fields["bytes"] = self.fields.get("bytes", 0) + int(nbytes)
+
+    def set(self, key: str, value: Any):
+        self.fields[key] = value
+
+
+class stage(contextlib.ContextDecorator):
+    """
+    Mede uma etapa; pode ser usado com 'with' ou como decorador ('@stage("nome")').
+
+    O estado de cada medição fica em uma pilha por thread: a mesma instância
+    pode ser usada por várias threads e de forma aninhada (ex.: função
+    decorada recursiva), e cada chamada decorada usa uma instância nova.
+    """
+    def __init__(self, name: str, **labels):
+        self.name = name
+        self.labels = labels
+        self._local = threading.local()
+
+    def _recreate_cm(self) -> "stage":
+        return stage(self.name, **self.labels)
+
+    def _states(self) -> List[Dict[str, Any]]:
+        if not hasattr(self._local, "states"):
+            self._local.states = []
+        return self._local.states
+
+    def __enter__(self) -> StageContext:
+        context = StageContext(self.name, self.labels)
+        parent = _current_stage.get()
+        self._states().append({
+            "context": context,
+            "parent": parent.name if parent else None,
+            "profiler": _start_profiler(outermost=parent is None),
+            "tracing": _start_tracemalloc(),
+            "token": _current_stage.set(context),
+            "counters": _snapshot(),
+            "started_at": datetime.now(timezone.utc),
+            "start": time.perf_counter(),
+        })
+        return context
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        state = self._states().pop()
+        wall = time.perf_counter() - state["start"]
+        _current_stage.reset(state["token"])
+        context: StageContext = state["context"]
+
+        deltas = {key: value for key, value in (_snapshot() - state["counters"]).items() if value}
+        record = {
+            "stage": self.name,
+            "parent": state["parent"],
+            "labels": self.labels,
+            "started_at": state["started_at"].isoformat(timespec="milliseconds"),
+            "wall_s": round(wall, 6),
+            "status": "error" if exc_type else "ok",
+            **context.fields,
+            "peak_rss_bytes": _peak_rss_bytes(),
+            "mongo_commands": {k.split(".", 2)[2]: int(v) for k, v in deltas.items() if k.startswith("mongo.commands.")},
+            "mongo_duration_s": round(deltas.get("mongo.duration_s", 0.0), 6),
+            "mongo_failures": int(deltas.get("mongo.failures", 0)),
+            "http_requests": int(deltas.get("http.requests", 0)),
+            "http_bytes": int(deltas.get("http.bytes", 0)),
+        }
+        others = {k: v for k, v in deltas.items() if not k.startswith(("mongo.", "http."))}
+        if others:
+            record["counters"] = others
+        if exc_type:
+            record["error"] = f"{exc_type.__name__}: {exc_val}"
+        _stop_profiler(state["profiler"], self.name)
+        if state["tracing"]:
+            record["tracemalloc_peak_bytes"] = _stop_tracemalloc(self.name)
+
+        with _lock:
+            _records.append(record)
+        _emit(record)
+        return False
+
+
+def records() -> List[Dict[str, Any]]:
+    """Registros das etapas concluídas neste processo."""
+    with _lock:
+        return list(_records)
+
+
+# --- Saídas ---
+def _emit(record: Dict[str, Any]):
+    log_path = os.getenv("METRICS_LOG_PATH")
+    if log_path:
+        line = json.dumps(record, default=str, ensure_ascii=False)
+        if log_path == "-":
+            print(line, file=sys.stderr)
+        else:
+            with _lock, open(log_path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+    textfile = os.getenv("PROMETHEUS_TEXTFILE")
+    if textfile:
+        write_prometheus_textfile(textfile)
+
+
+def _label_value(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _metric_name(name: str) -> str:
+    return re.sub(r"[^a-zA-Z0-9_]", "_", name)
+
+
+def render_prometheus() -> str:
+    """Métricas da última execução de cada etapa, no formato texto do Prometheus/OpenMetrics."""
+    latest: Dict[str, Dict[str, Any]] = {}
+    for record in records():
+        latest[record["stage"]] = record
+
+    gauges = {
+        "duration_seconds": ("Duração da etapa em segundos.", lambda r: r["wall_s"]),
+        "rows": ("Linhas produzidas pela etapa.", lambda r: r.get("rows_out")),
+        "bytes": ("Bytes processados pela etapa.", lambda r: r.get("bytes")),
+        "peak_rss_bytes": ("Pico de memória residente do processo ao fim da etapa.", lambda r: r["peak_rss_bytes"]),
+        "http_requests": ("Requisições HTTP feitas durante a etapa.", lambda r: r["http_requests"]),
+        "http_bytes": ("Bytes recebidos por HTTP durante a etapa.", lambda r: r["http_bytes"]),
+        "mongo_duration_seconds": ("Tempo gasto em comandos MongoDB.", lambda r: r["mongo_duration_s"]),
+        "success": ("1 se a última execução da etapa terminou sem erro.", lambda r: int(r["status"] == "ok")),
+    }
+    lines = []
+    for suffix, (help_text, getter) in gauges.items():
+        name = f"{PROMETHEUS_PREFIX}_{suffix}"
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+        for stage_name, record in latest.items():
+            value = getter(record)
+            if value is not None:
+                lines.append(f'{name}{{stage="{_label_value(stage_name)}"}} {value}')
+
+    name = f"{PROMETHEUS_PREFIX}_mongo_commands"
+    lines += [f"# HELP {name} Comandos MongoDB enviados durante a etapa.", f"# TYPE {name} gauge"]
+    for stage_name, record in latest.items():
+        for command, total in record["mongo_commands"].items():
+            lines.append(f'{name}{{stage="{_label_value(stage_name)}",command="{_metric_name(command)}"}} {total}')
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus_textfile(path: str):
+    """Grava o arquivo .prom de forma atômica (o coletor nunca lê um arquivo pela metade)."""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(render_prometheus())
+    os.replace(tmp_path, path)
+
+
+# --- Perfis opcionais ---
+def _profile_path(stage_name: str, extension: str) -> str:
+    directory = os.getenv("PROFILE_DIR")
+    os.makedirs(directory, exist_ok=True)
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    return os.path.join(directory, f"{_metric_name(stage_name)}-{stamp}-{os.getpid()}.{extension}")
+
+
+def _start_profiler(outermost: bool) -> cProfile.Profile | None:
+    # Só a etapa mais externa é perfilada (o cProfile não aceita perfis aninhados na mesma thread)
+    if not os.getenv("PROFILE_DIR") or not outermost:
+        return None
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:  # Outro perfilador já ativo (ex.: etapa em outra thread)
+        return None
+    return profiler
+
+
+def _stop_profiler(profiler: cProfile.Profile | None, stage_name: str):
+    if profiler is None:
+        return
+    profiler.disable()
+    profiler.dump_stats(_profile_path(stage_name, "prof"))
+
+
+def _start_tracemalloc() -> bool:
+    if not os.getenv("PROFILE_DIR") or os.getenv("PROFILE_TRACEMALLOC") != "1" or tracemalloc.is_tracing():
+        return False
+    tracemalloc.start()
+    return True
+
+
+def _stop_tracemalloc(stage_name: str) -> int:
+    snapshot = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    with open(_profile_path(stage_name, "tracemalloc.txt"), "w", encoding="utf-8") as f:
+        f.write(f"Pico de memória rastreada: {peak / 1024 ** 2:.1f} MB\n\n")
+        for statistic in snapshot.statistics("lineno")[:TRACEMALLOC_TOP]:
+            f.write(f"{statistic}\n")
+    return peak
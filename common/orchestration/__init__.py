@@ -0,0 +1,4 @@
+"""Orquestração do ETL, da análise e da exportação como um DAG com checkpoints."""
+from common.orchestration.dag import DAG, Node, load_output, run_dag
+
+__all__ = ["DAG", "Node", "load_output", "run_dag"]
@@ -0,0 +1,77 @@
+"""
+Executa o fluxo completo como um DAG (ver common/orchestration/climate.py).
+
+Uso (a partir da raiz do repositório):
+    python -m common.orchestration
+    python -m common.orchestration --group-by localidade --period month --export diff
+    python -m common.orchestration --force load_input   # relê a entrada mesmo com a coleção inalterada
+"""
+import argparse
+import json
+import os
+import sys
+from datetime import date, datetime
+
+from common.orchestration.climate import build_climate_dag
+from common.orchestration.dag import REPO_ROOT, run_dag
+
+DEFAULT_CHECKPOINT_DIR = os.path.join(REPO_ROOT, ".cache", "dag")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Executa ETL, análise e exportação como um DAG com checkpoints.")
+    parser.add_argument("--full-refresh", action="store_true", help="Busca novamente toda a janela histórica.")
+    parser.add_argument("--group-by", metavar="COLUNAS", help="Métricas por grupo (ex.: localidade).")
+    parser.add_argument("--period", choices=("month", "season", "year"), help="Agrupa também por período de 'dia'.")
+    parser.add_argument("--forecast-model", choices=("linear", "seasonal"), default="linear")
+    parser.add_argument("--export", metavar="MODO", choices=("diff", "force", "full"),
+                        help="Inclui a exportação para o Google Sheets no modo informado.")
+    parser.add_argument("--run-date", default=date.today().isoformat(),
+                        help="Último dia buscado na API (padrão: hoje); faz parte da chave da ingestão.")
+    parser.add_argument("--force", metavar="ETAPAS", default="",
+                        help="Etapas (separadas por vírgula) executadas mesmo com checkpoint, com as seguintes.")
+    parser.add_argument("--workers", type=int, help="Processos por pacote (padrão: número de CPUs).")
+    parser.add_argument("--checkpoint-dir", default=DEFAULT_CHECKPOINT_DIR)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    dag = build_climate_dag(export=bool(args.export))
+    force = [name.strip() for name in args.force.split(",") if name.strip()]
+    unknown = [name for name in force if name not in dag.nodes]
+    if unknown:
+        sys.exit(f"Etapas desconhecidas: {', '.join(unknown)}. Disponíveis: {', '.join(dag.order)}.")
+
+    params = {
+        "run_date": args.run_date,
+        "full_refresh": args.full_refresh,
+        "group_keys": [key.strip() for key in args.group_by.split(",")] if args.group_by else None,
+        "period": args.period,
+        "forecast_model": args.forecast_model,
+        "export_mode": args.export,
+    }
+    print(f"--- Executando o DAG ({len(dag.order)} etapas) ---")
+    results = run_dag(dag, params, args.checkpoint_dir, workers=args.workers, force=force)
+
+    runs_dir = os.path.join(args.checkpoint_dir, "runs")
+    os.makedirs(runs_dir, exist_ok=True)
+    summary_path = os.path.join(runs_dir, f"{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    with open(summary_path, "w", encoding="utf-8") as f:
+        json.dump({"params": params, "nodes": results}, f, indent=2, default=str)
+
+    print(f"\n{'etapa':<28}{'situação':<12}{'tempo (s)':>10}")
+    for name in dag.order:
+        result = results.get(name, {})
+        wall = f"{result['wall_s']:.2f}" if result.get("status") == "ok" else "-"
+        print(f"{name:<28}{result.get('status', '-'):<12}{wall:>10}")
+
+    failed = [name for name, result in results.items() if result["status"] == "failed"]
+    if failed:
+        print(f"\n❌ Falha em: {', '.join(failed)}. Execute novamente para retomar a partir delas.")
+        sys.exit(1)
+    print(f"\n✅ DAG concluído. Resumo em '{summary_path}'.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+"""
+DAG do fluxo completo: ingestão (extração, transformação e carga em blocos,
+com retomada) -> métricas (em paralelo) -> publicação -> exportação.
+
+As funções de cada etapa ficam em 'data/tasks.py' e 'pipelines/tasks.py'.
+"""
+from common.orchestration.dag import DAG, Node
+
+# Uma etapa por tipo de métrica (os nomes são os 'metric_type' publicados)
+METRIC_NODES = ("descriptive_statistics", "correlation_matrix", "weather_code_probability", "temperature_forecast",
+                "rolling_statistics", "temperature_anomalies", "extreme_events")
+# Métricas que comparam os dias com a normal climatológica (etapa 'climatology')
+CLIMATOLOGY_NODES = ("temperature_anomalies", "extreme_events")
+ANALYSIS_PARAMS = ("group_keys", "period")
+
+
+def build_climate_dag(export: bool = False) -> DAG:
+    """Monta o DAG; a etapa de exportação para o Google Sheets só entra com 'export'."""
+    nodes = [
+        Node("ingest", "data", "tasks:ingest", params=("run_date", "full_refresh")),
+        # A entrada é relida quando a coleção muda, seja qual for a origem da gravação
+        Node("input_fingerprint", "pipelines", "tasks:input_fingerprint", deps=("ingest",), volatile=True),
+        Node("load_input", "pipelines", "tasks:load_input", deps=("input_fingerprint",), params=ANALYSIS_PARAMS),
+        Node("climatology", "pipelines", "tasks:climatology", deps=("load_input",)),
+        *(
+            Node(metric, "pipelines", f"tasks:{metric}",
+                 deps=("load_input", "climatology") if metric in CLIMATOLOGY_NODES else ("load_input",),
+                 params=(*ANALYSIS_PARAMS, "forecast_model"))
+            for metric in METRIC_NODES
+        ),
+        Node("publish_metrics", "pipelines", "tasks:publish_metrics", deps=("load_input", *METRIC_NODES),
+             params=ANALYSIS_PARAMS),
+    ]
+    if export:
+        nodes.append(Node("export", "pipelines", "tasks:export", deps=("publish_metrics",), params=("export_mode",)))
+    return DAG(nodes)
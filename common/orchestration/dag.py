@@ -0,0 +1,272 @@
+"""
+Execução de um DAG de etapas com paralelismo e checkpoints locais.
+
+Cada nó aponta para uma função 'modulo:funcao' de um dos pacotes ('data' ou
+'pipelines'), que recebe as saídas dos nós de que depende e os parâmetros
+declarados e retorna um objeto serializável (pickle). Como os dois pacotes têm
+um 'src' próprio, cada pacote ganha o seu ProcessPoolExecutor; nós
+independentes rodam ao mesmo tempo.
+
+A saída de cada nó é gravada em '<checkpoint_dir>/<nó>/<chave>.pkl'. A chave é
+um hash de: nome e função do nó, parâmetros declarados, código-fonte do pacote
+(e de 'common') e hashes do conteúdo das saídas dos nós anteriores. Se a chave
+já tem checkpoint, o nó não é executado: dados de entrada iguais não são
+recalculados, e uma execução que falhou é retomada a partir do nó que falhou.
+
+Nós 'volatile' leem estado externo (ex.: a impressão digital de uma coleção)
+e são executados sempre; os nós seguintes continuam sendo reaproveitados
+enquanto a saída deles não mudar.
+"""
+import hashlib
+import json
+import multiprocessing
+import os
+import pickle
+import sys
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Tuple
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+# Checkpoints mantidos por nó (os mais antigos são removidos)
+KEEP_CHECKPOINTS = 5
+
+
+@dataclass(frozen=True)
+class Node:
+    """Etapa do DAG: 'target' é 'modulo:funcao' dentro do pacote; 'params' são os parâmetros que ela usa."""
+    name: str
+    package: str
+    target: str
+    deps: Tuple[str, ...] = ()
+    params: Tuple[str, ...] = ()
+    volatile: bool = False
+
+
+class DAG:
+    """Conjunto de nós validado (dependências conhecidas, sem ciclos) em ordem topológica."""
+    def __init__(self, nodes: Iterable[Node]):
+        self.nodes: Dict[str, Node] = {}
+        for node in nodes:
+            if node.name in self.nodes:
+                raise ValueError(f"Nó duplicado no DAG: '{node.name}'.")
+            self.nodes[node.name] = node
+        for node in self.nodes.values():
+            unknown = [dep for dep in node.deps if dep not in self.nodes]
+            if unknown:
+                raise ValueError(f"O nó '{node.name}' depende de nós inexistentes: {', '.join(unknown)}.")
+        self.order = self._topological_order()
+
+    def _topological_order(self) -> List[str]:
+        remaining = {name: set(node.deps) for name, node in self.nodes.items()}
+        order = []
+        while remaining:
+            ready = sorted(name for name, deps in remaining.items() if not deps)
+            if not ready:
+                raise ValueError(f"O DAG tem um ciclo entre os nós: {', '.join(sorted(remaining))}.")
+            for name in ready:
+                del remaining[name]
+                order.append(name)
+            for deps in remaining.values():
+                deps.difference_update(ready)
+        return order
+
+    def descendants(self, names: Iterable[str]) -> set:
+        """Os nós informados e todos os que dependem deles, direta ou indiretamente."""
+        selected = set(names)
+        for name in self.order:
+            if selected.intersection(self.nodes[name].deps):
+                selected.add(name)
+        return selected
+
+
+# --- Checkpoints ---
+def _hash_files(paths: Iterable[str]) -> str:
+    digest = hashlib.sha256()
+    for path in sorted(paths):
+        digest.update(os.path.relpath(path, REPO_ROOT).encode())
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def code_fingerprint(package: str) -> str:
+    """Hash do código do pacote (scripts da raiz e 'src') e de 'common': mudanças no código invalidam os checkpoints."""
+    paths = []
+    for root in (os.path.join(REPO_ROOT, package), os.path.join(REPO_ROOT, "common")):
+        for directory, subdirs, files in os.walk(root):
+            subdirs[:] = [d for d in subdirs if not d.startswith((".", "__"))]
+            paths += [os.path.join(directory, f) for f in files if f.endswith(".py")]
+    return _hash_files(paths)
+
+
+class CheckpointStore:
+    """Saídas dos nós em disco, indexadas pela chave de conteúdo do nó."""
+    def __init__(self, root: str):
+        self.root = root
+
+    def key(self, node: Node, params: Dict[str, Any], code: str, input_hashes: Dict[str, str]) -> str:
+        material = {
+            "node": [node.name, node.package, node.target],
+            "params": {name: params.get(name) for name in node.params},
+            "code": code,
+            "inputs": input_hashes,
+        }
+        return hashlib.sha256(json.dumps(material, sort_keys=True, default=str).encode()).hexdigest()[:32]
+
+    def output_path(self, node_name: str, key: str) -> str:
+        return os.path.join(self.root, node_name, f"{key}.pkl")
+
+    def lookup(self, node_name: str, key: str) -> Dict[str, Any] | None:
+        """Metadados do checkpoint ({'output_hash', ...}), ou None se ainda não existe."""
+        meta_path = os.path.join(self.root, node_name, f"{key}.json")
+        if not (os.path.exists(meta_path) and os.path.exists(self.output_path(node_name, key))):
+            return None
+        with open(meta_path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def save_meta(self, node_name: str, key: str, meta: Dict[str, Any]):
+        meta_path = os.path.join(self.root, node_name, f"{key}.json")
+        with open(meta_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        self._prune(node_name)
+
+    def _prune(self, node_name: str):
+        directory = os.path.join(self.root, node_name)
+        metas = sorted((entry for entry in os.scandir(directory) if entry.name.endswith(".json")),
+                       key=lambda entry: entry.stat().st_mtime, reverse=True)
+        for entry in metas[KEEP_CHECKPOINTS:]:
+            for path in (entry.path, entry.path[:-len(".json")] + ".pkl"):
+                if os.path.exists(path):
+                    os.remove(path)
+
+
+# --- Execução nos processos de cada pacote ---
+def _init_worker(package: str):
+    """Prepara o processo para importar o 'src' do pacote (e 'common')."""
+    sys.path.insert(0, os.path.join(REPO_ROOT, package))
+    if REPO_ROOT not in sys.path:
+        sys.path.append(REPO_ROOT)
+
+
+def _execute(node_name: str, target: str, input_paths: Dict[str, str], params: Dict[str, Any],
+             output_path: str) -> Dict[str, Any]:
+    """Carrega as entradas, executa a função do nó e grava a saída; retorna o hash da saída e o tempo."""
+    import importlib
+    from common.instrumentation import stage
+
+    try:
+        inputs = {}
+        for name, path in input_paths.items():
+            with open(path, "rb") as f:
+                inputs[name] = pickle.load(f)
+        module_name, function_name = target.split(":")
+        function = getattr(importlib.import_module(module_name), function_name)
+
+        start = time.perf_counter()
+        with stage(f"dag.{node_name}"):
+            output = function(inputs, params)
+        wall = time.perf_counter() - start
+
+        payload = pickle.dumps(output, protocol=pickle.HIGHEST_PROTOCOL)
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        tmp_path = f"{output_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(payload)
+        os.replace(tmp_path, output_path)
+    except Exception as e:
+        # A exceção original pode não ser serializável entre processos; o traceback vai como texto
+        raise RuntimeError(f"{type(e).__name__}: {e}\n{traceback.format_exc()}") from None
+    return {"output_hash": hashlib.sha256(payload).hexdigest(), "wall_s": round(wall, 3), "bytes": len(payload)}
+
+
+def run_dag(dag: DAG, params: Dict[str, Any], checkpoint_dir: str, workers: int | None = None,
+            force: Iterable[str] = ()) -> Dict[str, Dict[str, Any]]:
+    """
+    Executa o DAG, pulando os nós que já têm checkpoint para a mesma chave.
+
+    Args:
+        dag (DAG): Nós a executar.
+        params (dict): Parâmetros da execução; cada nó recebe apenas os que declara.
+        checkpoint_dir (str): Pasta dos checkpoints.
+        workers (int, optional): Processos por pacote. Defaults to os.cpu_count().
+        force (iterable, optional): Nós executados mesmo com checkpoint (junto com os
+                                    nós que dependem deles). Defaults to ().
+
+    Returns:
+        dict: Por nó, {'status': 'ok' | 'cached' | 'failed' | 'skipped', ...}. Um nó
+              'skipped' não rodou porque um nó anterior falhou.
+    """
+    checkpoints = CheckpointStore(checkpoint_dir)
+    forced = dag.descendants(force)
+    fingerprints = {package: code_fingerprint(package) for package in {node.package for node in dag.nodes.values()}}
+    context = multiprocessing.get_context("spawn")
+    pools: Dict[str, ProcessPoolExecutor] = {}
+
+    results: Dict[str, Dict[str, Any]] = {}
+    running: Dict[Future, Tuple[str, str]] = {}
+    pending = list(dag.order)
+
+    def schedule():
+        for name in list(pending):
+            node = dag.nodes[name]
+            dep_status = [results.get(dep, {}).get("status") for dep in node.deps]
+            if any(status in ("failed", "skipped") for status in dep_status):
+                pending.remove(name)
+                results[name] = {"status": "skipped"}
+                print(f"⏭️  {name}: não executado (dependência falhou).")
+                continue
+            if not all(status in ("ok", "cached") for status in dep_status):
+                continue
+
+            pending.remove(name)
+            input_hashes = {dep: results[dep]["output_hash"] for dep in node.deps}
+            key = checkpoints.key(node, params, fingerprints[node.package], input_hashes)
+            meta = None if name in forced or node.volatile else checkpoints.lookup(name, key)
+            if meta is not None:
+                results[name] = {**meta, "status": "cached", "key": key}
+                print(f"♻️  {name}: checkpoint reaproveitado ({key[:12]}).")
+                continue
+
+            if node.package not in pools:
+                pools[node.package] = ProcessPoolExecutor(
+                    max_workers=workers or os.cpu_count(), mp_context=context,
+                    initializer=_init_worker, initargs=(node.package,)
+                )
+            input_paths = {dep: checkpoints.output_path(dep, results[dep]["key"]) for dep in node.deps}
+            node_params = {param: params.get(param) for param in node.params}
+            future = pools[node.package].submit(_execute, name, node.target, input_paths, node_params,
+                                                checkpoints.output_path(name, key))
+            running[future] = (name, key)
+            print(f"▶️  {name}: iniciado.")
+
+    try:
+        schedule()
+        while running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name, key = running.pop(future)
+                try:
+                    meta = future.result()
+                except Exception as e:
+                    results[name] = {"status": "failed", "key": key, "error": str(e)}
+                    print(f"❌ {name}: falhou.\n{e}")
+                    continue
+                meta["created_at"] = datetime.now(timezone.utc).isoformat(timespec="seconds")
+                checkpoints.save_meta(name, key, meta)
+                results[name] = {**meta, "status": "ok", "key": key}
+                print(f"✅ {name}: concluído em {meta['wall_s']:.2f}s.")
+            schedule()
+    finally:
+        for pool in pools.values():
+            pool.shutdown(cancel_futures=True)
+    return results
+
+
+def load_output(checkpoint_dir: str, node_name: str, result: Dict[str, Any]) -> Any:
+    """Lê a saída de um nó concluído (ou reaproveitado) a partir do seu checkpoint."""
+    with open(CheckpointStore(checkpoint_dir).output_path(node_name, result["key"]), "rb") as f:
+        return pickle.load(f)
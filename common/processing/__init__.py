@@ -0,0 +1,6 @@
+from common.processing.resampling import (
+    DAILY_AGGREGATIONS, HOURLY_COLUMNS, buckets_to_daily, hourly_to_buckets, resample_hourly_to_daily
+)
+
+__all__ = ["DAILY_AGGREGATIONS", "HOURLY_COLUMNS", "buckets_to_daily", "hourly_to_buckets",
+           "resample_hourly_to_daily"]
@@ -0,0 +1,156 @@
+"""
+Dados horários em blocos diários e reamostragem para a resolução diária.
+
+A série horária tem 24 vezes mais linhas que a diária. Para armazená-la de
+forma compacta, cada (localidade, dia) vira um único documento (ou linha
+Parquet) com um array por variável, indexado pela hora local (0 a 23):
+
+    {"localidade": "franca", "dia": datetime(2024, 1, 5),
+     "temperatura_c": [21.3, 20.9, ..., 23.1], "umidade_percent": [...],
+     "indice_uv": [...], "codigo_clima": [...]}
+
+Horas sem medição ficam como None. Nos dias de mudança de horário de verão,
+a hora que não existe fica vazia e a hora repetida guarda a última medição.
+
+As colunas diárias usadas pelas métricas (temperatura_max_c,
+umidade_media_percent, ...) são derivadas dos blocos como matrizes (dias x 24)
+com reduções do NumPy por linha, sem laços em Python.
+"""
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+HOURS_PER_DAY = 24
+LOCATION_COLUMN = "localidade"
+DAY_COLUMN = "dia"
+HOUR_COLUMN = "hora"
+# Variáveis guardadas em cada bloco horário
+HOURLY_COLUMNS = ["codigo_clima", "temperatura_c", "umidade_percent", "indice_uv"]
+# Coluna diária -> (variável horária, redução sobre as horas do dia).
+# O código de tempo diário da API é o mais severo do dia (o maior código).
+DAILY_AGGREGATIONS = {
+    "codigo_clima": ("codigo_clima", "max"),
+    "temperatura_max_c": ("temperatura_c", "max"),
+    "temperatura_min_c": ("temperatura_c", "min"),
+    "umidade_media_percent": ("umidade_percent", "mean"),
+    "indice_uv_max": ("indice_uv", "max"),
+}
+# Colunas inteiras: os blocos guardam inteiros e a tabela diária usa um dtype anulável
+INTEGER_COLUMNS = {"codigo_clima"}
+
+
+def _nanmean(matrix: np.ndarray) -> np.ndarray:
+    valid = ~np.isnan(matrix)
+    counts = valid.sum(axis=1)
+    sums = np.where(valid, matrix, 0.0).sum(axis=1)
+    return np.divide(sums, counts, out=np.full(len(sums), np.nan), where=counts > 0)
+
+
+# fmax/fmin ignoram NaN e devolvem NaN só quando o dia inteiro está vazio (sem avisos do NumPy)
+_REDUCERS = {
+    "max": lambda matrix: np.fmax.reduce(matrix, axis=1),
+    "min": lambda matrix: np.fmin.reduce(matrix, axis=1),
+    "mean": _nanmean,
+}
+
+
+def hourly_matrices(df: pd.DataFrame) -> Tuple[pd.DataFrame, Dict[str, np.ndarray]]:
+    """
+    Reorganiza uma tabela horária (uma linha por hora) em matrizes (dias x 24).
+
+    Args:
+        df (pd.DataFrame): Colunas 'hora' (datetime local), 'localidade' (opcional)
+                           e as variáveis de HOURLY_COLUMNS presentes.
+
+    Returns:
+        tuple: (chaves de cada linha das matrizes — 'localidade', se houver, e
+               'dia', em ordem; {variável: matriz float64 com NaN nas horas vazias}).
+    """
+    hours = df[HOUR_COLUMN].to_numpy(dtype="datetime64[s]")
+    days = hours.astype("datetime64[D]")
+    hour_of_day = (hours - days).astype("timedelta64[h]").astype(np.int64)
+
+    keys = pd.DataFrame({DAY_COLUMN: days.astype("datetime64[s]")})
+    if LOCATION_COLUMN in df.columns:
+        keys.insert(0, LOCATION_COLUMN, df[LOCATION_COLUMN].to_numpy())
+    grouper = keys.groupby(list(keys.columns), sort=True, observed=True)
+    rows = grouper.ngroup().to_numpy()
+    bucket_keys = grouper.size().index.to_frame(index=False)
+
+    matrices = {}
+    for col in HOURLY_COLUMNS:
+        if col not in df.columns:
+            continue
+        matrix = np.full((len(bucket_keys), HOURS_PER_DAY), np.nan)
+        matrix[rows, hour_of_day] = df[col].to_numpy(dtype=np.float64, na_value=np.nan)
+        matrices[col] = matrix
+    return bucket_keys, matrices
+
+
+def _shortest_float64(matrix: np.ndarray) -> np.ndarray:
+    """Valores float32 como float64 pelo menor texto decimal do float32 (23.4 continua 23.4, e não 23.399999618)."""
+    # A conversão por texto é cara; as medições têm poucos valores distintos, então só eles são convertidos
+    values, inverse = np.unique(matrix.astype(np.float32), return_inverse=True)
+    return values.astype(str).astype(np.float64)[inverse].reshape(matrix.shape)
+
+
+def _cells(matrix: np.ndarray, integer: bool) -> List[list]:
+    """Converte a matriz em listas de valores Python (None nas horas vazias), prontas para BSON/Arrow."""
+    valid = ~np.isnan(matrix)
+    cells = np.where(valid, matrix, 0).astype(np.int64 if integer else np.float64).astype(object)
+    cells[~valid] = None
+    return cells.tolist()
+
+
+def hourly_to_buckets(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Agrupa a tabela horária em blocos: uma linha por (localidade, dia) com uma lista de 24 horas por variável.
+
+    Colunas float32 são convertidas pelo menor texto decimal do float32, como
+    na gravação das tabelas diárias no MongoDB.
+    """
+    bucket_keys, matrices = hourly_matrices(df)
+    buckets = bucket_keys.copy()
+    for col, matrix in matrices.items():
+        if df[col].dtype == np.float32:
+            matrix = _shortest_float64(matrix)
+        buckets[col] = _cells(matrix, integer=col in INTEGER_COLUMNS)
+    return buckets
+
+
+def buckets_to_matrix(cells: pd.Series) -> np.ndarray:
+    """Empilha as listas horárias de uma coluna de blocos em uma matriz (blocos x 24), com NaN nas horas vazias."""
+    if cells.empty:
+        return np.empty((0, HOURS_PER_DAY))
+    return np.array(cells.tolist(), dtype=np.float64)  # None vira NaN
+
+
+def _daily_frame(bucket_keys: pd.DataFrame, matrices: Dict[str, np.ndarray]) -> pd.DataFrame:
+    daily = bucket_keys.reset_index(drop=True)
+    for daily_col, (hourly_col, how) in DAILY_AGGREGATIONS.items():
+        if hourly_col not in matrices:
+            continue
+        values = _REDUCERS[how](matrices[hourly_col])
+        if daily_col in INTEGER_COLUMNS:
+            daily[daily_col] = pd.array(values, dtype="Float64").astype("Int64")  # NaN vira <NA>
+        else:
+            daily[daily_col] = values
+    return daily
+
+
+def buckets_to_daily(buckets: pd.DataFrame) -> pd.DataFrame:
+    """
+    Deriva a tabela diária (colunas de DAILY_AGGREGATIONS) dos blocos horários.
+
+    As colunas que não são variáveis horárias (ex.: 'localidade', 'dia') são
+    mantidas; só são calculadas as colunas diárias cujas variáveis estão nos blocos.
+    """
+    keys = buckets[[col for col in buckets.columns if col not in HOURLY_COLUMNS]]
+    matrices = {col: buckets_to_matrix(buckets[col]) for col in HOURLY_COLUMNS if col in buckets.columns}
+    return _daily_frame(keys, matrices)
+
+
+def resample_hourly_to_daily(df: pd.DataFrame) -> pd.DataFrame:
+    """Deriva a tabela diária diretamente de uma tabela horária (uma linha por hora)."""
+    return _daily_frame(*hourly_matrices(df))
@@ -0,0 +1,3 @@
+from common.storage.parquet_store import ParquetStore, query_to_expression
+
+__all__ = ["ParquetStore", "query_to_expression"]
@@ -0,0 +1,319 @@
+import hashlib
+import json
+import os
+import shutil
+import uuid
+from datetime import datetime
+from typing import Any, Dict, Iterator, List
+from urllib.parse import quote
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from pyarrow import fs
+
+# Colunas de partição derivadas de 'dia' (a localidade, quando existir, vem antes delas)
+LOCATION_COLUMN = "localidade"
+YEAR_COLUMN = "ano"
+MONTH_COLUMN = "mes"
+PART_FILE = "part-0.parquet"
+# Pasta (na raiz) dos registros de gravações fora da ordem de cada coleção
+BACKFILL_DIR = "_backfill"
+# Operadores de query no estilo MongoDB aceitos na leitura
+_OPERATORS = {
+    "$eq": lambda field, value: field == value,
+    "$ne": lambda field, value: field != value,
+    "$gt": lambda field, value: field > value,
+    "$gte": lambda field, value: field >= value,
+    "$lt": lambda field, value: field < value,
+    "$lte": lambda field, value: field <= value,
+    "$in": lambda field, value: field.isin(list(value)),
+}
+
+
+def _to_scalar(value: Any) -> Any:
+    """Converte datas da query para o tipo comparável com as colunas Arrow."""
+    if isinstance(value, (datetime, pd.Timestamp)):
+        return pa.scalar(pd.Timestamp(value).value, type=pa.timestamp("ns"))
+    return value
+
+
+def query_to_expression(query: Dict[str, Any] | None) -> ds.Expression | None:
+    """
+    Traduz uma query simples no estilo MongoDB para um filtro do pyarrow.dataset.
+
+    Aceita igualdade e os operadores $eq, $ne, $gt, $gte, $lt, $lte e $in.
+    Condições sobre 'dia' também geram filtros sobre a partição 'ano', para que
+    as pastas de anos fora do intervalo nem sejam abertas.
+    """
+    expression = None
+    for name, condition in (query or {}).items():
+        conditions = condition if isinstance(condition, dict) else {"$eq": condition}
+        for operator, value in conditions.items():
+            if operator not in _OPERATORS:
+                raise ValueError(f"Operador '{operator}' não suportado pelo armazenamento Parquet.")
+            if operator == "$in":
+                value = [_to_scalar(v) for v in value]
+            terms = [_OPERATORS[operator](ds.field(name), _to_scalar(value) if operator != "$in" else value)]
+            if name == "dia" and operator in ("$gt", "$gte", "$eq"):
+                terms.append(ds.field(YEAR_COLUMN) >= pd.Timestamp(value).year)
+            if name == "dia" and operator in ("$lt", "$lte", "$eq"):
+                terms.append(ds.field(YEAR_COLUMN) <= pd.Timestamp(value).year)
+            for term in terms:
+                expression = term if expression is None else expression & term
+    return expression
+
+
+class ParquetStore:
+    """
+    Armazenamento colunar (Parquet) dos dados diários, alternativo ao MongoDB.
+
+    Cada coleção é uma pasta com arquivos Parquet particionados no formato
+    Hive por localidade (quando a coluna existir), ano e mês de 'dia':
+    '<raiz>/<coleção>/localidade=franca/ano=2024/mes=5/part-0.parquet'.
+
+    A escrita tem a mesma interface usada do MongoHandler pelo ETL (upsert por
+    chave, sobrescrita, última data armazenada) e a leitura a mesma do
+    pipeline ('load_dataframe' / 'iter_dataframes'), lendo apenas as partições
+    e colunas necessárias, com os arquivos mapeados em memória.
+    """
+    def __init__(self, root: str, compression: str = "zstd"):
+        self.root = root
+        self.compression = compression
+        self._filesystem = fs.LocalFileSystem(use_mmap=True)
+
+    def __enter__(self):
+        os.makedirs(self.root, exist_ok=True)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        pass
+
+    # --- Escrita ---
+    def _collection_path(self, collection_name: str) -> str:
+        return os.path.join(self.root, collection_name)
+
+    @staticmethod
+    def _partition_columns(df: pd.DataFrame) -> List[str]:
+        return ([LOCATION_COLUMN] if LOCATION_COLUMN in df.columns else []) + [YEAR_COLUMN, MONTH_COLUMN]
+
+    def _iter_partitions(self, base_path: str, df: pd.DataFrame) -> Iterator[tuple[str, pd.DataFrame]]:
+        """Divide o DataFrame por partição, devolvendo (pasta da partição, linhas sem as colunas de partição)."""
+        days = pd.to_datetime(df["dia"])
+        keyed = df.assign(**{YEAR_COLUMN: days.dt.year.to_numpy(), MONTH_COLUMN: days.dt.month.to_numpy()})
+        partition_cols = self._partition_columns(df)
+        for key, part in keyed.groupby(partition_cols, sort=False, observed=True):
+            key = key if isinstance(key, tuple) else (key,)
+            segments = [f"{col}={quote(str(value), safe='')}" for col, value in zip(partition_cols, key)]
+            yield os.path.join(base_path, *segments), part.drop(columns=partition_cols)
+
+    def _write_part(self, directory: str, df: pd.DataFrame):
+        """Grava o arquivo da partição de forma atômica (arquivo temporário + os.replace)."""
+        os.makedirs(directory, exist_ok=True)
+        table = pa.Table.from_pandas(df.reset_index(drop=True), preserve_index=False)
+        tmp_path = os.path.join(directory, f".{PART_FILE}.{uuid.uuid4().hex[:8]}")
+        pq.write_table(table, tmp_path, compression=self.compression)
+        os.replace(tmp_path, os.path.join(directory, PART_FILE))
+
+    def ensure_unique_index(self, collection_name: str, keys: List[str]):
+        """Mantida por compatibilidade com o MongoHandler: a unicidade é garantida no upsert."""
+
+    def upsert_collection(self, collection_name: str, df: pd.DataFrame, keys: List[str]):
+        """
+        Insere ou atualiza os registros usando os campos 'keys' como chave.
+
+        Apenas as partições (localidade, ano, mês) presentes no DataFrame são
+        lidas e reescritas; em caso de chave repetida, prevalece o registro novo.
+        """
+        if df is None or df.empty:
+            print("DataFrame vazio. Nenhuma operação será realizada no armazenamento Parquet.")
+            return
+
+        partition_cols = self._partition_columns(df)
+        row_keys = [key for key in keys if key not in partition_cols]
+        written = 0
+        for directory, part in self._iter_partitions(self._collection_path(collection_name), df):
+            path = os.path.join(directory, PART_FILE)
+            if os.path.exists(path):
+                existing = pq.read_table(path, memory_map=True).to_pandas()
+                part = pd.concat([existing, part], ignore_index=True)
+                part = part.drop_duplicates(subset=row_keys, keep="last")
+            self._write_part(directory, part.sort_values("dia"))
+            written += 1
+        print(f"{len(df)} registros gravados em {written} partições da coleção Parquet '{collection_name}'.")
+
+    def overwrite_collection(self, collection_name: str, df: pd.DataFrame):
+        """Substitui a coleção inteira: grava em uma pasta temporária e troca as pastas ao final."""
+        if df is None or df.empty:
+            print("DataFrame vazio. Nenhuma operação será realizada no armazenamento Parquet.")
+            return
+
+        staging_name = f"_staging_{collection_name}_{uuid.uuid4().hex[:8]}"
+        try:
+            for directory, part in self._iter_partitions(self._collection_path(staging_name), df):
+                self._write_part(directory, part.sort_values("dia"))
+            self.promote_collection(staging_name, collection_name)
+        finally:
+            self.drop_collection(staging_name)
+        print(f"{len(df)} registros gravados e coleção Parquet '{collection_name}' substituída.")
+
+    def promote_collection(self, staging_name: str, collection_name: str) -> bool:
+        """
+        Substitui a coleção pela coleção temporária 'staging_name', já gravada (troca das pastas).
+
+        Se a temporária não tiver arquivos, nada é feito.
+
+        Returns:
+            bool: Se a coleção foi substituída.
+        """
+        dataset = self._dataset(staging_name)
+        if dataset is None or not dataset.files:
+            print(f"Coleção temporária '{staging_name}' vazia: a coleção Parquet '{collection_name}' não foi substituída.")
+            return False
+        target = self._collection_path(collection_name)
+        old = None
+        if os.path.exists(target):
+            old = os.path.join(self.root, f"_old_{collection_name}_{uuid.uuid4().hex[:8]}")
+            os.rename(target, old)
+        os.rename(self._collection_path(staging_name), target)
+        if old:
+            shutil.rmtree(old, ignore_errors=True)
+        return True
+
+    def drop_collection(self, collection_name: str):
+        """Remove a pasta da coleção, se ela existir."""
+        shutil.rmtree(self._collection_path(collection_name), ignore_errors=True)
+
+    # --- Gravações fora da ordem (backfill) ---
+    def _backfill_path(self, collection_name: str) -> str:
+        return os.path.join(self.root, BACKFILL_DIR, f"{collection_name}.json")
+
+    def mark_backfill(self, collection_name: str, first_day):
+        """Registra que foram gravados dias a partir de 'first_day' fora da ordem (ver MongoHandler.mark_backfill)."""
+        backfill = self.get_backfill(collection_name)
+        first_day = pd.Timestamp(first_day)
+        if backfill is not None:
+            first_day = min(first_day, backfill["first_day"])
+        marks = backfill["marks"] + 1 if backfill is not None else 1
+        path = self._backfill_path(collection_name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{uuid.uuid4().hex[:8]}"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"first_day": first_day.isoformat(), "marks": marks}, f)
+        os.replace(tmp_path, path)
+
+    def get_backfill(self, collection_name: str) -> Dict[str, Any] | None:
+        """Registro pendente de gravações fora da ordem ({'first_day', 'marks'}), ou None."""
+        path = self._backfill_path(collection_name)
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding="utf-8") as f:
+            backfill = json.load(f)
+        return {"first_day": pd.Timestamp(backfill["first_day"]), "marks": backfill["marks"]}
+
+    def clear_backfill(self, collection_name: str, backfill: Dict[str, Any]):
+        """Apaga o registro lido em 'get_backfill', se nenhuma gravação fora da ordem tiver sido registrada depois."""
+        current = self.get_backfill(collection_name)
+        if current is not None and current["marks"] == backfill["marks"]:
+            os.remove(self._backfill_path(collection_name))
+
+    # --- Leitura ---
+    @staticmethod
+    def _partitioning(path: str) -> ds.Partitioning:
+        """
+        Tipos explícitos das colunas de partição: 'localidade' sempre como texto.
+
+        Inferidos, nomes de localidade só com dígitos (ex.: um código IBGE)
+        virariam inteiros. A localidade só entra quando a coleção é
+        particionada por ela (pastas 'localidade=...' na raiz da coleção).
+        """
+        fields = [pa.field(YEAR_COLUMN, pa.int32()), pa.field(MONTH_COLUMN, pa.int32())]
+        if any(name.startswith(f"{LOCATION_COLUMN}=") for name in os.listdir(path)):
+            fields.insert(0, pa.field(LOCATION_COLUMN, pa.string()))
+        return ds.partitioning(pa.schema(fields), flavor="hive")
+
+    def _dataset(self, collection_name: str) -> ds.Dataset | None:
+        path = self._collection_path(collection_name)
+        if not os.path.isdir(path):
+            return None
+        return ds.dataset(path, format="parquet", partitioning=self._partitioning(path), filesystem=self._filesystem)
+
+    def get_latest_value(self, collection_name: str, field: str) -> pd.Timestamp | None:
+        """Retorna o maior valor armazenado de um campo, ou None se a coleção estiver vazia."""
+        dataset = self._dataset(collection_name)
+        if dataset is None:
+            return None
+        latest = pc.max(dataset.to_table(columns=[field])[field]).as_py()
+        return pd.Timestamp(latest) if latest is not None else None
+
+    def collection_fingerprint(self, collection_name: str, field: str = "dia") -> Dict[str, Any]:
+        """
+        Impressão digital barata do conteúdo da coleção: linhas (pelos metadados), maior 'field' e arquivos.
+
+        Toda gravação troca o arquivo da partição, então a lista de arquivos
+        com tamanho e horário de modificação muda a cada upsert ou substituição.
+        """
+        dataset = self._dataset(collection_name)
+        if dataset is None:
+            return {"count": 0, "latest": None, "files": None}
+        files = sorted((os.path.relpath(path, self.root), os.stat(path).st_size, os.stat(path).st_mtime_ns)
+                       for path in dataset.files)
+        return {
+            "count": dataset.count_rows(),
+            "latest": self.get_latest_value(collection_name, field),
+            "files": hashlib.sha256(repr(files).encode()).hexdigest(),
+        }
+
+    def get_latest_values_by(self, collection_name: str, field: str, group_field: str) -> Dict[str, pd.Timestamp]:
+        """Retorna o maior valor de 'field' para cada valor de 'group_field'."""
+        dataset = self._dataset(collection_name)
+        if dataset is None:
+            return {}
+        table = dataset.to_table(columns=[group_field, field])
+        grouped = table.group_by(group_field).aggregate([(field, "max")])
+        return {
+            str(key): pd.Timestamp(value)
+            for key, value in zip(grouped[group_field].to_pylist(), grouped[f"{field}_max"].to_pylist())
+        }
+
+    def load_dataframe(self, collection_name: str, schema: Dict[str, str], query: Dict[str, Any] = None,
+                       **kwargs) -> pd.DataFrame:
+        """
+        Carrega as colunas do 'schema' das partições que atendem à query.
+
+        Só as partições e colunas necessárias são lidas; colunas numéricas sem
+        nulos chegam ao pandas sem cópia ('split_blocks').
+        """
+        columns = list(schema)
+        dataset = self._dataset(collection_name)
+        if dataset is None:
+            df = pd.DataFrame({col: pd.Series(dtype=dtype) for col, dtype in schema.items()})
+        else:
+            table = dataset.to_table(columns=columns, filter=query_to_expression(query))
+            df = self._to_pandas(table, schema)
+        print(f"Carregados {len(df)} registros da coleção Parquet '{collection_name}' com a query: {query or {}}")
+        return df
+
+    def iter_dataframes(self, collection_name: str, schema: Dict[str, str], query: Dict[str, Any] = None,
+                        chunk_size: int = 500_000, **kwargs) -> Iterator[pd.DataFrame]:
+        """Lê a coleção como uma sequência de DataFrames de até 'chunk_size' linhas."""
+        dataset = self._dataset(collection_name)
+        if dataset is None:
+            return
+        scanner = dataset.scanner(columns=list(schema), filter=query_to_expression(query), batch_size=chunk_size)
+        pending, size = [], 0
+        for batch in scanner.to_batches():
+            pending.append(batch)
+            size += batch.num_rows
+            if size >= chunk_size:
+                yield self._to_pandas(pa.Table.from_batches(pending), schema)
+                pending, size = [], 0
+        if pending:
+            yield self._to_pandas(pa.Table.from_batches(pending), schema)
+
+    @staticmethod
+    def _to_pandas(table: pa.Table, schema: Dict[str, str]) -> pd.DataFrame:
+        df = table.to_pandas(split_blocks=True, self_destruct=True)
+        return df.astype(schema, copy=False)
@@ -0,0 +1,42 @@
+"""
+Executa as suítes de testes do projeto.
+
+Os pacotes 'data' e 'pipelines' têm cada um o seu 'src', que colidem em um
+mesmo processo; por isso cada suíte roda em um processo 'pytest' próprio, a
+partir da raiz do repositório.
+
+Uso (a partir da raiz do repositório):
+    pip install -r requirements-dev.txt
+    ./climate test
+    ./climate test -k sheets -x
+"""
+import os
+import subprocess
+import sys
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# Pastas de testes, uma por processo (a raiz 'tests' cobre o código compartilhado)
+SUITES = ("data/tests", "pipelines/tests", "tests")
+
+
+def main(args: list[str] | None = None) -> int:
+    args = sys.argv[1:] if args is None else args
+    failed = []
+    for suite in SUITES:
+        if not os.path.isdir(os.path.join(REPO_ROOT, suite)):
+            continue
+        print(f"--- Testes de '{suite}' ---", flush=True)
+        completed = subprocess.run([sys.executable, "-m", "pytest", suite, *args], cwd=REPO_ROOT)
+        # Código 5: nenhum teste selecionado (ex.: '-k' que só casa com outra suíte)
+        if completed.returncode not in (0, 5):
+            failed.append(suite)
+    if failed:
+        print(f"\n❌ Falhas em: {', '.join(failed)}.")
+        return 1
+    print("\n✅ Todas as suítes passaram.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,44 +1,461 @@
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+from datetime import date, timedelta
+from typing import TYPE_CHECKING
+
+# O código compartilhado entre os pacotes ('common') fica na raiz do repositório
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if REPO_ROOT not in sys.path:
+    sys.path.append(REPO_ROOT)
+
 from src.config import (
-    MONGO_CONNECTION_STRING, MONGO_DB_NAME, MONGO_COLLECTION_NAME, FRANCA_LATITUDE, FRANCA_LONGITUDE
+    MONGO_CONNECTION_STRING, MONGO_DB_NAME, MONGO_COLLECTION_NAME, FRANCA_LATITUDE, FRANCA_LONGITUDE,
+    MONGO_COLLECTION_HOURLY, MONGO_COLLECTION_LOCATIONS_HOURLY,
+    INCREMENTAL_OVERLAP_DAYS, OPEN_METEO_ARCHIVE_URL, MONGO_COLLECTION_LOCATIONS, LOCATIONS_FILE,
+    BATCH_MAX_WORKERS, BATCH_REQUESTS_PER_SECOND, BATCH_MAX_RETRIES, TRANSFORM_BATCH_SIZE,
+    RESPONSE_CACHE_ENABLED, RESPONSE_CACHE_PATH, RESPONSE_CACHE_MAX_MB, RESPONSE_CACHE_CHUNK_DAYS,
+    RESPONSE_CACHE_RECENT_DAYS, RESPONSE_CACHE_RECENT_TTL_HOURS, STORAGE_BACKEND, PARQUET_ROOT,
+    HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT, HTTP_MAX_RETRIES, HTTP_BACKOFF_FACTOR, HTTP_MAX_BACKOFF,
+    CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_SECONDS, INGEST_CHUNK_DAYS, INGEST_JOURNAL_PATH, INGEST_MAX_ATTEMPTS
 )
-from src.services.open_meteo_client import OpenMeteoClient
-from src.database.mongo_handler import MongoHandler
-from src.processing.data_transformer import transform_daily_data
+from src.instrumentation import stage
+
+# Os clientes HTTP, o pandas e os drivers de armazenamento são importados dentro
+# das funções que os usam, para que '--help' e a CLI respondam sem carregá-los.
+if TYPE_CHECKING:
+    from src.database.mongo_handler import MongoHandler
+    from src.database.parquet_store import ParquetStore
+    from src.services.ingestion_journal import IngestionJournal
+    from src.services.resilience import RetryPolicy
+    from src.services.response_cache import ChunkedResponseCache
+
+# Chaves de unicidade dos documentos diários (uma localidade / várias localidades)
+DAILY_KEYS = ['dia']
+LOCATION_DAILY_KEYS = ['localidade', 'dia']
+# Sufixo da coleção em que a recarga completa é gravada antes de substituir a original
+REFRESH_SUFFIX = "__refresh"
+
+
+def _build_response_cache() -> ChunkedResponseCache | None:
+    """Cria o cache local de respostas da API, se estiver habilitado."""
+    if not RESPONSE_CACHE_ENABLED:
+        return None
+    from src.services.response_cache import ChunkedResponseCache
+    return ChunkedResponseCache(
+        RESPONSE_CACHE_PATH,
+        chunk_days=RESPONSE_CACHE_CHUNK_DAYS,
+        max_bytes=RESPONSE_CACHE_MAX_MB * 1024 * 1024,
+        recent_days=RESPONSE_CACHE_RECENT_DAYS,
+        recent_ttl_seconds=RESPONSE_CACHE_RECENT_TTL_HOURS * 3600
+    )
+
+
+def _report_cache(cache: ChunkedResponseCache | None):
+    if cache is not None:
+        print(f"Cache de respostas: {cache.stats()}")
+        cache.close()
+
+
+def _retry_policy(max_retries: int = HTTP_MAX_RETRIES) -> RetryPolicy:
+    """Tempos limite e novas tentativas das requisições à API."""
+    from src.services.resilience import RetryPolicy
+    return RetryPolicy(
+        max_retries=max_retries, backoff_factor=HTTP_BACKOFF_FACTOR, max_backoff=HTTP_MAX_BACKOFF,
+        connect_timeout=HTTP_CONNECT_TIMEOUT, read_timeout=HTTP_READ_TIMEOUT
+    )
+
+
+def _open_journal() -> IngestionJournal:
+    """Abre o diário de progresso e a fila de falhas da ingestão."""
+    from src.services.ingestion_journal import IngestionJournal
+    return IngestionJournal(INGEST_JOURNAL_PATH, max_attempts=INGEST_MAX_ATTEMPTS)
+
+
+def _report_dead_letters(journal: IngestionJournal, target: str | None = None, limit: int = 20):
+    """Lista os blocos na fila de falhas (de um destino, se informado)."""
+    letters = journal.dead_letters(target)
+    if not letters:
+        print("Fila de falhas vazia.")
+        return
+    print(f"{len(letters)} blocos na fila de falhas:")
+    for letter in letters[:limit]:
+        exhausted = " (sem novas tentativas)" if letter['attempts'] >= journal.max_attempts else ""
+        location = f" [{letter['location']}]" if letter['location'] else ""
+        print(f"  {letter['target']}{location} {letter['series']} {letter['chunk_start']} a {letter['chunk_end']}: "
+              f"{letter['attempts']} tentativas{exhausted} - {letter['last_error']}")
+    if len(letters) > limit:
+        print(f"  ... e mais {len(letters) - limit}.")
+
+
+def _open_store() -> MongoHandler | ParquetStore:
+    """Abre o armazenamento configurado em STORAGE_BACKEND ('mongo' ou 'parquet')."""
+    if STORAGE_BACKEND == "parquet":
+        from src.database.parquet_store import ParquetStore
+        print(f"Armazenamento: Parquet em '{PARQUET_ROOT}'.")
+        return ParquetStore(PARQUET_ROOT)
+    from src.database.mongo_handler import MongoHandler
+    return MongoHandler(MONGO_CONNECTION_STRING, MONGO_DB_NAME)
+
+
+def _incremental_start_date(store: MongoHandler | ParquetStore,
+                            collection_name: str = MONGO_COLLECTION_NAME) -> date | None:
+    """Calcula a data inicial da busca a partir do último 'dia' armazenado (marca d'água)."""
+    latest_day = store.get_latest_value(collection_name, 'dia')
+    if latest_day is None:
+        print("Nenhum dado armazenado: será feita a carga inicial completa.")
+        return None
+
+    print(f"Último dia armazenado: {latest_day.date()}.")
+    return latest_day.date() + timedelta(days=1) - timedelta(days=INCREMENTAL_OVERLAP_DAYS)
+
+
+def _transform(weather_data: dict, hourly: bool, location_key: str | None = None):
+    """Tabela diária, ou os blocos diários da série horária (um registro por dia com arrays de 24 horas)."""
+    if not hourly:
+        from src.processing.data_transformer import transform_daily_data
+        return transform_daily_data(weather_data, location_key=location_key)
+
+    from src.processing.data_transformer import transform_hourly_data
+    from src.processing.resampling import hourly_to_buckets
+    hourly_df = transform_hourly_data(weather_data, location_key=location_key)
+    return None if hourly_df is None else hourly_to_buckets(hourly_df)
+
+
+def ingest_window(store: MongoHandler | ParquetStore, journal: IngestionJournal,
+                  cache: ChunkedResponseCache | None = None, full_refresh: bool = False, hourly: bool = False,
+                  start_date: date | None = None, end_date: date | None = None) -> dict:
+    """
+    Busca, transforma e grava a janela da localidade padrão em blocos de INGEST_CHUNK_DAYS dias.
+
+    Cada bloco é gravado de forma independente e registrado no diário da
+    ingestão: uma execução interrompida recomeça do primeiro bloco pendente, e
+    os blocos cuja busca falhou vão para a fila de falhas e são tentados de
+    novo nas execuções seguintes. Se o disjuntor abrir (API fora do ar), os
+    blocos restantes ficam para a próxima execução. Falhas na gravação são
+    levantadas.
+
+    Na recarga completa, os blocos são gravados na coleção temporária
+    '<coleção>__refresh', que só substitui a coleção quando todos os blocos do
+    job tiverem sido gravados (nesta execução ou, com a retomada, em uma
+    anterior): até lá, os leitores continuam vendo a coleção antiga inteira.
+
+    Dias gravados fora da ordem (blocos da fila de falhas, uma janela
+    explícita ou a substituição pela recarga completa) são registrados com
+    'mark_backfill', para que a próxima análise incremental refaça o estado.
+
+    Returns:
+        dict: {'chunks': blocos planejados, 'written': gravados, 'failed': na fila
+              de falhas, 'interrupted': disjuntor aberto, 'rows': linhas gravadas,
+              'replaced': coleção substituída pela recarga completa}.
+    """
+    import requests
+    from src.services.ingestion_journal import split_range
+    from src.services.open_meteo_client import DEFAULT_HISTORY_DAYS, OpenMeteoClient
+    from src.services.resilience import CircuitBreaker, CircuitOpenError
+
+    collection_name = MONGO_COLLECTION_HOURLY if hourly else MONGO_COLLECTION_NAME
+    series = 'hourly' if hourly else 'daily'
+    summary = {"chunks": 0, "written": 0, "failed": 0, "interrupted": False, "rows": 0, "replaced": False}
+
+    # Janela da execução, dividida em blocos (os da fila de falhas entram também)
+    explicit_window = start_date is not None
+    end_date = end_date or date.today()
+    if start_date is None and not full_refresh:
+        start_date = _incremental_start_date(store, collection_name)
+    start_date = start_date or (end_date - timedelta(days=DEFAULT_HISTORY_DAYS))
+    chunks = journal.plan(collection_name, "", series, start_date, end_date, INGEST_CHUNK_DAYS)
+    summary["chunks"] = len(chunks)
+    if not chunks:
+        print("Nenhum dia novo para buscar. Coleção já está atualizada.")
+        return summary
 
-def run_weather_etl():
+    # Na recarga completa, todos os blocos (os da fila também) vão para a coleção
+    # temporária, recomeçada quando o job ainda não gravou nenhum bloco.
+    job = journal.job_id(collection_name, "", series, start_date, end_date)
+    target = f"{collection_name}{REFRESH_SUFFIX}" if full_refresh else collection_name
+    if full_refresh and journal.completed(job) == 0:
+        store.drop_collection(target)
+    print(f"{len(chunks)} blocos a processar (janela {start_date} a {end_date}).")
+    store.ensure_unique_index(target, DAILY_KEYS)
+
+    with OpenMeteoClient(
+        latitude=FRANCA_LATITUDE, longitude=FRANCA_LONGITUDE, base_url=OPEN_METEO_ARCHIVE_URL, cache=cache,
+        retry=_retry_policy(), breaker=CircuitBreaker(CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_SECONDS)
+    ) as meteo_client:
+        for chunk in chunks:
+            # 1. Extração (Extract)
+            with stage("etl.extract", hourly=hourly) as st:
+                try:
+                    weather_data = meteo_client.fetch(chunk.start, chunk.end, series)
+                except CircuitOpenError as e:
+                    print(f"API indisponível, execução interrompida: {e} "
+                          "Os blocos restantes ficam para a próxima execução.")
+                    summary["interrupted"] = True
+                    break
+                except requests.exceptions.RequestException as e:
+                    print(f"Falha ao buscar o bloco {chunk.start} a {chunk.end}: {e}")
+                    journal.mark_failed(chunk, e)
+                    summary["failed"] += 1
+                    continue
+                st.rows(len(weather_data[series]['time']) if series in weather_data else 0)
+
+            # 2. Transformação (Transform)
+            with stage("etl.transform", hourly=hourly) as st:
+                weather_df = _transform(weather_data, hourly)
+                st.rows(0 if weather_df is None else len(weather_df))
+
+            if weather_df is None:
+                print(f"Falha na transformação do bloco {chunk.start} a {chunk.end}: resposta sem '{series}'.")
+                journal.mark_failed(chunk, ValueError(f"Resposta da API sem a chave '{series}'."))
+                summary["failed"] += 1
+                continue
+
+            # 3. Carregamento (Load)
+            if not weather_df.empty:
+                with stage("etl.load", backend=STORAGE_BACKEND) as st:
+                    store.upsert_collection(target, weather_df, keys=DAILY_KEYS)
+                    st.rows(len(weather_df))
+                    st.add_bytes(weather_df.memory_usage(deep=True).sum())
+                if not full_refresh and (chunk.retry or explicit_window):
+                    store.mark_backfill(collection_name, chunk.start)
+            journal.mark_done([chunk])
+            summary["written"] += 1
+            summary["rows"] += len(weather_df)
+
+    if full_refresh:
+        if journal.completed(job) == len(split_range(start_date, end_date, INGEST_CHUNK_DAYS)):
+            summary["replaced"] = store.promote_collection(target, collection_name)
+            if summary["replaced"]:
+                store.mark_backfill(collection_name, min(chunk.start for chunk in chunks))
+        else:
+            print(f"Recarga completa pendente: a coleção '{collection_name}' só será substituída quando "
+                  "todos os blocos da janela forem gravados (execute a recarga de novo para retomá-la).")
+    return summary
+
+
+@stage("etl.run")
+def run_weather_etl(full_refresh: bool = False, hourly: bool = False,
+                    start_date: date | None = None, end_date: date | None = None):
     """
     Executa o processo completo de ETL:
-    1. Extrai dados da API de clima.
+    1. Extrai dados da API de clima (apenas os dias ainda não armazenados,
+       ou a janela completa quando 'full_refresh' for verdadeiro).
     2. Transforma os dados em uma tabela limpa.
-    3. Carrega (sobrescrevendo) os dados no MongoDB.
+    3. Carrega os dados no armazenamento configurado (MongoDB ou Parquet),
+       com upsert por 'dia' ou sobrescrevendo a coleção.
+
+    As três etapas são feitas bloco a bloco, com retomada e fila de falhas
+    (ver 'ingest_window').
+
+    Com 'hourly', a série horária é gravada em MONGO_COLLECTION_HOURLY, um
+    documento por dia com um array de 24 horas por variável. 'start_date' e
+    'end_date' definem uma janela explícita (ex.: reprocessar um período).
     """
+    collection_name = MONGO_COLLECTION_HOURLY if hourly else MONGO_COLLECTION_NAME
     print("--- Iniciando processo de ETL de dados climáticos ---")
-    
-    # 1. Extração (Extract)
-    meteo_client = OpenMeteoClient(latitude=FRANCA_LATITUDE, longitude=FRANCA_LONGITUDE)
-    weather_data = meteo_client.get_daily_forecast()
+    print(f"Modo: {'recarga completa' if full_refresh else 'incremental'}, "
+          f"resolução {'horária' if hourly else 'diária'}")
 
-    if not weather_data:
-        print("Processo interrompido: não foi possível obter dados da API.")
+    summary = None
+    cache = _build_response_cache()
+    journal = _open_journal()
+    try:
+        with _open_store() as store:
+            summary = ingest_window(store, journal, cache, full_refresh, hourly, start_date, end_date)
+    except Exception as e:
+        print(f"Processo interrompido: falha na gravação dos dados. Erro: {e}")
         return
+    finally:
+        _report_cache(cache)
+        if summary and (summary["failed"] or summary["interrupted"]):
+            _report_dead_letters(journal, collection_name)
+        journal.close()
 
-    # 2. Transformação (Transform)
-    weather_df = transform_daily_data(weather_data)
-
-    if weather_df is None or weather_df.empty:
-        print("Processo interrompido: falha na transformação dos dados.")
+    if not summary["chunks"]:
+        return
+    if summary["failed"] or summary["interrupted"]:
+        print(f"\n--- ETL concluído parcialmente: {summary['written']} blocos gravados, "
+              f"{summary['failed']} na fila de falhas. ---")
         return
+    print(f"\n--- Processo de ETL concluído com sucesso! ({summary['written']} blocos gravados) ---")
+
+
+def _load_location_batch(store: MongoHandler | ParquetStore, payloads: list, hourly: bool = False,
+                         backfill_from: date | None = None) -> int:
+    """
+    Transforma um lote de respostas (chave da localidade, payload) em uma tabela e a grava.
+
+    'backfill_from' é o primeiro dia do lote gravado fora da ordem, se houver (ver 'ingest_window').
+    """
+    from src.processing.data_transformer import transform_daily_batch, transform_hourly_batch
+
+    with stage("etl.batch.transform", hourly=hourly) as st:
+        if hourly:
+            from src.processing.resampling import hourly_to_buckets
+            hourly_df, report = transform_hourly_batch(payloads)
+            weather_df = hourly_to_buckets(hourly_df)
+        else:
+            weather_df, report = transform_daily_batch(payloads)
+        st.rows(report.rows_out, rows_in=report.rows_in)
+        st.set("rows_rejected", len(report.rejected))
+    print(f"Lote de {len(payloads)} localidades: {report.summary()}")
+    if not report.rejected.empty:
+        print(report.rejected.to_string(index=False, max_rows=20))
+    if weather_df.empty:
+        return 0
+    collection_name = MONGO_COLLECTION_LOCATIONS_HOURLY if hourly else MONGO_COLLECTION_LOCATIONS
+    with stage("etl.batch.load", backend=STORAGE_BACKEND) as st:
+        store.upsert_collection(collection_name, weather_df, keys=LOCATION_DAILY_KEYS)
+        st.rows(len(weather_df))
+        st.add_bytes(weather_df.memory_usage(deep=True).sum())
+    if backfill_from is not None:
+        store.mark_backfill(collection_name, backfill_from)
+    return int(weather_df['localidade'].nunique())
+
+
+def _backfill_start(chunks: list, rewrite: bool) -> date | None:
+    """Primeiro dia do lote gravado fora da ordem (blocos da fila de falhas, ou todos com 'rewrite')."""
+    starts = [chunk.start for chunk in chunks if chunk.retry or rewrite]
+    return min(starts) if starts else None
+
+
+@stage("etl.batch")
+def run_batch_weather_etl(locations_file: str = LOCATIONS_FILE, full_refresh: bool = False, hourly: bool = False,
+                          start_date: date | None = None, end_date: date | None = None):
+    """
+    Executa o ETL para várias localidades em paralelo.
+
+    A janela de cada localidade é dividida em blocos de INGEST_CHUNK_DAYS dias,
+    buscados de forma concorrente; as respostas são agrupadas em lotes de
+    TRANSFORM_BATCH_SIZE blocos, transformadas de uma vez e gravadas (upsert
+    por localidade + dia) no armazenamento configurado. Cada lote gravado é
+    registrado no diário da ingestão, e os blocos cuja busca falhou vão para a
+    fila de falhas e são tentados de novo nas execuções seguintes.
+    Com 'full_refresh', toda a janela histórica é buscada novamente para
+    todas as localidades. Com 'hourly', a série horária é gravada em blocos
+    diários em MONGO_COLLECTION_LOCATIONS_HOURLY.
+    """
+    from src.services.batch_meteo_client import BatchOpenMeteoClient, load_locations
+    from src.services.open_meteo_client import DEFAULT_HISTORY_DAYS
+    from src.services.resilience import CircuitOpenError
 
-    # 3. Carregamento (Load)
+    print("--- Iniciando processo de ETL de dados climáticos (várias localidades) ---")
+
+    locations = load_locations(locations_file)
+    print(f"{len(locations)} localidades carregadas de '{locations_file}'.")
+
+    collection_name = MONGO_COLLECTION_LOCATIONS_HOURLY if hourly else MONGO_COLLECTION_LOCATIONS
+    series = 'hourly' if hourly else 'daily'
+    written, failed, skipped = 0, [], 0
+    cache = _build_response_cache()
+    journal = _open_journal()
     try:
-        with MongoHandler(MONGO_CONNECTION_STRING, MONGO_DB_NAME) as mongo:
-            mongo.overwrite_collection(MONGO_COLLECTION_NAME, weather_df)
+        with _open_store() as store:
+            store.ensure_unique_index(collection_name, LOCATION_DAILY_KEYS)
+
+            end_date = end_date or date.today()
+            start_dates = {}
+            if not full_refresh and start_date is None:
+                latest_days = store.get_latest_values_by(collection_name, 'dia', 'localidade')
+                start_dates = {
+                    key: latest.date() + timedelta(days=1) - timedelta(days=INCREMENTAL_OVERLAP_DAYS)
+                    for key, latest in latest_days.items()
+                }
+            default_start = start_date or (end_date - timedelta(days=DEFAULT_HISTORY_DAYS))
+            # Dias já gravados buscados de novo: uma janela explícita ou a recarga completa
+            rewrite = full_refresh or start_date is not None
+            chunks = {}
+            for location in locations:
+                for chunk in journal.plan(collection_name, location.key, series,
+                                          start_dates.get(location.key, default_start), end_date, INGEST_CHUNK_DAYS):
+                    chunks[(location, chunk.start, chunk.end)] = chunk
+            print(f"{len(chunks)} blocos a processar.")
+
+            with BatchOpenMeteoClient(
+                base_url=OPEN_METEO_ARCHIVE_URL, max_workers=BATCH_MAX_WORKERS,
+                requests_per_second=BATCH_REQUESTS_PER_SECOND, retry=_retry_policy(BATCH_MAX_RETRIES),
+                cache=cache, failure_threshold=CIRCUIT_FAILURE_THRESHOLD, reset_timeout=CIRCUIT_RESET_SECONDS
+            ) as client:
+                pending, pending_chunks = [], []
+                for requested, weather_data, error in client.iter_ranges(list(chunks), series=series):
+                    chunk = chunks[requested]
+                    if isinstance(error, CircuitOpenError):
+                        # Não chegou a ser pedido: fica para a próxima execução, fora da fila de falhas
+                        skipped += 1
+                        continue
+                    if error is not None:
+                        print(f"Falha ao buscar a localidade '{chunk.location}' ({chunk.start} a {chunk.end}): {error}")
+                        journal.mark_failed(chunk, error)
+                        failed.append(chunk)
+                        continue
+
+                    pending.append((chunk.location, weather_data))
+                    pending_chunks.append(chunk)
+                    if len(pending) >= TRANSFORM_BATCH_SIZE:
+                        _load_location_batch(store, pending, hourly, _backfill_start(pending_chunks, rewrite))
+                        journal.mark_done(pending_chunks)
+                        written += len(pending_chunks)
+                        pending, pending_chunks = [], []
+                if pending:
+                    _load_location_batch(store, pending, hourly, _backfill_start(pending_chunks, rewrite))
+                    journal.mark_done(pending_chunks)
+                    written += len(pending_chunks)
     except Exception as e:
-        print(f"Processo interrompido: falha ao carregar dados no MongoDB. Erro: {e}")
+        print(f"Processo interrompido: falha na gravação dos dados. Erro: {e}")
         return
-        
-    print("\n--- Processo de ETL concluído com sucesso! ---")
+    finally:
+        _report_cache(cache)
+        if failed or skipped:
+            _report_dead_letters(journal, collection_name)
+        journal.close()
+
+    print(f"\n--- ETL concluído: {written} blocos gravados, {len(failed)} com falha"
+          f"{f', {skipped} adiados (API indisponível)' if skipped else ''}. ---")
+    if failed:
+        print(f"Localidades com falha: {', '.join(sorted({chunk.location for chunk in failed}))}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="ETL de dados climáticos da API Open-Meteo para o MongoDB.")
+    parser.add_argument(
+        "--full-refresh", action="store_true",
+        help="Busca novamente toda a janela histórica e sobrescreve a coleção."
+    )
+    parser.add_argument(
+        "--locations", metavar="ARQUIVO", nargs="?", const=LOCATIONS_FILE,
+        help="Ingere várias localidades em paralelo a partir de um arquivo JSON "
+             f"(padrão: {LOCATIONS_FILE})."
+    )
+    parser.add_argument(
+        "--hourly", action="store_true",
+        help="Ingere a série horária, gravada como um documento por dia com arrays de 24 horas."
+    )
+    parser.add_argument(
+        "--start-date", type=date.fromisoformat, metavar="AAAA-MM-DD",
+        help="Início da janela buscada (padrão: dia seguinte ao último armazenado)."
+    )
+    parser.add_argument(
+        "--end-date", type=date.fromisoformat, metavar="AAAA-MM-DD",
+        help="Fim da janela buscada (padrão: hoje)."
+    )
+    parser.add_argument(
+        "--dead-letters", action="store_true",
+        help="Lista os blocos na fila de falhas da ingestão e sai."
+    )
+    return parser.parse_args()
 
 
 if __name__ == "__main__":
-    run_weather_etl()
\ No newline at end of file
+    args = parse_args()
+    if args.dead_letters:
+        with _open_journal() as journal:
+            _report_dead_letters(journal, limit=200)
+    elif args.locations:
+        run_batch_weather_etl(args.locations, full_refresh=args.full_refresh, hourly=args.hourly,
+                              start_date=args.start_date, end_date=args.end_date)
+    else:
+        run_weather_etl(full_refresh=args.full_refresh, hourly=args.hourly,
+                        start_date=args.start_date, end_date=args.end_date)
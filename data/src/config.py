@@ -7,11 +7,65 @@ load_dotenv()
 MONGO_CONNECTION_STRING = os.getenv("MONGO_CONNECTION_STRING")
 MONGO_DB_NAME = os.getenv("MONGO_DB_NAME")
 MONGO_COLLECTION_NAME = os.getenv("MONGO_COLLECTION_NAME")
+# Coleção usada pela ingestão de várias localidades (chave: localidade + dia)
+MONGO_COLLECTION_LOCATIONS = os.getenv("MONGO_COLLECTION_LOCATIONS", "dados_climaticos_localidades")
+
+# Dados horários: um documento por (localidade,) dia com um array de 24 horas por variável
+MONGO_COLLECTION_HOURLY = os.getenv("MONGO_COLLECTION_HOURLY", "dados_climaticos_horarios")
+MONGO_COLLECTION_LOCATIONS_HOURLY = os.getenv("MONGO_COLLECTION_LOCATIONS_HOURLY", "dados_climaticos_localidades_horarios")
+
+# --- Configuração do armazenamento dos dados diários ---
+# 'mongo' (padrão) ou 'parquet' (arquivos particionados por localidade / ano / mês)
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "mongo").lower()
+PARQUET_ROOT = os.getenv(
+    "PARQUET_ROOT", os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "warehouse"))
+)
 
 # --- Configuração da API Open-Meteo ---
+OPEN_METEO_ARCHIVE_URL = os.getenv("OPEN_METEO_ARCHIVE_URL", "https://archive-api.open-meteo.com/v1/archive")
 FRANCA_LATITUDE = -20.53
 FRANCA_LONGITUDE = -47.40
 
-# Verificação para garantir que as variáveis essenciais foram carregadas
-if not MONGO_CONNECTION_STRING:
-    raise ValueError("A variável de ambiente MONGO_CONNECTION_STRING não foi definida. Crie um arquivo .env.")
\ No newline at end of file
+# --- Configuração do cache local de respostas da API ---
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+RESPONSE_CACHE_PATH = os.getenv("RESPONSE_CACHE_PATH", ".cache/open_meteo_responses.sqlite")
+RESPONSE_CACHE_MAX_MB = int(os.getenv("RESPONSE_CACHE_MAX_MB", "256"))
+RESPONSE_CACHE_CHUNK_DAYS = int(os.getenv("RESPONSE_CACHE_CHUNK_DAYS", "30"))
+# Blocos que alcançam os últimos N dias podem ser revisados pela API e expiram após o TTL
+RESPONSE_CACHE_RECENT_DAYS = int(os.getenv("RESPONSE_CACHE_RECENT_DAYS", "10"))
+RESPONSE_CACHE_RECENT_TTL_HOURS = float(os.getenv("RESPONSE_CACHE_RECENT_TTL_HOURS", "6"))
+
+# --- Configuração da resiliência das requisições à API ---
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "30"))
+HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "4"))
+HTTP_BACKOFF_FACTOR = float(os.getenv("HTTP_BACKOFF_FACTOR", "0.5"))
+# Teto da espera entre tentativas (inclusive a pedida em 'Retry-After')
+HTTP_MAX_BACKOFF = float(os.getenv("HTTP_MAX_BACKOFF", "30"))
+# Requisições seguidas que falham (após as novas tentativas) até o disjuntor abrir, e tempo aberto
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_RESET_SECONDS = float(os.getenv("CIRCUIT_RESET_SECONDS", "60"))
+
+# --- Configuração do diário de progresso e da fila de falhas da ingestão ---
+# A janela de cada execução é buscada e gravada em blocos independentes deste tamanho
+INGEST_CHUNK_DAYS = int(os.getenv("INGEST_CHUNK_DAYS", "30"))
+INGEST_JOURNAL_PATH = os.getenv("INGEST_JOURNAL_PATH", ".cache/ingestion_journal.sqlite")
+# Execuções que ainda tentam de novo um bloco da fila de falhas antes de desistir dele
+INGEST_MAX_ATTEMPTS = int(os.getenv("INGEST_MAX_ATTEMPTS", "10"))
+
+# --- Configuração da ingestão de várias localidades ---
+# Arquivo JSON com a lista de localidades: [{"key": "franca", "latitude": -20.53, "longitude": -47.40}, ...]
+LOCATIONS_FILE = os.getenv("LOCATIONS_FILE", "locations.json")
+BATCH_MAX_WORKERS = int(os.getenv("BATCH_MAX_WORKERS", "8"))
+BATCH_REQUESTS_PER_SECOND = float(os.getenv("BATCH_REQUESTS_PER_SECOND", "5"))
+BATCH_MAX_RETRIES = int(os.getenv("BATCH_MAX_RETRIES", "4"))
+# Respostas de localidades transformadas e gravadas juntas, em uma única tabela
+TRANSFORM_BATCH_SIZE = int(os.getenv("TRANSFORM_BATCH_SIZE", "16"))
+
+# --- Configuração da ingestão incremental ---
+# Dias já armazenados que são buscados novamente a cada execução, pois o arquivo
+# histórico da API ainda pode revisar os dias mais recentes.
+INCREMENTAL_OVERLAP_DAYS = int(os.getenv("INCREMENTAL_OVERLAP_DAYS", "3"))
+
+# MONGO_CONNECTION_STRING é validada ao abrir a conexão (common.database.client.get_client),
+# para que comandos que não usam o MongoDB (ex.: --help, backend Parquet) não dependam dela.
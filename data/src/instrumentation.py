@@ -0,0 +1,7 @@
+"""
+A instrumentação por etapa é compartilhada entre 'data' e 'pipelines' e fica
+em 'common/instrumentation.py', na raiz do repositório.
+"""
+from common.instrumentation import count, record_http_response, records, stage, write_prometheus_textfile
+
+__all__ = ["count", "record_http_response", "records", "stage", "write_prometheus_textfile"]
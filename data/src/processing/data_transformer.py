@@ -1,26 +1,242 @@
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Tuple
+
+import numpy as np
 import pandas as pd
-from typing import Dict, Any
 
-def transform_daily_data(api_data: Dict[str, Any]) -> pd.DataFrame | None:
-    """Transforma a resposta JSON da API em um DataFrame Pandas limpo."""
+# Esquema da tabela diária: coluna de saída -> (campo da API, dtype).
+# O pandas não tem datetime64[D]; 'datetime64[s]' é a menor resolução disponível.
+DAILY_SCHEMA = {
+    'dia': ('time', 'datetime64[s]'),
+    'codigo_clima': ('weathercode', 'Int16'),
+    'temperatura_max_c': ('temperature_2m_max', 'float32'),
+    'temperatura_min_c': ('temperature_2m_min', 'float32'),
+    'umidade_media_percent': ('relative_humidity_2m_mean', 'float32'),
+    'indice_uv_max': ('uv_index_max', 'float32'),
+}
+MEASURE_COLUMNS = [col for col in DAILY_SCHEMA if col != 'dia']
+# Esquema da tabela horária (uma linha por hora; gravada em blocos diários, ver src/processing/resampling.py)
+HOURLY_SCHEMA = {
+    'hora': ('time', 'datetime64[s]'),
+    'codigo_clima': ('weathercode', 'Int16'),
+    'temperatura_c': ('temperature_2m', 'float32'),
+    'umidade_percent': ('relative_humidity_2m', 'float32'),
+    'indice_uv': ('uv_index', 'float32'),
+}
+
+# Faixas físicas aceitas (inclusivas); valores fora delas rejeitam a linha
+VALID_RANGES = {
+    'temperatura_max_c': (-90.0, 60.0),
+    'temperatura_min_c': (-90.0, 60.0),
+    'umidade_media_percent': (0.0, 100.0),
+    'indice_uv_max': (0.0, 25.0),
+}
+HOURLY_VALID_RANGES = {
+    'temperatura_c': (-90.0, 60.0),
+    'umidade_percent': (0.0, 100.0),
+    'indice_uv': (0.0, 25.0),
+}
+# Códigos de tempo da OMM (WMO) usados pela API
+WMO_CODES = np.array([0, 1, 2, 3, 45, 48, 51, 53, 55, 56, 57, 61, 63, 65, 66, 67,
+                      71, 73, 75, 77, 80, 81, 82, 85, 86, 95, 96, 99])
+# Unidades aceitas por campo e a conversão para a unidade armazenada
+UNIT_CONVERSIONS = {
+    'temperature_2m_max': {'°C': None, '°F': lambda v: (v - 32.0) * 5.0 / 9.0},
+    'temperature_2m_min': {'°C': None, '°F': lambda v: (v - 32.0) * 5.0 / 9.0},
+    'temperature_2m': {'°C': None, '°F': lambda v: (v - 32.0) * 5.0 / 9.0},
+    'relative_humidity_2m_mean': {'%': None},
+    'relative_humidity_2m': {'%': None},
+    'uv_index_max': {'': None},
+    'uv_index': {'': None},
+}
+
+
+@dataclass
+class TransformReport:
+    """Resumo da transformação: linhas recebidas, descartadas (sem medições) e rejeitadas."""
+    rows_in: int = 0
+    rows_out: int = 0
+    rows_empty: int = 0
+    rejected: pd.DataFrame = field(default_factory=pd.DataFrame)
+
+    def summary(self) -> str:
+        text = f"{self.rows_out} de {self.rows_in} registros válidos ({self.rows_empty} sem medições"
+        if self.rejected.empty:
+            return text + ", nenhum rejeitado)."
+        reasons = self.rejected['motivo'].str.split('; ').explode().value_counts()
+        details = ", ".join(f"{reason}: {count}" for reason, count in reasons.items())
+        return text + f", {len(self.rejected)} rejeitados — {details})."
+
+
+def _payload_columns(api_data: Dict[str, Any], schema: Dict[str, Tuple[str, str]] = DAILY_SCHEMA,
+                     series: str = 'daily') -> Dict[str, np.ndarray] | None:
+    """Extrai as colunas de uma série do payload ('daily' ou 'hourly') como arrays NumPy, nas unidades armazenadas."""
+    data = api_data.get(series) if api_data else None
+    if not data:
+        return None
+    units = api_data.get(f'{series}_units') or {}
+
+    columns = {}
+    for col, (api_field, dtype) in schema.items():
+        values = data.get(api_field)
+        if values is None:
+            values = [None] * len(data['time'])
+        if dtype.startswith('datetime64'):
+            columns[col] = np.array(values, dtype='datetime64[s]')
+            continue
+        array = np.array(values, dtype=np.float64)  # None vira NaN
+        unit = units.get(api_field)
+        if unit is not None and api_field in UNIT_CONVERSIONS:
+            if unit not in UNIT_CONVERSIONS[api_field]:
+                raise ValueError(f"Unidade '{unit}' não suportada para '{api_field}'.")
+            convert = UNIT_CONVERSIONS[api_field][unit]
+            if convert is not None:
+                array = convert(array)
+        columns[col] = array
+    return columns
+
+
+def _validate(columns: Dict[str, np.ndarray], time_column: str = 'dia',
+              ranges: Dict[str, Tuple[float, float]] = VALID_RANGES) -> np.ndarray:
+    """Retorna, por linha, o motivo da rejeição ('' para linhas válidas)."""
+    n = len(columns[time_column])
+    problems: List[Tuple[str, np.ndarray]] = [(f'{time_column} ausente', np.isnat(columns[time_column]))]
+    for col, (low, high) in ranges.items():
+        values = columns[col]
+        problems.append((f"{col} fora da faixa", ~np.isnan(values) & ((values < low) | (values > high))))
+    codes = columns['codigo_clima']
+    problems.append(('codigo_clima inválido', ~np.isnan(codes) & ~np.isin(codes, WMO_CODES)))
+    if 'temperatura_min_c' in columns:
+        problems.append(('temperatura_min_c > temperatura_max_c',
+                         columns['temperatura_min_c'] > columns['temperatura_max_c']))
+
+    reasons = np.full(n, '', dtype=object)
+    for label, mask in problems:
+        if mask.any():
+            reasons[mask] = np.where(reasons[mask] == '', label, reasons[mask] + '; ' + label)
+    return reasons
+
+
+def _transform_batch(payloads: Iterable[Tuple[str | None, Dict[str, Any]]], schema: Dict[str, Tuple[str, str]],
+                     series: str, ranges: Dict[str, Tuple[float, float]]) -> Tuple[pd.DataFrame, TransformReport]:
+    time_column = next(iter(schema))
+    measure_columns = [col for col in schema if col != time_column]
+    parts: Dict[str, List[np.ndarray]] = {col: [] for col in schema}
+    keys: List[str] = []
+    key_codes: List[np.ndarray] = []
+    for location_key, api_data in payloads:
+        columns = _payload_columns(api_data, schema, series)
+        if columns is None:
+            print(f"Dados da API inválidos ou não contêm a chave '{series}' (localidade: {location_key}).")
+            continue
+        for col, values in columns.items():
+            parts[col].append(values)
+        if location_key is not None:
+            keys.append(location_key)
+            key_codes.append(np.full(len(columns[time_column]), len(keys) - 1, dtype=np.int32))
+
+    columns = {
+        col: np.concatenate(arrays) if arrays else np.array([], dtype='datetime64[s]' if col == time_column else np.float64)
+        for col, arrays in parts.items()
+    }
+    report = TransformReport(rows_in=len(columns[time_column]))
+
+    has_measure = np.zeros(report.rows_in, dtype=bool)
+    for col in measure_columns:
+        has_measure |= ~np.isnan(columns[col])
+    reasons = _validate(columns, time_column, ranges)
+    keep = has_measure & (reasons == '')
+    report.rows_empty = int((~has_measure).sum())
+
+    location = None
+    if keys:
+        if len(keys) != len(parts[time_column]):
+            raise ValueError("Informe a chave da localidade em todos os payloads do lote ou em nenhum.")
+        categories, inverse = np.unique(np.asarray(keys, dtype=object), return_inverse=True)
+        location = pd.Categorical.from_codes(inverse[np.concatenate(key_codes)], categories=categories)
+
+    rejected_mask = has_measure & (reasons != '')
+    if rejected_mask.any():
+        rejected = {time_column: columns[time_column][rejected_mask]}
+        if location is not None:
+            rejected = {'localidade': location[rejected_mask], **rejected}
+        report.rejected = pd.DataFrame({**rejected, 'motivo': reasons[rejected_mask]})
+
+    data = {}
+    if location is not None:
+        data['localidade'] = location[keep]
+    for col, (_, dtype) in schema.items():
+        values = columns[col][keep]
+        if dtype == 'Int16':
+            data[col] = pd.array(values, dtype='Float64').astype('Int16')  # NaN vira <NA>
+        else:
+            data[col] = values.astype(dtype)
+    df = pd.DataFrame(data)
+    report.rows_out = len(df)
+    return df, report
+
+
+def transform_daily_batch(payloads: Iterable[Tuple[str | None, Dict[str, Any]]]
+                          ) -> Tuple[pd.DataFrame, TransformReport]:
+    """
+    Transforma vários payloads da API em uma única tabela validada e tipada.
+
+    As colunas de todos os payloads são concatenadas como arrays NumPy e a
+    tabela é montada uma única vez. Linhas sem nenhuma medição são descartadas;
+    linhas com valores fora das faixas físicas, código de tempo desconhecido,
+    data ausente ou mínima maior que a máxima são rejeitadas e listadas no
+    relatório com o motivo.
+
+    Args:
+        payloads: Pares (chave da localidade ou None, resposta JSON da API).
+
+    Returns:
+        tuple: (DataFrame com as colunas de DAILY_SCHEMA, e 'localidade' quando
+               houver chave; TransformReport).
+    """
+    return _transform_batch(payloads, DAILY_SCHEMA, 'daily', VALID_RANGES)
+
+
+def transform_hourly_batch(payloads: Iterable[Tuple[str | None, Dict[str, Any]]]
+                           ) -> Tuple[pd.DataFrame, TransformReport]:
+    """
+    Transforma a série horária ('hourly') de vários payloads em uma tabela com uma linha por hora.
+
+    Aplica as mesmas regras de 'transform_daily_batch' (linhas sem medições
+    descartadas; faixas físicas e códigos de tempo validados). Para gravar,
+    agrupe o resultado em blocos diários com 'hourly_to_buckets'.
+
+    Returns:
+        tuple: (DataFrame com as colunas de HOURLY_SCHEMA, e 'localidade' quando
+               houver chave; TransformReport).
+    """
+    return _transform_batch(payloads, HOURLY_SCHEMA, 'hourly', HOURLY_VALID_RANGES)
+
+
+def transform_daily_data(api_data: Dict[str, Any], location_key: str | None = None) -> pd.DataFrame | None:
+    """
+    Transforma a resposta JSON da API em um DataFrame Pandas limpo.
+
+    Se 'location_key' for informado, cada registro recebe a coluna 'localidade'
+    com essa chave (usada na ingestão de várias localidades).
+    """
     if not api_data or 'daily' not in api_data:
         print("Dados da API inválidos ou não contêm a chave 'daily'.")
         return None
-    
+
     print("Montando e transformando a tabela de dados...")
-    df = pd.DataFrame(api_data['daily'])
-
-    df.rename(columns={
-        'time': 'dia',
-        'weathercode': 'codigo_clima',
-        'temperature_2m_max': 'temperatura_max_c',
-        'temperature_2m_min': 'temperatura_min_c',
-        'relative_humidity_2m_mean': 'umidade_media_percent',
-        'uv_index_max': 'indice_uv_max'
-    }, inplace=True)
-    
-    df['dia'] = pd.to_datetime(df['dia'])
-    df.dropna(how='all', subset=df.columns[1:], inplace=True)
-
-    print(f"Tabela montada com {len(df)} registros.")
-    return df
\ No newline at end of file
+    df, report = transform_daily_batch([(location_key, api_data)])
+    print(f"Tabela montada: {report.summary()}")
+    return df
+
+
+def transform_hourly_data(api_data: Dict[str, Any], location_key: str | None = None) -> pd.DataFrame | None:
+    """Transforma a série horária da resposta JSON da API em uma tabela com uma linha por hora."""
+    if not api_data or 'hourly' not in api_data:
+        print("Dados da API inválidos ou não contêm a chave 'hourly'.")
+        return None
+
+    print("Montando e transformando a tabela horária...")
+    df, report = transform_hourly_batch([(location_key, api_data)])
+    print(f"Tabela horária montada: {report.summary()}")
+    return df
@@ -0,0 +1,11 @@
+"""
+A reamostragem dos dados horários é compartilhada entre 'data' (gravação dos
+blocos) e 'pipelines' (leitura da tabela diária) e fica em 'common/processing',
+na raiz do repositório.
+"""
+from common.processing import (
+    DAILY_AGGREGATIONS, HOURLY_COLUMNS, buckets_to_daily, hourly_to_buckets, resample_hourly_to_daily
+)
+
+__all__ = ["DAILY_AGGREGATIONS", "HOURLY_COLUMNS", "buckets_to_daily", "hourly_to_buckets",
+           "resample_hourly_to_daily"]
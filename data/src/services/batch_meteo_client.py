@@ -0,0 +1,176 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Dict, Any, Iterator, List, Tuple
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from src.services.open_meteo_client import ARCHIVE_URL, DEFAULT_HISTORY_DAYS, SERIES, TIMEZONE
+from src.instrumentation import record_http_response
+from src.services.resilience import CircuitBreaker, RetryPolicy, request_json
+from src.services.response_cache import ChunkedResponseCache
+
+
+@dataclass(frozen=True)
+class Location:
+    """Localidade a ser ingerida, identificada por uma chave única."""
+    key: str
+    latitude: float
+    longitude: float
+
+
+def load_locations(path: str) -> List[Location]:
+    """Lê a lista de localidades de um arquivo JSON ([{"key", "latitude", "longitude"}, ...])."""
+    with open(path, encoding="utf-8") as f:
+        entries = json.load(f)
+    return [Location(str(e["key"]), float(e["latitude"]), float(e["longitude"])) for e in entries]
+
+
+class RateLimiter:
+    """Limitador de taxa (token bucket) seguro para uso entre threads."""
+    def __init__(self, rate_per_second: float, burst: int = 1):
+        self._interval = 1.0 / rate_per_second if rate_per_second > 0 else 0.0
+        self._capacity = max(1, burst)
+        self._tokens = float(self._capacity)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Bloqueia até que uma requisição possa ser feita."""
+        if self._interval == 0.0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self._capacity, self._tokens + (now - self._last) / self._interval)
+                self._last = now
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return
+                wait = (1.0 - self._tokens) * self._interval
+            time.sleep(wait)
+
+
+class BatchOpenMeteoClient:
+    """
+    Cliente da API Open-Meteo para várias localidades em paralelo.
+
+    As requisições são feitas por um pool limitado de threads sobre uma única
+    'requests.Session' (conexões keep-alive reaproveitadas), respeitando um
+    limite de requisições por segundo por host, com tempos limite explícitos e
+    novas tentativas com backoff exponencial (jitter) em respostas 429/5xx e
+    falhas de rede ('retry'). Um disjuntor por host faz as requisições
+    seguintes falharem na hora quando a API parece fora do ar. Com um 'cache'
+    informado, apenas os blocos de datas ausentes são buscados.
+    """
+    def __init__(self, base_url: str = ARCHIVE_URL, max_workers: int = 8,
+                 requests_per_second: float = 5.0, retry: RetryPolicy | None = None,
+                 cache: ChunkedResponseCache | None = None,
+                 failure_threshold: int = 5, reset_timeout: float = 60.0):
+        self._base_url = base_url
+        self.cache = cache
+        self.max_workers = max_workers
+        self.retry = retry or RetryPolicy()
+        self._requests_per_second = requests_per_second
+        self._limiters: Dict[str, RateLimiter] = {}
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._failure_threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+        self._limiters_lock = threading.Lock()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.hooks["response"].append(record_http_response)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        """Fecha a sessão HTTP e suas conexões."""
+        self.session.close()
+
+    def _host_guards(self, url: str) -> Tuple[RateLimiter, CircuitBreaker]:
+        """Limitador de taxa e disjuntor do host da URL (criados no primeiro uso)."""
+        host = urlparse(url).netloc
+        with self._limiters_lock:
+            if host not in self._limiters:
+                self._limiters[host] = RateLimiter(self._requests_per_second)
+                self._breakers[host] = CircuitBreaker(self._failure_threshold, self._reset_timeout)
+            return self._limiters[host], self._breakers[host]
+
+    def fetch(self, location: Location, start_date: date, end_date: date, series: str = "daily") -> Dict[str, Any]:
+        """Busca a série ('daily' ou 'hourly') de uma localidade (via cache, quando configurado)."""
+        if self.cache is not None:
+            return self.cache.get_or_fetch(
+                location.latitude, location.longitude, SERIES[series][1],
+                start_date, end_date, lambda start, end: self._fetch_range(location, start, end, series),
+                series=series
+            )
+        return self._fetch_range(location, start_date, end_date, series)
+
+    def _fetch_range(self, location: Location, start_date: date, end_date: date,
+                     series: str = "daily") -> Dict[str, Any]:
+        params = {
+            "latitude": location.latitude,
+            "longitude": location.longitude,
+            "start_date": start_date.isoformat(),
+            "end_date": end_date.isoformat(),
+            series: SERIES[series][0],
+            "timezone": TIMEZONE
+        }
+        limiter, breaker = self._host_guards(self._base_url)
+        return request_json(self.session, self._base_url, params, self.retry, breaker, limiter)
+
+    def iter_data(self, locations: List[Location], start_dates: Dict[str, date] | None = None,
+                  end_date: date | None = None, series: str = "daily"
+                  ) -> Iterator[Tuple[Location, Dict[str, Any] | None, Exception | None]]:
+        """
+        Busca os dados de todas as localidades e os entrega conforme cada uma termina.
+
+        Args:
+            locations (list[Location]): Localidades a buscar.
+            start_dates (dict, optional): Data inicial por chave de localidade. Localidades
+                                          ausentes usam a janela padrão de 90 dias.
+            end_date (date, optional): Data final comum. Defaults to hoje.
+            series (str, optional): 'daily' ou 'hourly'. Defaults to 'daily'.
+
+        Yields:
+            tuple: (localidade, payload ou None, exceção ou None).
+        """
+        end_date = end_date or date.today()
+        start_dates = start_dates or {}
+        default_start = end_date - timedelta(days=DEFAULT_HISTORY_DAYS)
+        ranges = [(location, start_dates.get(location.key, default_start), end_date) for location in locations]
+        for (location, _, _), payload, error in self.iter_ranges(ranges, series):
+            yield location, payload, error
+
+    def iter_ranges(self, ranges: List[Tuple[Location, date, date]], series: str = "daily"
+                    ) -> Iterator[Tuple[Tuple[Location, date, date], Dict[str, Any] | None, Exception | None]]:
+        """
+        Busca intervalos de datas (localidade, início, fim) em paralelo e os entrega conforme cada um termina.
+
+        Intervalos vazios (início depois do fim) são ignorados.
+
+        Yields:
+            tuple: (intervalo pedido, payload ou None, exceção ou None).
+        """
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="open-meteo") as executor:
+            futures = {
+                executor.submit(self.fetch, location, start_date, end_date, series): (location, start_date, end_date)
+                for location, start_date, end_date in ranges if start_date <= end_date
+            }
+            for future in as_completed(futures):
+                try:
+                    yield futures[future], future.result(), None
+                except Exception as e:
+                    yield futures[future], None, e
@@ -0,0 +1,187 @@
+"""
+Diário local (SQLite) do progresso da ingestão e fila de blocos com falha (dead letter).
+
+A janela de cada execução é dividida em blocos de datas, e cada bloco é
+buscado, transformado e gravado de forma independente. Cada bloco gravado é
+registrado no diário do seu job. O job é identificado pelo destino (coleção),
+pela localidade, pela série e pela janela. Se a mesma execução for refeita
+depois de interrompida, os blocos já gravados são pulados e ela recomeça do
+primeiro bloco pendente. Um job já concluído é refeito do zero.
+
+Blocos que falharam mesmo após as novas tentativas vão para a fila de falhas,
+junto com o erro. Essa fila não depende do job: toda execução seguinte para o
+mesmo destino, localidade e série tenta de novo os blocos da fila antes da
+janela nova, até MAX_ATTEMPTS tentativas. Assim, uma falha no meio de uma
+janela não se perde quando a marca d'água das execuções incrementais passa
+por ela.
+"""
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Dict, List
+
+# Execuções que ainda podem tentar de novo um bloco da fila de falhas
+MAX_ATTEMPTS = 10
+# Registros de progresso mantidos (jobs mais antigos não são mais retomados)
+PROGRESS_RETENTION_DAYS = 30
+
+
+@dataclass(frozen=True)
+class Chunk:
+    """
+    Bloco de datas [start, end] de uma série de uma localidade ('' na ingestão de uma localidade só) e o seu job.
+
+    'retry' indica um bloco vindo da fila de falhas: os seus dias costumam ser
+    anteriores aos já gravados (uma gravação fora da ordem).
+    """
+    target: str
+    location: str
+    series: str
+    start: date
+    end: date
+    job: str = ""
+    retry: bool = False
+
+
+def split_range(start: date, end: date, chunk_days: int) -> List[tuple]:
+    """Divide [start, end] em intervalos consecutivos de até 'chunk_days' dias."""
+    ranges = []
+    while start <= end:
+        chunk_end = min(end, start + timedelta(days=chunk_days - 1))
+        ranges.append((start, chunk_end))
+        start = chunk_end + timedelta(days=1)
+    return ranges
+
+
+class IngestionJournal:
+    """Progresso por bloco e fila de falhas da ingestão, persistidos em um arquivo SQLite."""
+    def __init__(self, path: str, max_attempts: int = MAX_ATTEMPTS):
+        self.path = path
+        self.max_attempts = max_attempts
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS progress (
+                job TEXT NOT NULL,
+                chunk_start TEXT NOT NULL,
+                chunk_end TEXT NOT NULL,
+                completed_at REAL NOT NULL,
+                PRIMARY KEY (job, chunk_start, chunk_end)
+            );
+            CREATE TABLE IF NOT EXISTS dead_letters (
+                target TEXT NOT NULL,
+                location TEXT NOT NULL,
+                series TEXT NOT NULL,
+                chunk_start TEXT NOT NULL,
+                chunk_end TEXT NOT NULL,
+                job TEXT NOT NULL,
+                attempts INTEGER NOT NULL,
+                last_error TEXT,
+                first_failed_at REAL NOT NULL,
+                last_failed_at REAL NOT NULL,
+                PRIMARY KEY (target, location, series, chunk_start, chunk_end)
+            );
+        """)
+        self._conn.execute("DELETE FROM progress WHERE completed_at < ?",
+                           (time.time() - PROGRESS_RETENTION_DAYS * 86400,))
+        self._conn.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    @staticmethod
+    def job_id(target: str, location: str, series: str, start: date, end: date) -> str:
+        return f"{target}|{location}|{series}|{start.isoformat()}|{end.isoformat()}"
+
+    def plan(self, target: str, location: str, series: str, start: date | None, end: date,
+             chunk_days: int) -> List[Chunk]:
+        """
+        Blocos a processar: os da fila de falhas do destino/localidade/série e os da janela [start, end] ainda não gravados.
+
+        Os blocos da fila vêm primeiro (os dias mais antigos). 'start' None indica
+        que não há janela nova (apenas a fila). Se todos os blocos da janela já
+        foram gravados, o job é recomeçado.
+        """
+        with self._lock:
+            letters = self._conn.execute(
+                "SELECT chunk_start, chunk_end, job FROM dead_letters "
+                "WHERE target = ? AND location = ? AND series = ? AND attempts < ? ORDER BY chunk_start",
+                (target, location, series, self.max_attempts)
+            ).fetchall()
+            chunks = [Chunk(target, location, series, date.fromisoformat(first), date.fromisoformat(last), job,
+                            retry=True)
+                      for first, last, job in letters]
+            if start is None or start > end:
+                return chunks
+
+            job = self.job_id(target, location, series, start, end)
+            ranges = [(first.isoformat(), last.isoformat()) for first, last in split_range(start, end, chunk_days)]
+            done = set(self._conn.execute("SELECT chunk_start, chunk_end FROM progress WHERE job = ?", (job,)))
+            if done.issuperset(ranges):
+                self._conn.execute("DELETE FROM progress WHERE job = ?", (job,))
+                self._conn.commit()
+                done = set()
+            # Blocos já gravados neste job ou que já estão na fila (e entraram acima)
+            skip = done | {(first, last) for first, last, _ in letters}
+        for first, last in ranges:
+            if (first, last) not in skip:
+                chunks.append(Chunk(target, location, series, date.fromisoformat(first), date.fromisoformat(last), job))
+        return chunks
+
+    def completed(self, job: str) -> int:
+        """Número de blocos do job já gravados."""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM progress WHERE job = ?", (job,)).fetchone()[0]
+
+    def mark_done(self, chunks: List[Chunk]):
+        """Registra blocos gravados: entram no progresso do job e saem da fila de falhas."""
+        now = time.time()
+        with self._lock:
+            for chunk in chunks:
+                if chunk.job:
+                    self._conn.execute("INSERT OR REPLACE INTO progress VALUES (?, ?, ?, ?)",
+                                       (chunk.job, chunk.start.isoformat(), chunk.end.isoformat(), now))
+                self._conn.execute(
+                    "DELETE FROM dead_letters WHERE target = ? AND location = ? AND series = ? "
+                    "AND chunk_start = ? AND chunk_end = ?",
+                    (chunk.target, chunk.location, chunk.series, chunk.start.isoformat(), chunk.end.isoformat())
+                )
+            self._conn.commit()
+
+    def mark_failed(self, chunk: Chunk, error: Exception):
+        """Coloca o bloco na fila de falhas (ou soma uma tentativa, se ele já estiver nela)."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("""
+                INSERT INTO dead_letters VALUES (?, ?, ?, ?, ?, ?, 1, ?, ?, ?)
+                ON CONFLICT (target, location, series, chunk_start, chunk_end)
+                DO UPDATE SET attempts = attempts + 1, last_error = excluded.last_error,
+                              last_failed_at = excluded.last_failed_at
+            """, (chunk.target, chunk.location, chunk.series, chunk.start.isoformat(), chunk.end.isoformat(),
+                  chunk.job, f"{type(error).__name__}: {error}"[:500], now, now))
+            self._conn.commit()
+
+    def dead_letters(self, target: str | None = None) -> List[Dict]:
+        """Blocos na fila de falhas (de um destino, se informado), com tentativas e o último erro."""
+        query = "SELECT * FROM dead_letters"
+        params = ()
+        if target is not None:
+            query += " WHERE target = ?"
+            params = (target,)
+        with self._lock:
+            cursor = self._conn.execute(query + " ORDER BY target, location, series, chunk_start", params)
+            columns = [column[0] for column in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
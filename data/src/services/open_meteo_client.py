@@ -2,40 +2,106 @@ import requests
 from typing import Dict, Any
 from datetime import date, timedelta
 
+from src.instrumentation import record_http_response
+from src.services.resilience import CircuitBreaker, RetryPolicy, request_json
+from src.services.response_cache import ChunkedResponseCache
+
+DEFAULT_HISTORY_DAYS = 90
+ARCHIVE_URL = "https://archive-api.open-meteo.com/v1/archive"
+DAILY_VARIABLES = "weathercode,temperature_2m_max,temperature_2m_min,relative_humidity_2m_mean,uv_index_max"
+TIMEZONE = "America/Sao_Paulo"
+HOURLY_VARIABLES = "weathercode,temperature_2m,relative_humidity_2m,uv_index"
+# Assinatura das variáveis pedidas, usada como parte da chave do cache de respostas
+DAILY_CACHE_SIGNATURE = f"daily:{DAILY_VARIABLES}|tz:{TIMEZONE}"
+HOURLY_CACHE_SIGNATURE = f"hourly:{HOURLY_VARIABLES}|tz:{TIMEZONE}"
+# Série da resposta ('daily' ou 'hourly') -> (variáveis pedidas, assinatura no cache)
+SERIES = {
+    "daily": (DAILY_VARIABLES, DAILY_CACHE_SIGNATURE),
+    "hourly": (HOURLY_VARIABLES, HOURLY_CACHE_SIGNATURE),
+}
+
+
 class OpenMeteoClient:
-    """Classe para interagir com a API Open-Meteo."""
-    def __init__(self, latitude: float, longitude: float):
+    """
+    Classe para interagir com a API Open-Meteo.
+
+    As requisições usam tempos limite explícitos e novas tentativas com
+    backoff ('retry'); um disjuntor ('breaker') compartilhado entre clientes
+    do mesmo host evita insistir em uma API fora do ar.
+    """
+    def __init__(self, latitude: float, longitude: float,
+                 start_date: date | None = None, end_date: date | None = None,
+                 base_url: str = ARCHIVE_URL, cache: ChunkedResponseCache | None = None,
+                 retry: RetryPolicy | None = None, breaker: CircuitBreaker | None = None):
         # 1. Alterado para o endpoint de dados históricos
-        self._base_url = "https://archive-api.open-meteo.com/v1/archive" 
+        self._base_url = base_url
         self.latitude = latitude
         self.longitude = longitude
-        
-        # 2. Corrigida a lógica para buscar os últimos 90 dias (excluindo hoje)
-        end_date = date.today()
-        start_date = date.today() - timedelta(days=90)
-        
+        self.cache = cache
+        self.retry = retry or RetryPolicy()
+        self.breaker = breaker
+        self.session = requests.Session()
+        self.session.hooks["response"].append(record_http_response)
+
+        # 2. Por padrão busca os últimos 90 dias; a janela pode ser informada
+        #    explicitamente para buscas incrementais.
+        self.end_date = end_date or date.today()
+        self.start_date = start_date or (self.end_date - timedelta(days=DEFAULT_HISTORY_DAYS))
+
         self.params = {
-            "start_date": start_date.isoformat(),
-            "end_date": end_date.isoformat(),
-            "daily": "weathercode,temperature_2m_max,temperature_2m_min,relative_humidity_2m_mean,uv_index_max",
-            "timezone": "America/Sao_Paulo"
+            "start_date": self.start_date.isoformat(),
+            "end_date": self.end_date.isoformat(),
+            "timezone": TIMEZONE
         }
 
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        """Fecha a sessão HTTP e suas conexões."""
+        self.session.close()
+
     def get_daily_forecast(self) -> Dict[str, Any] | None:
         """Busca os dados diários da API Open-Meteo."""
-        print("Buscando dados da API Open-Meteo...")
+        return self._get_series("daily")
 
-        request_params = {
-            "latitude": self.latitude,
-            "longitude": self.longitude,
-            **self.params
-        }
+    def get_hourly_data(self) -> Dict[str, Any] | None:
+        """Busca os dados horários (série 'hourly') da API Open-Meteo."""
+        return self._get_series("hourly")
+
+    def _get_series(self, series: str) -> Dict[str, Any] | None:
+        label = "diários" if series == "daily" else "horários"
+        print(f"Buscando dados {label} da API Open-Meteo ({self.start_date} a {self.end_date})...")
 
         try:
-            response = requests.get(self._base_url, params=request_params)
-            response.raise_for_status()
+            data = self.fetch(self.start_date, self.end_date, series)
             print("Dados recebidos com sucesso!")
-            return response.json()
+            return data
         except requests.exceptions.RequestException as e:
             print(f"Erro ao buscar dados da API: {e}")
-            return None
\ No newline at end of file
+            return None
+
+    def fetch(self, start_date: date, end_date: date, series: str = "daily") -> Dict[str, Any]:
+        """Busca a série ('daily' ou 'hourly') no intervalo informado (via cache, quando configurado); levanta exceção em caso de falha."""
+        if self.cache is not None:
+            return self.cache.get_or_fetch(
+                self.latitude, self.longitude, SERIES[series][1],
+                start_date, end_date, lambda start, end: self._fetch_range(start, end, series),
+                series=series
+            )
+        return self._fetch_range(start_date, end_date, series)
+
+    def _fetch_range(self, start_date: date, end_date: date, series: str = "daily") -> Dict[str, Any]:
+        """Faz a requisição à API para o intervalo informado; levanta exceção em caso de falha."""
+        request_params = {
+            "latitude": self.latitude,
+            "longitude": self.longitude,
+            **self.params,
+            series: SERIES[series][0],
+            "start_date": start_date.isoformat(),
+            "end_date": end_date.isoformat()
+        }
+        return request_json(self.session, self._base_url, request_params, self.retry, self.breaker)
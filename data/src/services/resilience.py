@@ -0,0 +1,150 @@
+"""
+Requisições resilientes à API: tempos limite, novas tentativas e disjuntor.
+
+- Toda requisição tem tempo limite de conexão e de leitura explícitos.
+- Falhas transitórias (429/5xx, conexão recusada ou encerrada, tempo
+  esgotado) são repetidas com backoff exponencial com jitter completo (espera
+  aleatória entre zero e o teto da tentativa), o que evita que várias threads
+  ou execuções voltem a chamar a API ao mesmo tempo. 'Retry-After' é respeitado.
+- Um disjuntor (circuit breaker) por host abre após várias requisições
+  seguidas que falharam mesmo depois das novas tentativas: enquanto aberto, as
+  chamadas falham na hora com 'CircuitOpenError', sem esperar pelos tempos
+  limite. Depois de 'reset_timeout' segundos, uma requisição de teste
+  (meio-aberto) decide se ele fecha ou volta a abrir.
+"""
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Tuple
+
+import requests
+
+from src.instrumentation import count
+
+# Status HTTP que indicam falha transitória e justificam uma nova tentativa
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+# Exceções de rede tratadas como transitórias
+RETRYABLE_ERRORS = (requests.exceptions.ConnectionError, requests.exceptions.Timeout)
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """O disjuntor do host está aberto: a requisição não foi feita."""
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """Tempos limite e novas tentativas de uma requisição."""
+    max_retries: int = 4
+    backoff_factor: float = 0.5
+    max_backoff: float = 30.0
+    connect_timeout: float = 5.0
+    read_timeout: float = 30.0
+
+    @property
+    def timeout(self) -> Tuple[float, float]:
+        return self.connect_timeout, self.read_timeout
+
+    def delay(self, attempt: int, response: requests.Response | None = None) -> float:
+        """Espera antes da tentativa 'attempt + 1': 'Retry-After', se houver, ou jitter completo sobre o backoff."""
+        if response is not None and response.headers.get("Retry-After"):
+            try:
+                return min(float(response.headers["Retry-After"]), self.max_backoff)
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.max_backoff, self.backoff_factor * 2 ** attempt))
+
+
+class CircuitBreaker:
+    """Disjuntor seguro entre threads: 'closed' -> 'open' (após falhas seguidas) -> 'half_open' -> 'closed'."""
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 60.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def before_request(self):
+        """Levanta CircuitOpenError se a requisição não deve ser feita agora."""
+        with self._lock:
+            if self.state == "closed":
+                return
+            if self.state == "open" and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = "half_open"
+                self._probing = False
+            # Meio-aberto: só uma requisição de teste por vez
+            if self.state == "half_open" and not self._probing:
+                self._probing = True
+                return
+            retry_in = max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at))
+        count("http.circuit_rejected")
+        raise CircuitOpenError(f"Disjuntor aberto após {self.failures} falhas seguidas; "
+                               f"nova tentativa em {retry_in:.0f}s.")
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    count("http.circuit_opened")
+                self.state = "open"
+                self._opened_at = time.monotonic()
+
+
+def request_json(session: requests.Session, url: str, params: Dict[str, Any], policy: RetryPolicy,
+                 breaker: CircuitBreaker | None = None, limiter=None) -> Dict[str, Any]:
+    """
+    GET com tempos limite, novas tentativas e disjuntor; retorna o JSON da resposta.
+
+    Erros não transitórios (ex.: 400) são levantados na hora, sem novas
+    tentativas e sem contar para o disjuntor. Se todas as tentativas falharem,
+    ou se a requisição falhar de outra forma (ex.: resposta truncada ou JSON
+    inválido), a exceção é levantada e a falha é registrada no disjuntor, que
+    assim nunca fica preso no meio-aberto aguardando o resultado do teste.
+
+    Args:
+        limiter: Objeto com 'acquire()' chamado antes de cada tentativa (ex.: RateLimiter).
+    """
+    if breaker is not None:
+        breaker.before_request()
+    for attempt in range(policy.max_retries + 1):
+        if limiter is not None:
+            limiter.acquire()
+        response = None
+        try:
+            response = session.get(url, params=params, timeout=policy.timeout)
+            if response.status_code not in RETRYABLE_STATUS:
+                response.raise_for_status()
+                data = response.json()
+                if breaker is not None:
+                    breaker.record_success()
+                return data
+            error = requests.exceptions.HTTPError(f"{response.status_code} para {response.url}", response=response)
+        except RETRYABLE_ERRORS as e:
+            error = e
+        except requests.exceptions.HTTPError:
+            # O servidor respondeu: erros do pedido (4xx) não indicam indisponibilidade
+            if breaker is not None:
+                breaker.record_success()
+            raise
+        except Exception:
+            # Falhas não transitórias (resposta truncada, JSON inválido, redirecionamentos...)
+            if breaker is not None:
+                breaker.record_failure()
+            raise
+
+        if attempt == policy.max_retries:
+            if breaker is not None:
+                breaker.record_failure()
+            raise error
+        count("http.retries")
+        time.sleep(policy.delay(attempt, response))
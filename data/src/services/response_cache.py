@@ -0,0 +1,220 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, List, Tuple
+
+# Função que busca na API o payload de um intervalo [início, fim]
+FetchRange = Callable[[date, date], Dict[str, Any]]
+
+
+class ChunkedResponseCache:
+    """
+    Cache em disco (SQLite) das respostas (diárias ou horárias) da API Open-Meteo.
+
+    As respostas são divididas em blocos de 'chunk_days' dias alinhados ao
+    calendário, identificados por (latitude, longitude, assinatura das
+    variáveis, bloco). Janelas sobrepostas reaproveitam os blocos já
+    armazenados e só os blocos ausentes são buscados. Blocos que, quando
+    foram buscados, alcançavam os últimos 'recent_days' dias ainda podiam ser
+    revisados pela API e expiram após 'recent_ttl_seconds' (mesmo que a
+    próxima execução só aconteça depois que esses dias se tornaram
+    definitivos); os demais não expiram. Quando o tamanho total
+    passa de 'max_bytes', os blocos acessados há mais tempo são removidos (LRU).
+    """
+    def __init__(self, path: str, chunk_days: int = 30, max_bytes: int = 256 * 1024 * 1024,
+                 recent_days: int = 10, recent_ttl_seconds: float = 6 * 3600):
+        self.path = path
+        self.chunk_days = chunk_days
+        self.max_bytes = max_bytes
+        self.recent_days = recent_days
+        self.recent_ttl_seconds = recent_ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS chunks (
+                cache_key TEXT PRIMARY KEY,
+                covered_start TEXT NOT NULL,
+                covered_end TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                size INTEGER NOT NULL,
+                payload BLOB NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_chunks_last_access ON chunks (last_access)")
+        self._conn.commit()
+
+    def close(self):
+        """Fecha a conexão com o arquivo de cache."""
+        with self._lock:
+            self._conn.close()
+
+    def stats(self) -> Dict[str, int]:
+        """Retorna os contadores de acertos, faltas, expirações e remoções."""
+        with self._lock:
+            entries, total_bytes = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM chunks").fetchone()
+        return {
+            "hits": self.hits, "misses": self.misses, "expired": self.expired,
+            "evictions": self.evictions, "entries": entries, "bytes": total_bytes
+        }
+
+    # --- Blocos ---
+    def _chunk_bounds(self, index: int) -> Tuple[date, date]:
+        start = date.fromordinal(index * self.chunk_days + 1)
+        return start, start + timedelta(days=self.chunk_days - 1)
+
+    def _chunk_index(self, day: date) -> int:
+        return (day.toordinal() - 1) // self.chunk_days
+
+    @staticmethod
+    def _key(latitude: float, longitude: float, signature: str, index: int) -> str:
+        return f"{latitude:.4f}|{longitude:.4f}|{signature}|{index}"
+
+    def _was_provisional(self, covered_end: date, fetched_at: float) -> bool:
+        """O bloco foi buscado quando seus últimos dias ainda estavam entre os 'recent_days' (revisáveis)."""
+        return covered_end >= date.fromtimestamp(fetched_at) - timedelta(days=self.recent_days)
+
+    def _lookup(self, key: str, needed_end: date) -> Dict[str, Any] | None:
+        """Retorna o bloco armazenado se ele cobrir 'needed_end' e ainda for válido (contando acerto ou falta)."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT covered_end, fetched_at, payload FROM chunks WHERE cache_key = ?", (key,)
+            ).fetchone()
+            valid = row is not None and date.fromisoformat(row[0]) >= needed_end
+            if valid and self._was_provisional(date.fromisoformat(row[0]), row[1]) \
+                    and time.time() - row[1] > self.recent_ttl_seconds:
+                self.expired += 1
+                valid = False
+            if not valid:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._conn.execute("UPDATE chunks SET last_access = ? WHERE cache_key = ?", (time.time(), key))
+            self._conn.commit()
+        return json.loads(zlib.decompress(row[2]))
+
+    def _store(self, entries: List[Tuple[str, date, date, Dict[str, Any]]]):
+        """Grava os blocos e aplica a política de remoção LRU."""
+        now = time.time()
+        with self._lock:
+            for key, covered_start, covered_end, chunk in entries:
+                blob = zlib.compress(json.dumps(chunk, separators=(",", ":")).encode("utf-8"))
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO chunks VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (key, covered_start.isoformat(), covered_end.isoformat(), now, now, len(blob), blob)
+                )
+
+            total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM chunks").fetchone()[0]
+            if total > self.max_bytes:
+                for key, size in self._conn.execute(
+                    "SELECT cache_key, size FROM chunks ORDER BY last_access ASC"
+                ).fetchall():
+                    if total <= self.max_bytes:
+                        break
+                    self._conn.execute("DELETE FROM chunks WHERE cache_key = ?", (key,))
+                    total -= size
+                    self.evictions += 1
+            self._conn.commit()
+
+    # --- Divisão e montagem dos payloads ---
+    def _split_payload(self, payload: Dict[str, Any], indexes: List[int],
+                       series: str = "daily") -> Dict[int, Dict[str, Any]]:
+        """Divide a série ('daily' ou 'hourly') de um payload entre os blocos informados."""
+        data = payload.get(series) or {}
+        times = data.get("time") or []
+        metadata = {k: v for k, v in payload.items() if k != series}
+        positions: Dict[int, List[int]] = {index: [] for index in indexes}
+        for position, day in enumerate(times):
+            index = self._chunk_index(date.fromisoformat(day[:10]))
+            if index in positions:
+                positions[index].append(position)
+
+        return {
+            index: {**metadata, series: {name: [values[p] for p in chunk_positions] for name, values in data.items()}}
+            for index, chunk_positions in positions.items()
+        }
+
+    @staticmethod
+    def _merge_chunks(chunks: List[Dict[str, Any]], start: date, end: date, series: str = "daily") -> Dict[str, Any]:
+        """Concatena os blocos na ordem e recorta a série para [start, end] (horários: pelo dia de cada hora)."""
+        merged = {k: v for k, v in chunks[0].items() if k != series}
+        names = list(chunks[0][series].keys())
+        data = {name: [] for name in names}
+        first, last = start.isoformat(), end.isoformat()
+        for chunk in chunks:
+            chunk_data = chunk[series]
+            for position, day in enumerate(chunk_data.get("time", [])):
+                if first <= day[:10] <= last:
+                    for name in names:
+                        data[name].append(chunk_data[name][position])
+        merged[series] = data
+        return merged
+
+    def get_or_fetch(self, latitude: float, longitude: float, signature: str,
+                     start: date, end: date, fetch: FetchRange, series: str = "daily") -> Dict[str, Any]:
+        """
+        Retorna o payload de [start, end], buscando na API apenas os blocos ausentes.
+
+        'series' é a chave da série no payload ('daily' ou 'hourly'); a
+        'signature' deve identificar a série e as variáveis pedidas.
+
+        Blocos ausentes consecutivos são buscados em uma única requisição. Datas
+        futuras não são pedidas à API: o fim de cada busca é limitado a hoje, e
+        blocos que começam depois de hoje são pulados. Uma janela inteiramente
+        no futuro devolve a série vazia sem requisição.
+        """
+        today = date.today()
+        if start > today:
+            print(f"Janela {start} a {end} no futuro: nada a buscar na API.")
+            return {series: {"time": []}}
+        first_index, last_index = self._chunk_index(start), self._chunk_index(end)
+
+        chunks: Dict[int, Dict[str, Any]] = {}
+        missing: List[int] = []
+        for index in range(first_index, last_index + 1):
+            chunk_start, chunk_end = self._chunk_bounds(index)
+            if chunk_start > today:
+                break  # Este bloco e os seguintes ainda não têm dados
+            needed_end = min(chunk_end, end if index == last_index else chunk_end, today)
+            cached = self._lookup(self._key(latitude, longitude, signature, index), needed_end)
+            if cached is None:
+                missing.append(index)
+            else:
+                chunks[index] = cached
+
+        # Agrupa blocos ausentes consecutivos em intervalos contínuos
+        runs: List[List[int]] = []
+        for index in missing:
+            if runs and runs[-1][-1] == index - 1:
+                runs[-1].append(index)
+            else:
+                runs.append([index])
+
+        for run in runs:
+            fetch_start = self._chunk_bounds(run[0])[0]
+            fetch_end = min(self._chunk_bounds(run[-1])[1], today)
+            payload = fetch(fetch_start, fetch_end)
+            fetched = self._split_payload(payload, run, series)
+
+            entries = []
+            for index, chunk in fetched.items():
+                chunk_start, chunk_end = self._chunk_bounds(index)
+                entries.append((self._key(latitude, longitude, signature, index),
+                                chunk_start, min(chunk_end, fetch_end), chunk))
+                chunks[index] = chunk
+            self._store(entries)
+
+        return self._merge_chunks([chunks[index] for index in sorted(chunks)], start, end, series)
@@ -0,0 +1,39 @@
+"""
+Etapas do ETL executadas pelo orquestrador (ver common/orchestration).
+
+Cada função recebe as saídas das etapas de que depende ('inputs', pelo nome da
+etapa) e os parâmetros que declara ('params'), e retorna a própria saída, que
+é gravada como checkpoint. Ao contrário de 'main.py', as falhas não são
+tratadas aqui: elas interrompem a etapa, que é retomada na próxima execução.
+"""
+from datetime import date
+from typing import Any, Dict
+
+# 'main' vem antes de 'src': ele coloca a raiz do repositório (com 'common') no sys.path
+from main import _build_response_cache, _open_journal, _open_store, _report_cache, _report_dead_letters, ingest_window
+from src.config import MONGO_COLLECTION_NAME, STORAGE_BACKEND
+
+
+def ingest(inputs: Dict[str, Any], params: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Busca, transforma e grava os dias ainda não armazenados (ou toda a janela, com 'full_refresh').
+
+    Usa o mesmo fluxo em blocos de 'main.py' (ver 'ingest_window'): os blocos
+    gravados ficam no diário da ingestão, e se algum bloco falhar ou o
+    disjuntor abrir a etapa falha, para que a próxima execução retome só os
+    blocos pendentes e os da fila de falhas.
+    """
+    end_date = date.fromisoformat(params["run_date"])
+    cache = _build_response_cache()
+    journal = _open_journal()
+    try:
+        with _open_store() as store:
+            summary = ingest_window(store, journal, cache, full_refresh=params["full_refresh"], end_date=end_date)
+        if summary["failed"] or summary["interrupted"]:
+            _report_dead_letters(journal, MONGO_COLLECTION_NAME)
+            raise RuntimeError(f"Ingestão incompleta: {summary['written']} de {summary['chunks']} blocos gravados "
+                               f"({summary['failed']} na fila de falhas). Execute novamente para retomar.")
+    finally:
+        _report_cache(cache)
+        journal.close()
+    return {**summary, "backend": STORAGE_BACKEND}
@@ -0,0 +1,49 @@
+"""
+Configuração dos testes do pacote 'data'.
+
+Os testes importam os módulos como os scripts do pacote ('main', 'src.*',
+'tools.*'), com a pasta do pacote e a raiz do repositório no sys.path. Como
+'pipelines' também tem um pacote 'src', cada suíte roda em um processo
+próprio ('./climate test').
+"""
+import os
+import sys
+import threading
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+PACKAGE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+REPO_ROOT = os.path.dirname(PACKAGE_DIR)
+for path in (REPO_ROOT, PACKAGE_DIR):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+
+@pytest.fixture
+def stub_api():
+    """
+    Servidor stub da API Open-Meteo em uma porta livre, rodando em uma thread.
+
+    Devolve a classe do handler (uma subclasse nova por teste), cujos atributos
+    configuram as falhas injetadas ('fail_dates', 'outage_after', ...); a URL
+    do endpoint fica em 'url' e o total de requisições recebidas em 'requests'.
+    """
+    from tools.stub_open_meteo_server import StubHandler
+
+    class Handler(StubHandler):
+        _lock = threading.Lock()
+        requests = 0
+
+        def do_GET(self):
+            with Handler._lock:
+                Handler.requests += 1
+            super().do_GET()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    thread.start()
+    Handler.url = f"http://127.0.0.1:{server.server_address[1]}/v1/archive"
+    yield Handler
+    server.shutdown()
+    server.server_close()
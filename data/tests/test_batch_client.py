@@ -0,0 +1,108 @@
+import threading
+import time
+from datetime import date
+
+import pytest
+
+from src.services.batch_meteo_client import BatchOpenMeteoClient, Location, RateLimiter
+from src.services.resilience import RetryPolicy
+
+NO_BACKOFF = RetryPolicy(max_retries=2, backoff_factor=0.0, connect_timeout=2.0, read_timeout=5.0)
+LOCATIONS = [Location(f"loc{i}", -20.0 - i, -47.0 - i) for i in range(6)]
+
+
+def test_rate_limiter_spaces_requests():
+    limiter = RateLimiter(rate_per_second=20)
+    start = time.monotonic()
+    for _ in range(6):
+        limiter.acquire()
+    # O primeiro sai na hora; os outros cinco esperam 1/20 s cada
+    assert time.monotonic() - start >= 5 / 20 * 0.9
+
+
+def test_rate_limiter_is_shared_between_threads():
+    limiter = RateLimiter(rate_per_second=50)
+    acquired = []
+
+    def worker():
+        for _ in range(3):
+            limiter.acquire()
+            acquired.append(time.monotonic())
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    acquired.sort()
+    assert len(acquired) == 12
+    assert acquired[-1] - acquired[0] >= 11 / 50 * 0.9
+
+
+def test_rate_limiter_without_rate_does_not_wait():
+    limiter = RateLimiter(rate_per_second=0)
+    start = time.monotonic()
+    for _ in range(100):
+        limiter.acquire()
+    assert time.monotonic() - start < 0.05
+
+
+def test_iter_data_fetches_every_location(stub_api):
+    with BatchOpenMeteoClient(base_url=stub_api.url, max_workers=4, requests_per_second=0, retry=NO_BACKOFF) as client:
+        results = list(client.iter_data(LOCATIONS, {"loc0": date(2024, 1, 20)}, end_date=date(2024, 1, 31)))
+
+    assert sorted(location.key for location, _, _ in results) == [location.key for location in LOCATIONS]
+    for location, payload, error in results:
+        assert error is None
+        assert (payload["latitude"], payload["longitude"]) == (location.latitude, location.longitude)
+        # 'loc0' começa na data informada; as demais usam a janela padrão de 90 dias
+        expected_days = 12 if location.key == "loc0" else 91
+        assert len(payload["daily"]["time"]) == expected_days
+    assert stub_api.requests == len(LOCATIONS)
+
+
+def test_iter_data_respects_the_host_rate_limit(stub_api):
+    with BatchOpenMeteoClient(base_url=stub_api.url, max_workers=6, requests_per_second=20, retry=NO_BACKOFF) as client:
+        start = time.monotonic()
+        results = list(client.iter_data(LOCATIONS, end_date=date(2024, 1, 31)))
+        elapsed = time.monotonic() - start
+
+    assert all(error is None for _, _, error in results)
+    assert elapsed >= (len(LOCATIONS) - 1) / 20 * 0.9
+
+
+def test_iter_ranges_reports_failures_per_range_and_skips_empty_ones(stub_api):
+    stub_api.fail_dates = frozenset({"2024-03-05"})
+    ranges = [
+        (LOCATIONS[0], date(2024, 1, 1), date(2024, 1, 31)),
+        (LOCATIONS[1], date(2024, 3, 1), date(2024, 3, 10)),
+        (LOCATIONS[2], date(2024, 2, 1), date(2024, 1, 1)),  # vazio: início depois do fim
+    ]
+    with BatchOpenMeteoClient(base_url=stub_api.url, max_workers=2, requests_per_second=0, retry=NO_BACKOFF) as client:
+        results = {requested[0].key: (payload, error) for requested, payload, error in client.iter_ranges(ranges)}
+
+    assert sorted(results) == ["loc0", "loc1"]
+    assert len(results["loc0"][0]["daily"]["time"]) == 31 and results["loc0"][1] is None
+    assert results["loc1"][0] is None and "500" in str(results["loc1"][1])
+    # Erro 500 é transitório: a janela com falha é tentada 1 + max_retries vezes
+    assert stub_api.requests == 1 + NO_BACKOFF.max_retries + 1
+
+
+def test_breaker_stops_requests_to_a_failing_host(stub_api):
+    stub_api.outage_after, stub_api.outage_requests = 0, 0
+    with BatchOpenMeteoClient(base_url=stub_api.url, max_workers=1, requests_per_second=0, retry=NO_BACKOFF,
+                              failure_threshold=2, reset_timeout=60) as client:
+        results = list(client.iter_data(LOCATIONS, end_date=date(2024, 1, 31)))
+
+    errors = [type(error).__name__ for _, _, error in results]
+    assert errors.count("HTTPError") == 2
+    assert errors.count("CircuitOpenError") == len(LOCATIONS) - 2
+    assert stub_api.requests == 2 * (NO_BACKOFF.max_retries + 1)
+
+
+@pytest.mark.parametrize("series, key, per_day", [("daily", "daily", 1), ("hourly", "hourly", 24)])
+def test_fetch_series(stub_api, series, key, per_day):
+    with BatchOpenMeteoClient(base_url=stub_api.url, requests_per_second=0, retry=NO_BACKOFF) as client:
+        payload = client.fetch(LOCATIONS[0], date(2024, 1, 1), date(2024, 1, 3), series)
+    assert len(payload[key]["time"]) == 3 * per_day
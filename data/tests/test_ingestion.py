@@ -0,0 +1,93 @@
+from datetime import date, timedelta
+
+import pandas as pd
+import pytest
+
+import main
+from src.database.parquet_store import ParquetStore
+from src.services.ingestion_journal import IngestionJournal, split_range
+
+COLLECTION = "dados_climaticos"
+SCHEMA = {"dia": "datetime64[ns]", "temperatura_max_c": "float64"}
+START, END = date(2024, 1, 1), date(2024, 2, 29)  # 60 dias, 6 blocos de 10
+
+
+@pytest.fixture
+def ingestion(stub_api, tmp_path, monkeypatch):
+    """Configura 'main' para buscar no stub, em blocos de 10 dias, sem espera entre tentativas."""
+    monkeypatch.setattr(main, "OPEN_METEO_ARCHIVE_URL", stub_api.url)
+    monkeypatch.setattr(main, "MONGO_COLLECTION_NAME", COLLECTION)
+    monkeypatch.setattr(main, "INGEST_CHUNK_DAYS", 10)
+    monkeypatch.setattr(main, "HTTP_BACKOFF_FACTOR", 0.0)
+    monkeypatch.setattr(main, "CIRCUIT_FAILURE_THRESHOLD", 1)
+    with ParquetStore(str(tmp_path / "warehouse")) as store, \
+            IngestionJournal(str(tmp_path / "journal.sqlite")) as journal:
+        yield store, journal
+
+
+def _stored_days(store) -> list:
+    return [day.date() for day in store.load_dataframe(COLLECTION, SCHEMA)["dia"].sort_values()]
+
+
+def _all_days(start: date = START, end: date = END) -> list:
+    return [start + timedelta(days=i) for i in range((end - start).days + 1)]
+
+
+def test_interrupted_run_resumes_from_the_journal(ingestion, stub_api):
+    store, journal = ingestion
+    retries = main.HTTP_MAX_RETRIES + 1
+    # Três blocos passam; o quarto falha em todas as tentativas e o disjuntor abre
+    stub_api.outage_after, stub_api.outage_requests = 3, retries
+
+    first = main.ingest_window(store, journal, start_date=START, end_date=END)
+
+    assert first["interrupted"] is True
+    assert (first["written"], first["failed"]) == (3, 1)
+    assert _stored_days(store) == _all_days(START, START + timedelta(days=29))
+    assert [letter["chunk_start"] for letter in journal.dead_letters()] == ["2024-01-31"]
+
+    requests_before = stub_api.requests
+    second = main.ingest_window(store, journal, start_date=START, end_date=END)
+
+    # Só o bloco da fila de falhas e os dois não tentados são buscados de novo
+    assert (second["chunks"], second["written"], second["failed"]) == (3, 3, 0)
+    assert stub_api.requests - requests_before == 3
+    assert _stored_days(store) == _all_days()
+    assert journal.dead_letters() == []
+    assert journal.completed(journal.job_id(COLLECTION, "", "daily", START, END)) == len(split_range(START, END, 10))
+
+
+def test_dead_letter_is_retried_by_the_next_incremental_run(ingestion, stub_api, monkeypatch):
+    store, journal = ingestion
+    monkeypatch.setattr(main, "CIRCUIT_FAILURE_THRESHOLD", 5)
+    stub_api.fail_dates = frozenset({"2024-01-15"})
+
+    first = main.ingest_window(store, journal, start_date=START, end_date=END)
+    assert (first["written"], first["failed"]) == (5, 1)
+    assert date(2024, 1, 15) not in _stored_days(store)
+    store.clear_backfill(COLLECTION, store.get_backfill(COLLECTION))
+
+    # A marca d'água já passou pelo bloco com falha; a próxima execução o busca da fila
+    stub_api.fail_dates = frozenset()
+    second = main.ingest_window(store, journal, end_date=END)
+
+    assert second["failed"] == 0
+    assert _stored_days(store) == _all_days()
+    assert journal.dead_letters() == []
+    # Bloco gravado fora da ordem: a próxima análise incremental refaz o estado
+    assert store.get_backfill(COLLECTION)["first_day"] == pd.Timestamp("2024-01-11")
+
+
+def test_dead_letter_gives_up_after_max_attempts(ingestion, stub_api, tmp_path, monkeypatch):
+    store, _ = ingestion
+    monkeypatch.setattr(main, "CIRCUIT_FAILURE_THRESHOLD", 5)
+    stub_api.fail_dates = frozenset({"2024-01-15"})
+    with IngestionJournal(str(tmp_path / "limited.sqlite"), max_attempts=2) as journal:
+        main.ingest_window(store, journal, start_date=START, end_date=END)
+        # Execuções incrementais: a janela nova começa depois do bloco com falha
+        for _ in range(2):
+            main.ingest_window(store, journal, end_date=END)
+
+        letters = journal.dead_letters()
+        assert [(letter["chunk_start"], letter["attempts"]) for letter in letters] == [("2024-01-11", 2)]
+        assert journal.plan(COLLECTION, "", "daily", None, END, 10) == []
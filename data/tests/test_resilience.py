@@ -0,0 +1,99 @@
+import time
+
+import pytest
+import requests
+
+from src.services.resilience import CircuitBreaker, CircuitOpenError, RetryPolicy, request_json
+
+# Sem espera entre as tentativas
+NO_BACKOFF = RetryPolicy(max_retries=3, backoff_factor=0.0, connect_timeout=2.0, read_timeout=5.0)
+PARAMS = {"latitude": -20.53, "longitude": -47.40, "start_date": "2024-01-01", "end_date": "2024-01-05",
+          "daily": "temperature_2m_max"}
+
+
+def _get(stub_api, breaker=None, policy=NO_BACKOFF, limiter=None):
+    with requests.Session() as session:
+        return request_json(session, stub_api.url, PARAMS, policy, breaker, limiter)
+
+
+def test_retries_503_then_succeeds(stub_api):
+    stub_api.outage_after, stub_api.outage_requests = 0, 2
+    breaker = CircuitBreaker(failure_threshold=1)
+
+    data = _get(stub_api, breaker)
+
+    assert len(data["daily"]["time"]) == 5
+    assert stub_api.requests == 3
+    assert breaker.state == "closed" and breaker.failures == 0
+
+
+def test_gives_up_after_max_retries_and_counts_a_failure(stub_api):
+    stub_api.outage_after, stub_api.outage_requests = 0, 0
+    breaker = CircuitBreaker(failure_threshold=2)
+
+    with pytest.raises(requests.exceptions.HTTPError, match="503"):
+        _get(stub_api, breaker)
+
+    assert stub_api.requests == NO_BACKOFF.max_retries + 1
+    assert breaker.state == "closed" and breaker.failures == 1
+
+
+def test_client_errors_are_not_retried_and_do_not_trip_the_breaker(stub_api):
+    breaker = CircuitBreaker(failure_threshold=1)
+    with requests.Session() as session, pytest.raises(requests.exceptions.HTTPError, match="400"):
+        request_json(session, stub_api.url, {"latitude": "x"}, NO_BACKOFF, breaker)
+    assert stub_api.requests == 1
+    assert breaker.state == "closed"
+
+
+def test_breaker_opens_then_half_open_probe_closes_it(stub_api):
+    policy = RetryPolicy(max_retries=0, connect_timeout=2.0, read_timeout=5.0)
+    stub_api.outage_after, stub_api.outage_requests = 0, 2
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.2)
+
+    for _ in range(2):
+        with pytest.raises(requests.exceptions.HTTPError):
+            _get(stub_api, breaker, policy)
+    assert breaker.state == "open"
+
+    # Aberto: falha na hora, sem chegar ao servidor
+    with pytest.raises(CircuitOpenError):
+        _get(stub_api, breaker, policy)
+    assert stub_api.requests == 2
+
+    # Depois de 'reset_timeout', a requisição de teste (meio-aberto) passa e fecha o disjuntor
+    time.sleep(0.25)
+    assert len(_get(stub_api, breaker, policy)["daily"]["time"]) == 5
+    assert breaker.state == "closed" and breaker.failures == 0
+    assert stub_api.requests == 3
+
+
+def test_failed_half_open_probe_reopens_the_breaker(stub_api):
+    policy = RetryPolicy(max_retries=0, connect_timeout=2.0, read_timeout=5.0)
+    stub_api.outage_after, stub_api.outage_requests = 0, 0
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.2)
+
+    with pytest.raises(requests.exceptions.HTTPError):
+        _get(stub_api, breaker, policy)
+    time.sleep(0.25)
+    breaker.before_request()
+    assert breaker.state == "half_open"
+    # Só uma requisição de teste por vez no meio-aberto
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request()
+    breaker.record_failure()
+
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        _get(stub_api, breaker, policy)
+    assert stub_api.requests == 1
+
+
+def test_retry_after_header_is_respected():
+    policy = RetryPolicy(backoff_factor=100.0, max_backoff=2.0)
+    response = requests.Response()
+    response.headers["Retry-After"] = "1.5"
+    assert policy.delay(0, response) == 1.5
+    response.headers["Retry-After"] = "600"
+    assert policy.delay(0, response) == 2.0
+    assert 0.0 <= policy.delay(10) <= 2.0
@@ -0,0 +1,64 @@
+from datetime import date, timedelta
+
+import pytest
+
+from src.services.open_meteo_client import DAILY_CACHE_SIGNATURE
+from src.services.response_cache import ChunkedResponseCache
+from tools.stub_open_meteo_server import build_daily_payload
+
+LAT, LON = -20.53, -47.40
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ChunkedResponseCache(str(tmp_path / "cache.sqlite"), chunk_days=30)
+    yield cache
+    cache.close()
+
+
+class RecordingFetch:
+    """Busca falsa que registra os intervalos pedidos e responde com o payload do stub."""
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, start: date, end: date) -> dict:
+        self.calls.append((start, end))
+        return build_daily_payload(LAT, LON, start, end)
+
+
+def _get(cache, fetch, start, end):
+    return cache.get_or_fetch(LAT, LON, DAILY_CACHE_SIGNATURE, start, end, fetch)
+
+
+def test_missing_chunks_are_fetched_once_and_then_served_from_disk(cache):
+    fetch = RecordingFetch()
+    start, end = date(2024, 1, 10), date(2024, 3, 20)
+
+    first = _get(cache, fetch, start, end)
+    second = _get(cache, fetch, start + timedelta(days=5), end)
+
+    assert len(fetch.calls) == 1
+    assert first["daily"]["time"][0] == "2024-01-10" and first["daily"]["time"][-1] == "2024-03-20"
+    assert second["daily"]["time"] == first["daily"]["time"][5:]
+    assert cache.hits > 0
+
+
+def test_window_in_the_future_makes_no_request(cache):
+    fetch = RecordingFetch()
+    start = date.today() + timedelta(days=40)
+
+    payload = _get(cache, fetch, start, start + timedelta(days=10))
+
+    assert fetch.calls == []
+    assert payload["daily"]["time"] == []
+
+
+def test_window_crossing_today_stops_at_today(cache):
+    fetch = RecordingFetch()
+    today = date.today()
+
+    payload = _get(cache, fetch, today - timedelta(days=5), today + timedelta(days=70))
+
+    assert len(fetch.calls) == 1
+    assert fetch.calls[0][1] == today
+    assert payload["daily"]["time"][-1] == today.isoformat()
@@ -0,0 +1,217 @@
+"""
+Servidor HTTP local que imita o endpoint de arquivo da API Open-Meteo.
+
+Gera dados diários ou horários sintéticos (determinísticos por coordenada e
+dia) para a janela pedida, permitindo testar a ingestão sem acesso à rede. Também pode
+injetar falhas para exercitar as novas tentativas, o disjuntor e a fila de falhas:
+
+- '--fail-rate': respostas 429/503 aleatórias; '--latency': atraso em toda resposta;
+- '--hang-rate' / '--hang-seconds': respostas que demoram mais que o tempo limite de leitura;
+- '--drop-rate': conexões encerradas sem resposta;
+- '--truncate-rate': respostas 200 cortadas no meio do corpo (ChunkedEncodingError no cliente);
+- '--garbage-rate': respostas 200 com corpo que não é JSON;
+- '--fail-dates': erro 500 em toda requisição cuja janela contém um desses dias;
+- '--outage-after N' / '--outage-requests M': depois de N respostas com sucesso, as M
+  requisições seguintes (todas, com 0) recebem 503, simulando a API fora do ar.
+
+Uso:
+    python tools/stub_open_meteo_server.py --port 8085 --fail-rate 0.2
+    python tools/stub_open_meteo_server.py --port 8085 --fail-dates 2024-03-10 --outage-after 20
+    OPEN_METEO_ARCHIVE_URL=http://127.0.0.1:8085/v1/archive python main.py --locations
+"""
+import argparse
+import json
+import math
+import socket
+import random
+import threading
+import time
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+
+def build_daily_payload(latitude: float, longitude: float, start: date, end: date) -> dict:
+    """Monta um payload no formato da API com valores sintéticos."""
+    days = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+    seed = hash((round(latitude, 2), round(longitude, 2)))
+    daily = {
+        "time": [], "weathercode": [], "temperature_2m_max": [], "temperature_2m_min": [],
+        "relative_humidity_2m_mean": [], "uv_index_max": []
+    }
+    for day in days:
+        rng = random.Random(hash((seed, day.toordinal())))
+        season = math.cos(2 * math.pi * (day.timetuple().tm_yday - 15) / 365.25)
+        t_max = 28 + 4 * season + rng.gauss(0, 1.5)
+        daily["time"].append(day.isoformat())
+        daily["weathercode"].append(rng.choice([0, 1, 2, 3, 51, 61, 63, 80, 95]))
+        daily["temperature_2m_max"].append(round(t_max, 1))
+        daily["temperature_2m_min"].append(round(t_max - 9 - rng.random() * 3, 1))
+        daily["relative_humidity_2m_mean"].append(round(min(100, max(10, 65 + 15 * season + rng.gauss(0, 8))), 0))
+        daily["uv_index_max"].append(round(max(0, 9 + 3 * season + rng.gauss(0, 1)), 2))
+    return {
+        "latitude": latitude, "longitude": longitude, "timezone": "America/Sao_Paulo",
+        "daily_units": {
+            "time": "iso8601", "weathercode": "wmo code", "temperature_2m_max": "°C",
+            "temperature_2m_min": "°C", "relative_humidity_2m_mean": "%", "uv_index_max": ""
+        },
+        "daily": daily
+    }
+
+
+def build_hourly_payload(latitude: float, longitude: float, start: date, end: date) -> dict:
+    """Monta um payload horário ('hourly'), com ciclo diário de temperatura, umidade e UV."""
+    seed = hash((round(latitude, 2), round(longitude, 2)))
+    hourly = {"time": [], "weathercode": [], "temperature_2m": [], "relative_humidity_2m": [], "uv_index": []}
+    for offset in range((end - start).days + 1):
+        day = start + timedelta(days=offset)
+        rng = random.Random(hash((seed, day.toordinal())))
+        season = math.cos(2 * math.pi * (day.timetuple().tm_yday - 15) / 365.25)
+        mean = 23 + 3 * season + rng.gauss(0, 1.5)
+        for hour in range(24):
+            # Mínima por volta das 5h, máxima por volta das 15h; UV só com o sol acima do horizonte
+            cycle = -math.cos(2 * math.pi * (hour - 5) / 24)
+            hourly["time"].append(f"{day.isoformat()}T{hour:02d}:00")
+            hourly["weathercode"].append(rng.choice([0, 1, 2, 3, 51, 61, 63, 80, 95]))
+            hourly["temperature_2m"].append(round(mean + 5 * cycle + rng.gauss(0, 0.5), 1))
+            hourly["relative_humidity_2m"].append(round(min(100, max(10, 65 + 15 * season - 20 * cycle)), 0))
+            sun = max(0.0, math.sin(math.pi * (hour - 6) / 12)) if 6 <= hour <= 18 else 0.0
+            hourly["uv_index"].append(round((9 + 3 * season) * sun, 2))
+    return {
+        "latitude": latitude, "longitude": longitude, "timezone": "America/Sao_Paulo",
+        "hourly_units": {
+            "time": "iso8601", "weathercode": "wmo code", "temperature_2m": "°C",
+            "relative_humidity_2m": "%", "uv_index": ""
+        },
+        "hourly": hourly
+    }
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    fail_rate = 0.0
+    latency = 0.0
+    hang_rate = 0.0
+    hang_seconds = 60.0
+    drop_rate = 0.0
+    truncate_rate = 0.0
+    garbage_rate = 0.0
+    fail_dates: frozenset = frozenset()
+    outage_after: int | None = None
+    outage_requests = 0
+    protocol_version = "HTTP/1.1"
+    _served = 0
+    _outage_served = 0
+    _lock = threading.Lock()
+
+    @classmethod
+    def _in_outage(cls) -> bool:
+        """Conta a requisição e indica se ela cai na indisponibilidade simulada."""
+        with cls._lock:
+            if cls.outage_after is None or cls._served < cls.outage_after:
+                cls._served += 1
+                return False
+            if cls.outage_requests and cls._outage_served >= cls.outage_requests:
+                return False
+            cls._outage_served += 1
+            return True
+
+    def _send(self, status: int, body: dict, headers: dict | None = None):
+        content = json.dumps(body).encode("utf-8")
+        if status == 200 and random.random() < self.garbage_rate:
+            content = content[:len(content) // 2]
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if status == 200 and random.random() < self.truncate_rate:
+            # Anuncia o corpo inteiro, envia metade e encerra a conexão
+            self.wfile.write(content[:len(content) // 2])
+            self.wfile.flush()
+            self.close_connection = True
+            self.connection.shutdown(socket.SHUT_RDWR)
+            return
+        self.wfile.write(content)
+
+    def do_GET(self):
+        if self.latency:
+            time.sleep(self.latency)
+        if random.random() < self.drop_rate:
+            self.close_connection = True
+            self.connection.shutdown(socket.SHUT_RDWR)
+            return
+        if random.random() < self.hang_rate:
+            time.sleep(self.hang_seconds)
+        if random.random() < self.fail_rate:
+            status = random.choice([429, 503])
+            self._send(status, {"error": True, "reason": "falha injetada"}, {"Retry-After": "0"} if status == 429 else None)
+            return
+        if self._in_outage():
+            self._send(503, {"error": True, "reason": "indisponibilidade simulada"})
+            return
+
+        query = parse_qs(urlparse(self.path).query)
+        if self.fail_dates and "start_date" in query and "end_date" in query:
+            first, last = query["start_date"][0], query["end_date"][0]
+            if any(first <= day <= last for day in self.fail_dates):
+                self._send(500, {"error": True, "reason": "falha injetada na janela"})
+                return
+        build_payload = build_hourly_payload if "hourly" in query else build_daily_payload
+        try:
+            payload = build_payload(
+                float(query["latitude"][0]), float(query["longitude"][0]),
+                date.fromisoformat(query["start_date"][0]), date.fromisoformat(query["end_date"][0])
+            )
+        except (KeyError, ValueError) as e:
+            self._send(400, {"error": True, "reason": f"parâmetro inválido: {e}"})
+            return
+        self._send(200, payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor local que imita a API de arquivo da Open-Meteo.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8085)
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Fração de respostas 429/503 injetadas.")
+    parser.add_argument("--latency", type=float, default=0.0, help="Atraso (s) adicionado a cada resposta.")
+    parser.add_argument("--hang-rate", type=float, default=0.0,
+                        help="Fração de respostas atrasadas em '--hang-seconds' (estouro do tempo limite de leitura).")
+    parser.add_argument("--hang-seconds", type=float, default=60.0)
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="Fração de conexões encerradas sem resposta.")
+    parser.add_argument("--truncate-rate", type=float, default=0.0,
+                        help="Fração de respostas com sucesso cortadas no meio do corpo.")
+    parser.add_argument("--garbage-rate", type=float, default=0.0,
+                        help="Fração de respostas com sucesso cujo corpo não é JSON válido.")
+    parser.add_argument("--fail-dates", default="", metavar="AAAA-MM-DD,...",
+                        help="Dias cujas janelas sempre recebem erro 500.")
+    parser.add_argument("--outage-after", type=int, default=None,
+                        help="Respostas com sucesso antes de a API simular indisponibilidade (503).")
+    parser.add_argument("--outage-requests", type=int, default=0,
+                        help="Requisições recusadas durante a indisponibilidade (0: até o servidor parar).")
+    args = parser.parse_args()
+
+    StubHandler.fail_rate = args.fail_rate
+    StubHandler.latency = args.latency
+    StubHandler.hang_rate = args.hang_rate
+    StubHandler.hang_seconds = args.hang_seconds
+    StubHandler.drop_rate = args.drop_rate
+    StubHandler.truncate_rate = args.truncate_rate
+    StubHandler.garbage_rate = args.garbage_rate
+    StubHandler.fail_dates = frozenset(date.fromisoformat(day).isoformat()
+                                       for day in args.fail_dates.split(",") if day)
+    StubHandler.outage_after = args.outage_after
+    StubHandler.outage_requests = args.outage_requests
+    server = ThreadingHTTPServer((args.host, args.port), StubHandler)
+    print(f"Servidor stub da Open-Meteo em http://{args.host}:{args.port}/v1/archive")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
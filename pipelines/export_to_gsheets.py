@@ -1,61 +1,65 @@
+from __future__ import annotations
+
+import argparse
 import os
-import gspread
-import pandas as pd
+import sys
+from typing import TYPE_CHECKING
+
 from dotenv import load_dotenv
-from pymongo import MongoClient
-from gspread_dataframe import set_with_dataframe
+
+# O código compartilhado entre os pacotes ('common') fica na raiz do repositório
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if REPO_ROOT not in sys.path:
+    sys.path.append(REPO_ROOT)
 
 from src.config import (
     MONGO_CONNECTION_STRING,
     MONGO_DB_NAME,
-    MONGO_COLLECTION_NAME,
+    METRICS_COLLECTION_NAME,
+    METRICS_RUNS_COLLECTION_NAME,
     GOOGLE_SHEET_NAME,
-    GOOGLE_CREDENTIALS_PATH
+    GOOGLE_CREDENTIALS_PATH,
+    GSHEETS_SNAPSHOT_PATH
 )
+from src.database.metrics_store import GLOBAL_SCOPE
+from src.instrumentation import count, stage
 
-METRICS_COLLECTION_NAME = MONGO_COLLECTION_NAME
-
-def fetch_metrics_from_mongo() -> dict[str, pd.DataFrame]:
-    """Busca as métricas da coleção no MongoDB e as converte em DataFrames."""
-    print(f"Buscando dados da coleção '{METRICS_COLLECTION_NAME}' no MongoDB...")
-    
-    client = MongoClient(MONGO_CONNECTION_STRING)
-    db = client[MONGO_DB_NAME]
-    collection = db[METRICS_COLLECTION_NAME]
-    
-    # Busca todos os documentos (cada um representa um tipo de métrica)
-    documents = list(collection.find({}))
-    client.close()
-    
-    if not documents:
-        print("Nenhum documento encontrado na coleção.")
-        return {}
-        
-    # Converte cada documento em um DataFrame e armazena em um dicionário
-    dataframes = {}
-    for doc in documents:
-        metric_type = doc.get("metric_type")
-        data_list = doc.get("data")
-        
-        if metric_type and data_list:
-            df = pd.DataFrame(data_list)
-            # Remove a coluna _id se ela foi adicionada pelo MongoDB
-            if '_id' in df.columns:
-                df = df.drop(columns=['_id'])
-            dataframes[metric_type] = df
-            print(f"  - Métrica '{metric_type}' carregada com {len(df)} registros.")
-            
-    return dataframes
+# O gspread, o pandas e o driver do MongoDB são importados dentro das funções
+# que os usam, para que '--help' e a CLI respondam sem carregá-los.
+if TYPE_CHECKING:
+    import pandas as pd
 
 
-def update_google_sheet(dataframes: dict[str, pd.DataFrame]):
+def fetch_metrics_from_mongo(scope: str = GLOBAL_SCOPE, metric_type: str | None = None,
+                             location: str | None = None) -> dict[str, pd.DataFrame]:
     """
-    Autentica com a API do Google e atualiza uma planilha com os DataFrames.
-    Cada DataFrame é salvo em uma aba separada.
+    Busca as métricas da última execução publicada e as converte em DataFrames (um por tipo de métrica).
+
+    Apenas os documentos do escopo (e, se informados, do tipo de métrica e da
+    localidade) são lidos, pela camada de consulta 'MetricsStore'.
     """
+    from src.database.metrics_store import MetricsStore
+    from src.database.mongo_handler import MongoHandler
+
+    print(f"Buscando métricas do escopo '{scope}' na coleção '{METRICS_COLLECTION_NAME}' no MongoDB...")
+
+    # Reaproveita o cliente MongoDB compartilhado do processo
+    with MongoHandler(MONGO_CONNECTION_STRING, MONGO_DB_NAME) as mongo:
+        store = MetricsStore(mongo, METRICS_COLLECTION_NAME, METRICS_RUNS_COLLECTION_NAME)
+        dataframes = store.get_frames(metric_type, scope, location=location)
+
     if not dataframes:
-        print("Nenhum dado para enviar ao Google Sheets.")
-        return
+        print("Nenhuma métrica publicada encontrada.")
+        return {}
+
+    for metric_type, df in dataframes.items():
+        print(f"  - Métrica '{metric_type}' carregada com {len(df)} registros.")
+    return dataframes
+
+
+def open_spreadsheet():
+    """Autentica com a API do Google e abre a planilha. Retorna None em caso de erro."""
+    import gspread
 
     print("\nConectando ao Google Sheets...")
     try:
@@ -67,46 +71,128 @@ def update_google_sheet(dataframes: dict[str, pd.DataFrame]):
     except FileNotFoundError:
         print(f"❌ ERRO: Arquivo de credenciais não encontrado em '{GOOGLE_CREDENTIALS_PATH}'.")
         print("Por favor, baixe o JSON da sua conta de serviço do Google Cloud e salve-o no local correto.")
-        return
+        return None
     except gspread.exceptions.SpreadsheetNotFound:
         print(f"❌ ERRO: Planilha '{GOOGLE_SHEET_NAME}' não encontrada.")
         print("Verifique se o nome está correto e se você a compartilhou com o email da conta de serviço.")
-        return
+        return None
     except Exception as e:
         print(f"❌ Ocorreu um erro inesperado ao conectar ao Google Sheets: {e}")
+        return None
+    return spreadsheet
+
+
+def update_google_sheet(dataframes: dict[str, pd.DataFrame], spreadsheet=None):
+    """
+    Autentica com a API do Google e atualiza uma planilha com os DataFrames.
+    Cada DataFrame é salvo em uma aba separada.
+
+    O snapshot da exportação por diferenças é atualizado com o conteúdo
+    escrito em cada aba, para que a próxima exportação 'diff' compare com ele.
+    """
+    import gspread
+    from gspread_dataframe import set_with_dataframe
+    from src.services.sheets_sync import SheetsSnapshot
+
+    if not dataframes:
+        print("Nenhum dado para enviar ao Google Sheets.")
+        return
+
+    spreadsheet = spreadsheet or open_spreadsheet()
+    if spreadsheet is None:
+        return
+
+    snapshot = SheetsSnapshot(GSHEETS_SNAPSHOT_PATH)
+    try:
+        # Itera sobre cada DataFrame para atualizar/criar a aba correspondente
+        for sheet_name, df in dataframes.items():
+            try:
+                # Tenta obter a aba. Se não existir, uma exceção é lançada.
+                worksheet = spreadsheet.worksheet(sheet_name)
+                print(f"  - Aba '{sheet_name}' encontrada. Limpando e atualizando dados...")
+            except gspread.exceptions.WorksheetNotFound:
+                # Se a aba não existe, ela é criada.
+                print(f"  - Aba '{sheet_name}' não encontrada. Criando nova aba...")
+                worksheet = spreadsheet.add_worksheet(title=sheet_name, rows="100", cols="20")
+
+            # Limpa a aba e insere o DataFrame (se a escrita falhar no meio, a aba fica fora do snapshot)
+            snapshot.discard(sheet_name)
+            worksheet.clear()
+            set_with_dataframe(worksheet, df)
+            snapshot.record(sheet_name, df)
+            print(f"  - Dados inseridos com sucesso na aba '{sheet_name}'.")
+    finally:
+        # As abas já reescritas ficam registradas mesmo se uma aba seguinte falhar
+        snapshot.save()
+
+
+def sync_google_sheet(dataframes: dict[str, pd.DataFrame], spreadsheet=None, force: bool = False):
+    """
+    Atualiza a planilha enviando apenas as linhas alteradas desde a última exportação.
+
+    Todas as abas são atualizadas em uma única chamada em lote (ver
+    'src.services.sheets_sync'). Uma planilha já aberta (ou um cliente falso)
+    pode ser informada em 'spreadsheet'.
+    """
+    from src.services.sheets_sync import SheetsSnapshot, sync_dataframes
+
+    if not dataframes:
+        print("Nenhum dado para enviar ao Google Sheets.")
+        return
+
+    spreadsheet = spreadsheet or open_spreadsheet()
+    if spreadsheet is None:
         return
 
-    # Itera sobre cada DataFrame para atualizar/criar a aba correspondente
-    for sheet_name, df in dataframes.items():
-        try:
-            # Tenta obter a aba. Se não existir, uma exceção é lançada.
-            worksheet = spreadsheet.worksheet(sheet_name)
-            print(f"  - Aba '{sheet_name}' encontrada. Limpando e atualizando dados...")
-        except gspread.exceptions.WorksheetNotFound:
-            # Se a aba não existe, ela é criada.
-            print(f"  - Aba '{sheet_name}' não encontrada. Criando nova aba...")
-            worksheet = spreadsheet.add_worksheet(title=sheet_name, rows="100", cols="20")
-        
-        # Limpa a aba e insere o DataFrame
-        worksheet.clear()
-        set_with_dataframe(worksheet, df)
-        print(f"  - Dados inseridos com sucesso na aba '{sheet_name}'.")
-
-def main():
-    """Função principal para orquestrar o processo."""
+    stats = sync_dataframes(spreadsheet, dataframes, SheetsSnapshot(GSHEETS_SNAPSHOT_PATH), force=force)
+    count("sheets.cells", stats["cells"])
+    print(f"  - {stats['ranges']} intervalos ({stats['cells']} células) enviados; "
+          f"{stats['sheets_created']} abas criadas, {stats['sheets_resized']} redimensionadas.")
+
+
+def main(mode: str = "diff", scope: str = GLOBAL_SCOPE, metric_type: str | None = None,
+         location: str | None = None):
+    """
+    Função principal para orquestrar o processo.
+
+    Args:
+        mode (str, optional): 'diff' envia só as linhas alteradas, 'force' reescreve
+                              todas as linhas pelo mesmo caminho em lote e 'full' limpa
+                              e reescreve cada aba. Defaults to "diff".
+        scope (str, optional): Escopo das métricas exportadas ('global' ou, por
+                               exemplo, 'localidade|month'). Defaults to 'global'.
+        metric_type (str, optional): Exporta apenas este tipo de métrica. Defaults to None.
+        location (str, optional): Exporta apenas esta localidade. Defaults to None.
+    """
     print("--- Iniciando processo de exportação de métricas para o Google Sheets ---")
     
     # Passo 1: Buscar dados do MongoDB
-    metrics_dataframes = fetch_metrics_from_mongo()
+    with stage("export.fetch") as st:
+        metrics_dataframes = fetch_metrics_from_mongo(scope, metric_type, location)
+        st.rows(sum(len(df) for df in metrics_dataframes.values()))
     
     # Passo 2: Enviar os dados para o Google Sheets
-    update_google_sheet(metrics_dataframes)
+    with stage("export.sheets", mode=mode):
+        if mode == "full":
+            update_google_sheet(metrics_dataframes)
+        else:
+            sync_google_sheet(metrics_dataframes, force=(mode == "force"))
     
     print("\n✅ Processo de exportação concluído!")
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exporta as métricas do MongoDB para o Google Sheets.")
+    parser.add_argument(
+        "--mode", choices=["diff", "force", "full"], default="diff",
+        help="diff: envia só as linhas alteradas (padrão); force: reescreve tudo em lote; full: limpa e reescreve cada aba."
+    )
+    parser.add_argument("--scope", default=GLOBAL_SCOPE, help="Escopo das métricas (padrão: global; ex.: 'localidade|month').")
+    parser.add_argument("--metric", help="Exporta apenas este tipo de métrica.")
+    parser.add_argument("--location", help="Exporta apenas esta localidade.")
+    args = parser.parse_args()
+
     # Validação inicial das variáveis de ambiente
     if not all([MONGO_CONNECTION_STRING, MONGO_DB_NAME, GOOGLE_SHEET_NAME]):
         raise ValueError("Uma ou mais variáveis de ambiente (MONGO_CONNECTION_STRING, MONGO_DB_NAME, GOOGLE_SHEET_NAME) não foram definidas no arquivo .env")
-    main()
\ No newline at end of file
+    main(args.mode, scope=args.scope, metric_type=args.metric, location=args.location)
\ No newline at end of file
@@ -1,77 +1,343 @@
-import pandas as pd
-from src.config import MONGO_CONNECTION_STRING, MONGO_DB_NAME, MONGO_COLLECTION_INPUT
-from src.database.mongo_handler import MongoHandler
-from src.processing.data_materialize import (
-    calculate_descriptive_stats,
-    calculate_weather_code_probabilities,
-    forecast_temperature,
-    calculate_correlation_matrix # Importa a nova função
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+from typing import TYPE_CHECKING
+
+# O código compartilhado entre os pacotes ('common') fica na raiz do repositório
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if REPO_ROOT not in sys.path:
+    sys.path.append(REPO_ROOT)
+
+from src.config import (
+    MONGO_CONNECTION_STRING, MONGO_DB_NAME, MONGO_COLLECTION_INPUT, INPUT_SCHEMA,
+    METRICS_COLLECTION_NAME, METRICS_RUNS_COLLECTION_NAME, METRICS_KEEP_RUNS, GROUPED_METRICS_WORKERS,
+    METRICS_STATE_COLLECTION_NAME, STORAGE_BACKEND, PARQUET_ROOT, INPUT_RESOLUTION, MONGO_COLLECTION_INPUT_HOURLY,
+    CLIMATOLOGY_COLLECTION_NAME, CLIMATOLOGY_REFERENCE
 )
+from src.database.metrics_store import GLOBAL_SCOPE, metrics_scope
+from src.instrumentation import stage
+from src.processing.choices import MODELS, PERIODS
+
+# O pandas, os cálculos e os drivers de armazenamento são importados dentro das
+# funções que os usam, para que '--help' e a CLI respondam sem carregá-los.
+if TYPE_CHECKING:
+    import pandas as pd
+
+    from src.database.hourly_source import HourlyInputSource
+    from src.database.mongo_handler import MongoHandler
+    from src.database.parquet_store import ParquetStore
+    from src.processing.rolling_metrics import Climatology
+
+
+def _open_input_store() -> MongoHandler | ParquetStore | HourlyInputSource:
+    """
+    Abre o armazenamento dos dados de entrada configurado em STORAGE_BACKEND ('mongo' ou 'parquet').
+
+    Com INPUT_RESOLUTION='hourly', a tabela diária é derivada dos blocos
+    horários de MONGO_COLLECTION_INPUT_HOURLY na leitura.
+    """
+    if STORAGE_BACKEND == "parquet":
+        from src.database.parquet_store import ParquetStore
+        store = ParquetStore(PARQUET_ROOT)
+    else:
+        from src.database.mongo_handler import MongoHandler
+        store = MongoHandler(MONGO_CONNECTION_STRING, MONGO_DB_NAME)
+    if INPUT_RESOLUTION == "hourly":
+        from src.database.hourly_source import HourlyInputSource
+        return HourlyInputSource(store, MONGO_COLLECTION_INPUT_HOURLY)
+    return store
+
+
+def _load_climatology(df: pd.DataFrame, series_keys: list[str], rebuild: bool = False,
+                      refresh: bool = True) -> Climatology | None:
+    """
+    Normal climatológica das séries de 'df', salva na coleção CLIMATOLOGY_COLLECTION_NAME.
+
+    A normal de cada série é lida da coleção e só é calculada (e salva) para
+    as séries novas (ex.: uma localidade adicionada) e para as que 'df'
+    estende além do intervalo de dias de que a normal foi calculada (ver
+    'Climatology.stale'). Com 'rebuild', todas são recalculadas a partir de 'df'.
+    Sem 'refresh' (quando 'df' é só um trecho do histórico), nada é calculado
+    e o retorno é None se alguma série precisar ser (re)calculada.
+    """
+    from src.database.mongo_handler import MongoHandler
+    from src.processing.rolling_metrics import Climatology
+
+    baseline = f"{metrics_scope(series_keys)}|{CLIMATOLOGY_REFERENCE}"
+    with stage("analysis.climatology", baseline=baseline) as st, \
+            MongoHandler(MONGO_CONNECTION_STRING, MONGO_DB_NAME) as mongo:
+        documents = [] if rebuild else mongo.find_documents(CLIMATOLOGY_COLLECTION_NAME, {"baseline": baseline})
+        climatology = Climatology.from_documents(documents, series_keys, CLIMATOLOGY_REFERENCE)
+
+        stale = climatology.stale(df, series_keys)
+        if not stale.empty and not refresh:
+            return None
+        if not stale.empty:
+            computed = Climatology.build(stale, series_keys, CLIMATOLOGY_REFERENCE)
+            new_documents = computed.to_documents(baseline)
+            # Documentos anteriores das mesmas séries (ou de outra configuração) são substituídos
+            mongo.delete_documents(CLIMATOLOGY_COLLECTION_NAME,
+                                   {"_id": {"$in": [document["_id"] for document in new_documents]}})
+            mongo.insert_documents(CLIMATOLOGY_COLLECTION_NAME, new_documents)
+            climatology = climatology.merge(computed)
+            print(f"Normal climatológica calculada para {len(computed.series)} séries "
+                  f"({len(climatology.series) - len(computed.series)} reaproveitadas).")
+        st.rows(len(climatology.series), rows_in=len(stale))
+
+    incomplete = int((~climatology.complete).sum())
+    if incomplete:
+        print(f"⚠️ Normal climatológica incompleta em {incomplete} de {len(climatology.series)} séries "
+              f"(menos de um ano de histórico): os dias do ano sem normal ficam sem anomalia e sem eventos "
+              f"até que o histórico cresça.")
+    return climatology
+
+
+def _input_backfill() -> dict | None:
+    """
+    Registro de dias gravados fora da ordem na coleção de entrada (ver 'mark_backfill' na ingestão).
+
+    Blocos da fila de falhas, janelas reprocessadas e recargas completas
+    gravam dias anteriores à marca d'água do estado incremental, que só lê os
+    dias posteriores a ela: enquanto houver registro, o estado é refeito.
+    """
+    with _open_input_store() as source:
+        return source.get_backfill(MONGO_COLLECTION_INPUT)
+
+
+def _clear_input_backfill(backfill: dict):
+    """Apaga o registro lido em '_input_backfill', depois que o estado foi refeito e publicado."""
+    with _open_input_store() as source:
+        source.clear_backfill(MONGO_COLLECTION_INPUT, backfill)
+
+
+@stage("analysis.incremental_update")
+def update_metrics_state(rebuild: bool = False, verify: bool = False) -> dict[str, pd.DataFrame] | None:
+    """
+    Atualiza o estado combinável das métricas apenas com os dias novos e deriva as métricas dele.
+
+    Somente os documentos com 'dia' posterior à marca d'água do estado são lidos.
+    Revisões de dias já incorporados (ou dias antigos inseridos depois) só são
+    refletidas com 'rebuild', que refaz o estado lendo a coleção inteira em blocos. Com 'verify', o resultado é
+    comparado com um recálculo completo.
+    """
+    from src.database.mongo_handler import MongoHandler
+    from src.processing.incremental_stats import STATE_DOCUMENT_ID, ClimateStatsState, verify_against_full
+
+    state_query = {"_id": STATE_DOCUMENT_ID}
+    with MongoHandler(MONGO_CONNECTION_STRING, MONGO_DB_NAME) as mongo, _open_input_store() as source:
+        state = ClimateStatsState() if rebuild else ClimateStatsState.from_document(
+            mongo.get_document(METRICS_STATE_COLLECTION_NAME, state_query)
+        )
 
-def main():
+        query = {"dia": {"$gt": state.watermark}} if state.watermark is not None else {}
+        new_rows = 0
+        for chunk in source.iter_dataframes(MONGO_COLLECTION_INPUT, INPUT_SCHEMA, query):
+            state.update(chunk)
+            new_rows += len(chunk)
+        print(f"{new_rows} linhas novas incorporadas ao estado (total: {state.rows}).")
+
+        if state.is_empty:
+            return None
+        mongo.replace_document(METRICS_STATE_COLLECTION_NAME, state_query, state.to_document())
+
+        if verify:
+            full_df = source.load_dataframe(MONGO_COLLECTION_INPUT, INPUT_SCHEMA)
+            print(f"Verificação contra recálculo completo: {verify_against_full(state, full_df)}")
+
+    return state.compute_all(days_to_predict=7)
+
+
+@stage("analysis.incremental_series")
+def update_series_metrics(rebuild: bool = False, rebuild_climatology: bool = False) -> dict[str, pd.DataFrame]:
+    """
+    Métricas de séries (janelas móveis, anomalias e eventos extremos) da execução incremental.
+
+    As linhas da execução global anterior são mantidas e só o trecho final
+    (ver 'incremental_window') é lido e recalculado. Sem execução anterior com
+    essas métricas, com 'rebuild' ou quando a normal climatológica precisa ser
+    recalculada, as métricas são refeitas com o histórico completo.
+    """
+    from src.database.metrics_store import MetricsStore
+    from src.database.mongo_handler import MongoHandler
+    from src.processing.rolling_metrics import (
+        ROLLING_METRIC_TYPES, compute_rolling_metrics, incremental_window, merge_incremental
+    )
+
+    previous = {}
+    if not (rebuild or rebuild_climatology):
+        with MongoHandler(MONGO_CONNECTION_STRING, MONGO_DB_NAME) as mongo:
+            store = MetricsStore(mongo, METRICS_COLLECTION_NAME, METRICS_RUNS_COLLECTION_NAME)
+            published = {document["metric_type"] for document in store.find(scope=GLOBAL_SCOPE, include_data=False)}
+            previous = {metric_type: store.get_frame(metric_type, GLOBAL_SCOPE)
+                        for metric_type in ROLLING_METRIC_TYPES if metric_type in published}
+
+    window = incremental_window(previous)
+    with _open_input_store() as source:
+        if window is not None:
+            tail = source.load_dataframe(MONGO_COLLECTION_INPUT, INPUT_SCHEMA,
+                                         {"dia": {"$gte": window[0].to_pydatetime()}})
+            climatology = _load_climatology(tail, [], refresh=False)
+            if climatology is not None:
+                print(f"Métricas de séries recalculadas a partir de {window[0]:%Y-%m-%d} ({len(tail)} linhas).")
+                return merge_incremental(previous, compute_rolling_metrics(tail, climatology), window)
+            print("Normal climatológica desatualizada: métricas de séries refeitas com o histórico completo.")
+        df = source.load_dataframe(MONGO_COLLECTION_INPUT, INPUT_SCHEMA)
+    return compute_rolling_metrics(df, _load_climatology(df, [], rebuild=rebuild_climatology))
+
+
+@stage("analysis.run")
+def main(group_keys: list[str] | None = None, period: str | None = None, workers: int | None = None,
+         incremental: bool = False, rebuild_state: bool = False, verify: bool = False,
+         forecast_model: str = 'linear', rebuild_climatology: bool = False):
     """
     Função principal para executar o pipeline de análise de dados climáticos.
-    1. Carrega dados do MongoDB.
-    2. Realiza análises (estatísticas, probabilidade, correlação, previsão).
-    3. Salva todas as métricas calculadas em uma nova coleção no MongoDB.
+    1. Carrega dados do MongoDB (ou do armazenamento Parquet, conforme STORAGE_BACKEND).
+    2. Realiza análises (estatísticas, probabilidade, correlação, previsão,
+       janelas móveis, anomalias e eventos extremos), globais ou por grupo (ex.:
+       localidade e mês). No modo incremental, as métricas globais combináveis
+       (as quatro primeiras) são derivadas de um estado que recebe apenas os dias novos,
+       e as de séries recalculam só o trecho final sobre as da execução anterior.
+    3. Publica as métricas no MongoDB, um documento por tipo de métrica e grupo (ver MetricsStore).
     """
+    from src.processing.data_materialize import ClimateMetricsEngine
+    from src.processing.grouped_metrics import compute_grouped_metrics
+    from src.processing.rolling_metrics import compute_rolling_metrics
+
     print("--- Iniciando pipeline de análise de dados climáticos ---")
     
-    # Define o nome da coleção de destino para as métricas
-    METRICS_COLLECTION_NAME = "climate_metrics"
+    grouped = bool(group_keys or period)
+    group_keys = group_keys or []
+    # Escopo das métricas publicadas ('global' ou as colunas de agrupamento e o período)
+    scope = metrics_scope(group_keys, period)
 
     try:
-        # 1. CARREGAR DADOS DE ENTRADA
-        with MongoHandler(MONGO_CONNECTION_STRING, MONGO_DB_NAME) as mongo:
-            df_original = mongo.find_all(MONGO_COLLECTION_INPUT)
+        if incremental and not grouped:
+            backfill = _input_backfill()
+            if backfill is not None and not rebuild_state:
+                print(f"Dias gravados fora da ordem a partir de {backfill['first_day']:%Y-%m-%d}: "
+                      "o estado incremental será refeito.")
+                rebuild_state = True
+            metrics = update_metrics_state(rebuild=rebuild_state, verify=verify)
+            if metrics is None:
+                print(f"❌ Processo interrompido: Nenhum dado encontrado na coleção de origem '{MONGO_COLLECTION_INPUT}'.")
+                return
+            metrics.update(update_series_metrics(rebuild=rebuild_state, rebuild_climatology=rebuild_climatology))
+            _store_metrics(GLOBAL_SCOPE, build_metric_documents(metrics))
+            if backfill is not None:
+                _clear_input_backfill(backfill)
+            return
+
+        # 1. CARREGAR DADOS DE ENTRADA (apenas os campos do schema, já tipados)
+        schema = {**INPUT_SCHEMA, **{key: 'category' for key in group_keys}}
+        with stage("analysis.load_input", backend=STORAGE_BACKEND) as st, _open_input_store() as source:
+            df_original = source.load_dataframe(MONGO_COLLECTION_INPUT, schema)
+            st.rows(len(df_original))
+            st.add_bytes(df_original.memory_usage(deep=True).sum())
         
         if df_original.empty:
             print(f"❌ Processo interrompido: Nenhum dado encontrado na coleção de origem '{MONGO_COLLECTION_INPUT}'.")
             return
 
-        # Garante que a coluna 'dia' seja do tipo datetime
-        df_original['dia'] = pd.to_datetime(df_original['dia'])
-
         # 2. REALIZAR ANÁLISES
-        stats_df = calculate_descriptive_stats(df_original.copy())
-        correlation_df = calculate_correlation_matrix(df_original.copy())
-        probs_df = calculate_weather_code_probabilities(df_original.copy())
-        forecast_df = forecast_temperature(df_original.copy(), days_to_predict=7)
-        
-        # 3. ESTRUTURAR E SALVAR MÉTRICAS NO MONGODB
-        # Cria uma lista de dicionários, onde cada um representa um tipo de métrica.
-        # Esses serão inseridos como documentos separados na coleção de métricas.
-        metrics_to_store = [
-            {
-                "metric_type": "descriptive_statistics",
-                "data": stats_df.to_dict('records')
-            },
-            {
-                "metric_type": "correlation_matrix",
-                "data": correlation_df.to_dict('records')
-            },
-            {
-                "metric_type": "weather_code_probability",
-                "data": probs_df.to_dict('records')
-            },
-            {
-                "metric_type": "temperature_forecast",
-                "data": forecast_df.to_dict('records')
-            }
-        ]
-        
-        # Converte a lista de métricas para um DataFrame para usar o método de inserção.
-        # Cada item na lista se tornará um documento na coleção.
-        final_df_to_mongo = pd.DataFrame(metrics_to_store)
+        # A normal climatológica é por série diária (as colunas de agrupamento, sem o período)
+        climatology = _load_climatology(df_original, group_keys, rebuild=rebuild_climatology)
+        with stage("analysis.compute", grouped=grouped) as st:
+            if grouped:
+                # Um documento por tipo de métrica e grupo; os ajustes de previsão rodam em paralelo.
+                metrics_to_store = compute_grouped_metrics(
+                    df_original, group_keys, period=period, days_to_predict=7,
+                    max_workers=workers or GROUPED_METRICS_WORKERS, forecast_model=forecast_model,
+                    climatology=climatology
+                )
+            else:
+                # Todas as métricas são calculadas sobre a mesma tabela, sem cópias
+                # (estatísticas, correlação, probabilidades e previsão).
+                metrics = ClimateMetricsEngine(df_original).compute_all(days_to_predict=7)
+                metrics.update(compute_rolling_metrics(df_original, climatology))
 
-        # Carrega os dados processados no MongoDB, sobrescrevendo a coleção de métricas
-        with MongoHandler(MONGO_CONNECTION_STRING, MONGO_DB_NAME) as mongo:
-            mongo.overwrite_collection(METRICS_COLLECTION_NAME, final_df_to_mongo)
-            
-        print(f"\n✅ Pipeline concluído! Métricas salvas na coleção '{METRICS_COLLECTION_NAME}'.")
+                # 3. ESTRUTURAR E SALVAR MÉTRICAS NO MONGODB
+                # Cria uma lista de dicionários, onde cada um representa um tipo de métrica.
+                # Esses serão inseridos como documentos separados na coleção de métricas.
+                metrics_to_store = build_metric_documents(metrics)
+            st.rows(len(metrics_to_store), rows_in=len(df_original))
+
+        _store_metrics(scope, metrics_to_store, coverage=(df_original['dia'].min(), df_original['dia'].max()))
 
     except Exception as e:
         print(f"❌ Ocorreu um erro fatal durante a execução do pipeline: {e}")
 
+
+def build_metric_documents(metrics: dict[str, pd.DataFrame]) -> list[dict]:
+    """Converte as métricas calculadas em documentos {'metric_type', 'data'} (um por tipo de métrica)."""
+    return [
+        {"metric_type": metric_type, "data": metric_df.to_dict('records')}
+        for metric_type, metric_df in metrics.items()
+    ]
+
+
+def _store_metrics(scope: str, metrics_to_store: list[dict], coverage: tuple = (None, None)):
+    """Publica os documentos de métricas como uma nova execução do escopo (ver MetricsStore)."""
+    from src.database.metrics_store import MetricsStore
+    from src.database.mongo_handler import MongoHandler
+
+    with stage("analysis.store", scope=scope) as st, \
+            MongoHandler(MONGO_CONNECTION_STRING, MONGO_DB_NAME) as mongo:
+        store = MetricsStore(mongo, METRICS_COLLECTION_NAME, METRICS_RUNS_COLLECTION_NAME, keep_runs=METRICS_KEEP_RUNS)
+        run_version = store.publish(metrics_to_store, scope, coverage=coverage)
+        st.rows(len(metrics_to_store))
+
+    print(f"\n✅ Pipeline concluído! {len(metrics_to_store)} documentos de métricas publicados na coleção "
+          f"'{METRICS_COLLECTION_NAME}' (escopo '{scope}', versão {run_version}).")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Pipeline de análise de dados climáticos.")
+    parser.add_argument(
+        "--group-by", metavar="COLUNAS",
+        help="Calcula as métricas por grupo, usando as colunas informadas separadas por vírgula (ex.: localidade)."
+    )
+    parser.add_argument(
+        "--period", choices=PERIODS,
+        help="Agrupa também por período de 'dia' (mês, estação ou ano)."
+    )
+    parser.add_argument(
+        "--workers", type=int,
+        help="Processos usados nos ajustes de previsão por grupo (padrão: número de CPUs)."
+    )
+    parser.add_argument(
+        "--forecast-model", choices=MODELS, default="linear",
+        help="Modelo da previsão por grupo: tendência linear ou tendência + harmônicos anuais."
+    )
+    parser.add_argument(
+        "--incremental", action="store_true",
+        help="Atualiza as métricas globais incorporando apenas os dias novos ao estado salvo."
+    )
+    parser.add_argument(
+        "--rebuild-state", action="store_true",
+        help="Com --incremental, refaz o estado lendo toda a coleção de entrada."
+    )
+    parser.add_argument(
+        "--verify", action="store_true",
+        help="Com --incremental, compara o resultado com um recálculo completo."
+    )
+    parser.add_argument(
+        "--rebuild-climatology", action="store_true",
+        help="Recalcula a normal climatológica salva (base das anomalias e dos eventos extremos)."
+    )
+    return parser.parse_args()
+
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    args = parse_args()
+    main(
+        group_keys=[key.strip() for key in args.group_by.split(",")] if args.group_by else None,
+        period=args.period,
+        workers=args.workers,
+        incremental=args.incremental,
+        rebuild_state=args.rebuild_state,
+        verify=args.verify,
+        forecast_model=args.forecast_model,
+        rebuild_climatology=args.rebuild_climatology
+    )
@@ -9,13 +9,53 @@ MONGO_DB_NAME = os.getenv("MONGO_DB_NAME")
 MONGO_COLLECTION_NAME = os.getenv("MONGO_COLLECTION_NAME")
 MONGO_COLLECTION_INPUT = os.getenv("MONGO_COLLECTION_INPUT")  # Valor padrão se não estiver definido
 
+# Campos lidos da coleção de entrada e seus tipos (os demais campos não são transferidos)
+INPUT_SCHEMA = {
+    'dia': 'datetime64[ns]',
+    'codigo_clima': 'Int64',
+    'temperatura_max_c': 'float64',
+    'temperatura_min_c': 'float64',
+    'umidade_media_percent': 'float64',
+    'indice_uv_max': 'float64',
+}
+
+# Resolução da coleção de entrada: 'daily' (um documento por dia) ou 'hourly' (blocos
+# diários com arrays de 24 horas, reamostrados para as colunas diárias na leitura)
+INPUT_RESOLUTION = os.getenv("INPUT_RESOLUTION", "daily").lower()
+MONGO_COLLECTION_INPUT_HOURLY = os.getenv("MONGO_COLLECTION_INPUT_HOURLY", "dados_climaticos_horarios")
+
+# --- Configuração do armazenamento dos dados diários ---
+# 'mongo' (padrão) ou 'parquet' (arquivos particionados por localidade / ano / mês)
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "mongo").lower()
+PARQUET_ROOT = os.getenv(
+    "PARQUET_ROOT", os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "warehouse"))
+)
+
+# --- Configuração das métricas ---
+# Um documento por (escopo, execução, tipo de métrica, grupo); ver src/database/metrics_store.py
+METRICS_COLLECTION_NAME = "climate_metrics"
+# Registro das execuções publicadas (a versão mais recente de cada escopo é a servida nas leituras)
+METRICS_RUNS_COLLECTION_NAME = os.getenv("METRICS_RUNS_COLLECTION_NAME", "climate_metrics_runs")
+# Execuções mantidas por escopo
+METRICS_KEEP_RUNS = int(os.getenv("METRICS_KEEP_RUNS", "3"))
+# Estado combinável (momentos, co-momentos, histogramas) usado pela atualização incremental das métricas
+METRICS_STATE_COLLECTION_NAME = os.getenv("METRICS_STATE_COLLECTION_NAME", "climate_metrics_state")
+# Normal climatológica por série e dia do ano (base das anomalias e dos eventos extremos),
+# reaproveitada nas execuções seguintes e recalculada quando os dados passam do intervalo de que foi calculada
+CLIMATOLOGY_COLLECTION_NAME = os.getenv("CLIMATOLOGY_COLLECTION_NAME", "climate_climatology")
+# Anos de referência da normal ('all' = todos os dias disponíveis ao calculá-la, ou 'AAAA-AAAA')
+CLIMATOLOGY_REFERENCE = os.getenv("CLIMATOLOGY_REFERENCE", "all")
+# Processos usados nos ajustes de previsão por grupo (vazio = número de CPUs)
+GROUPED_METRICS_WORKERS = int(os.getenv("GROUPED_METRICS_WORKERS", "0")) or None
+
 GOOGLE_SHEET_NAME = os.getenv("GOOGLE_SHEET_NAME")
 GOOGLE_CREDENTIALS_PATH = os.getenv("GOOGLE_CREDENTIALS_PATH")
+# Hashes das linhas escritas na última exportação (usados para enviar apenas o que mudou)
+GSHEETS_SNAPSHOT_PATH = os.getenv("GSHEETS_SNAPSHOT_PATH", ".cache/gsheets_snapshot.json")
 
 # --- Configuração da API Open-Meteo ---
 FRANCA_LATITUDE = -20.53
 FRANCA_LONGITUDE = -47.40
 
-# Verificação para garantir que as variáveis essenciais foram carregadas
-if not MONGO_CONNECTION_STRING:
-    raise ValueError("A variável de ambiente MONGO_CONNECTION_STRING não foi definida. Crie um arquivo .env.")
\ No newline at end of file
+# MONGO_CONNECTION_STRING é validada ao abrir a conexão (common.database.client.get_client),
+# para que comandos que não usam o MongoDB (ex.: --help, backend Parquet) não dependam dela.
@@ -0,0 +1,68 @@
+"""
+Leitura da tabela diária a partir dos blocos horários.
+
+A coleção horária guarda um documento por (localidade,) dia com um array de 24
+horas por variável (ver common/processing/resampling.py). 'HourlyInputSource'
+envolve o armazenamento (MongoHandler ou ParquetStore) e oferece a mesma
+leitura usada pelo pipeline ('load_dataframe' / 'iter_dataframes'), entregando
+as colunas diárias de INPUT_SCHEMA: as métricas não dependem da resolução.
+"""
+from typing import Any, Dict, Iterator
+
+import pandas as pd
+
+from src.processing.resampling import DAILY_AGGREGATIONS, HOURLY_COLUMNS, buckets_to_daily
+
+
+class HourlyInputSource:
+    """Armazenamento de blocos horários lido como a tabela diária derivada deles."""
+    def __init__(self, store, collection_name: str):
+        self.store = store
+        self.collection_name = collection_name
+
+    def __enter__(self):
+        self.store.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return self.store.__exit__(exc_type, exc_val, exc_tb)
+
+    def collection_fingerprint(self, collection_name: str, field: str = "dia") -> Dict[str, Any]:
+        """Impressão digital da coleção horária lida no lugar de 'collection_name'."""
+        return self.store.collection_fingerprint(self.collection_name, field)
+
+    def get_backfill(self, collection_name: str) -> Dict[str, Any] | None:
+        """Registro de gravações fora da ordem da coleção horária lida no lugar de 'collection_name'."""
+        return self.store.get_backfill(self.collection_name)
+
+    def clear_backfill(self, collection_name: str, backfill: Dict[str, Any]):
+        self.store.clear_backfill(self.collection_name, backfill)
+
+    @staticmethod
+    def _bucket_schema(schema: Dict[str, str]) -> Dict[str, str]:
+        """Campos lidos dos blocos: as chaves do schema diário e só as variáveis horárias necessárias."""
+        needed = {DAILY_AGGREGATIONS[col][0] for col in schema if col in DAILY_AGGREGATIONS}
+        keys = {col: dtype for col, dtype in schema.items() if col not in DAILY_AGGREGATIONS}
+        return {**keys, **{col: "object" for col in HOURLY_COLUMNS if col in needed}}
+
+    @staticmethod
+    def _to_daily(buckets: pd.DataFrame, schema: Dict[str, str]) -> pd.DataFrame:
+        return buckets_to_daily(buckets)[list(schema)].astype(schema)
+
+    def load_dataframe(self, collection_name: str, schema: Dict[str, str], query: Dict[str, Any] = None,
+                       **kwargs) -> pd.DataFrame:
+        """
+        Carrega os blocos que atendem à query e os reduz às colunas diárias do 'schema'.
+
+        'collection_name' é a coleção diária pedida pelo pipeline; a leitura é
+        feita na coleção horária informada no construtor. Queries sobre 'dia' e
+        'localidade' valem igualmente para os blocos.
+        """
+        buckets = self.store.load_dataframe(self.collection_name, self._bucket_schema(schema), query, **kwargs)
+        return self._to_daily(buckets, schema)
+
+    def iter_dataframes(self, collection_name: str, schema: Dict[str, str], query: Dict[str, Any] = None,
+                        **kwargs) -> Iterator[pd.DataFrame]:
+        """Como 'load_dataframe', em blocos de até 'chunk_size' dias."""
+        for buckets in self.store.iter_dataframes(self.collection_name, self._bucket_schema(schema), query, **kwargs):
+            yield self._to_daily(buckets, schema)
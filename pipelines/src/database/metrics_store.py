@@ -0,0 +1,285 @@
+"""
+Camada de consulta das métricas pré-calculadas.
+
+Cada métrica é gravada como um documento por (escopo, versão da execução,
+tipo de métrica, grupo):
+
+    {"scope": "localidade|month", "run_version": "20240105T120000.123456Z",
+     "computed_at": datetime, "metric_type": "descriptive_statistics",
+     "group": {"localidade": "franca", "periodo": "2024-01"},
+     "group_key": "localidade=franca|periodo=2024-01",
+     "dia_inicio": datetime, "dia_fim": datetime, "data": [...]}
+
+Uma execução só fica visível quando seu registro na coleção de execuções é
+marcado como 'complete', depois que todos os documentos foram inseridos; as
+execuções antigas de cada escopo são removidas em seguida. As leituras filtram
+por tipo de métrica, localidade, grupo e intervalo de datas no servidor (com
+projeção) e passam por um cache em memória (LRU com TTL) cujas entradas são
+indexadas pela versão da execução: uma nova publicação invalida o cache.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Any, Callable, Dict, Hashable, List, Tuple
+
+# O pandas só é importado ao montar DataFrames: 'metrics_scope' e as constantes
+# ficam disponíveis para a CLI sem carregá-lo.
+if TYPE_CHECKING:
+    import pandas as pd
+
+    from src.database.mongo_handler import MongoHandler
+
+GLOBAL_SCOPE = "global"
+COMPLETE = "complete"
+# Execuções mantidas por escopo (as anteriores são removidas a cada publicação)
+DEFAULT_KEEP_RUNS = 3
+DEFAULT_CACHE_SIZE = 256
+DEFAULT_CACHE_TTL_SECONDS = 300
+# Intervalo mínimo entre consultas da versão mais recente de um escopo
+VERSION_CHECK_SECONDS = 5
+
+
+def metrics_scope(group_keys: List[str] | None = None, period: str | None = None) -> str:
+    """Nome do escopo das métricas: 'global' ou as colunas de agrupamento e o período (ex.: 'localidade|month')."""
+    parts = [",".join(group_keys)] if group_keys else []
+    if period:
+        parts.append(period)
+    return "|".join(parts) or GLOBAL_SCOPE
+
+
+def _group_key(group: Dict[str, Any]) -> str:
+    return "|".join(f"{name}={value}" for name, value in group.items())
+
+
+class TTLCache:
+    """Cache LRU com expiração por tempo, seguro entre threads."""
+    def __init__(self, maxsize: int = DEFAULT_CACHE_SIZE, ttl_seconds: float = DEFAULT_CACHE_TTL_SECONDS):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Any | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def discard_where(self, predicate: Callable[[Hashable], bool]):
+        """Remove as entradas cujas chaves atendem ao predicado."""
+        with self._lock:
+            for key in [key for key in self._entries if predicate(key)]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# Cache compartilhado pelo processo (consumidores que abrem um MetricsStore por requisição o reaproveitam)
+METRICS_CACHE = TTLCache()
+
+
+class MetricsStore:
+    """Publicação e leitura das métricas, um documento por (tipo de métrica, grupo, execução)."""
+    def __init__(self, mongo: MongoHandler, collection_name: str, runs_collection_name: str,
+                 cache: TTLCache | None = None, keep_runs: int = DEFAULT_KEEP_RUNS):
+        self.mongo = mongo
+        self.collection_name = collection_name
+        self.runs_collection_name = runs_collection_name
+        self.cache = cache if cache is not None else METRICS_CACHE
+        self.keep_runs = keep_runs
+        self._versions: Dict[str, Tuple[float, str | None]] = {}
+
+    def ensure_indexes(self):
+        """Cria os índices compostos usados pela publicação e pelas consultas filtradas."""
+        self.mongo.ensure_index(self.collection_name, ["scope", "run_version", "metric_type", "group_key"], unique=True)
+        self.mongo.ensure_index(self.collection_name,
+                                ["scope", "run_version", "metric_type", "group.localidade", "dia_inicio"])
+        self.mongo.ensure_index(self.runs_collection_name, ["scope", "status", "computed_at"])
+
+    # --- Escrita ---
+    def publish(self, documents: List[Dict[str, Any]], scope: str = GLOBAL_SCOPE,
+                coverage: Tuple[datetime | None, datetime | None] = (None, None)) -> str:
+        """
+        Grava os documentos de uma execução e a torna a versão atual do escopo.
+
+        Args:
+            documents (list[dict]): Documentos {'metric_type', 'data'} e, nas
+                                    métricas por grupo, 'group', 'dia_inicio' e 'dia_fim'.
+            scope (str, optional): Escopo das métricas (ver 'metrics_scope'). Defaults to 'global'.
+            coverage (tuple, optional): Intervalo de 'dia' usado nos documentos que
+                                        não informam o seu. Defaults to (None, None).
+
+        Returns:
+            str: Versão da execução publicada.
+        """
+        computed_at = datetime.now(timezone.utc)
+        run_version = computed_at.strftime("%Y%m%dT%H%M%S.%fZ")
+
+        # Documentos do formato antigo (um documento gigante por métrica) não têm versão
+        legacy = self.mongo.delete_documents(self.collection_name, {"run_version": {"$exists": False}})
+        if legacy:
+            print(f"{legacy} documentos de métricas no formato antigo removidos.")
+        self.ensure_indexes()
+
+        stamped = []
+        for document in documents:
+            group = document.get("group") or {}
+            stamped.append({
+                "scope": scope,
+                "run_version": run_version,
+                "computed_at": computed_at,
+                "metric_type": document["metric_type"],
+                "group": group,
+                "group_key": _group_key(group),
+                "dia_inicio": document.get("dia_inicio", coverage[0]),
+                "dia_fim": document.get("dia_fim", coverage[1]),
+                "data": document["data"],
+            })
+        self.mongo.insert_documents(self.collection_name, stamped)
+        self.mongo.replace_document(self.runs_collection_name, {"_id": run_version}, {
+            "_id": run_version, "scope": scope, "status": COMPLETE, "computed_at": computed_at,
+            "documents": len(stamped), "metric_types": sorted({doc["metric_type"] for doc in stamped}),
+        })
+        self._versions[scope] = (time.monotonic(), run_version)
+        self._prune(scope, run_version)
+        return run_version
+
+    def _prune(self, scope: str, run_version: str):
+        """
+        Remove as execuções do escopo além das 'keep_runs' mais recentes.
+
+        Documentos anteriores a 'run_version' sem execução registrada (de uma
+        publicação interrompida) também são removidos; as versões são ordenáveis
+        como texto, então publicações posteriores em andamento não são afetadas.
+        """
+        runs = self.mongo.find_documents(self.runs_collection_name, {"scope": scope},
+                                         projection={"_id": 1}, sort=[("computed_at", -1)])
+        kept = [run["_id"] for run in runs[:self.keep_runs]]
+        stale = [run["_id"] for run in runs[self.keep_runs:]]
+        self.mongo.delete_documents(self.collection_name,
+                                    {"scope": scope, "run_version": {"$nin": kept, "$lt": run_version}})
+        if stale:
+            self.mongo.delete_documents(self.runs_collection_name, {"_id": {"$in": stale}})
+
+    # --- Leitura ---
+    def latest_version(self, scope: str = GLOBAL_SCOPE) -> str | None:
+        """
+        Versão da última execução completa do escopo.
+
+        A consulta é refeita no máximo a cada VERSION_CHECK_SECONDS; quando a
+        versão muda, as entradas do cache com a versão anterior são descartadas.
+        """
+        checked_at, version = self._versions.get(scope, (None, None))
+        if checked_at is not None and time.monotonic() - checked_at < VERSION_CHECK_SECONDS:
+            return version
+
+        runs = self.mongo.find_documents(self.runs_collection_name, {"scope": scope, "status": COMPLETE},
+                                         projection={"_id": 1}, sort=[("computed_at", -1)], limit=1)
+        latest = runs[0]["_id"] if runs else None
+        if latest != version:
+            self.cache.discard_where(lambda key: key[:3] == (self.collection_name, scope, version))
+        self._versions[scope] = (time.monotonic(), latest)
+        return latest
+
+    def _cache_key(self, scope: str, version: str, kind: str, metric_type: str | None, **filters) -> tuple:
+        # As três primeiras posições identificam a execução (ver 'latest_version')
+        filters["group"] = tuple(sorted((filters.get("group") or {}).items()))
+        return (self.collection_name, scope, version, kind, metric_type, tuple(sorted(filters.items())))
+
+    def find(self, metric_type: str | None = None, scope: str = GLOBAL_SCOPE, location: str | None = None,
+             group: Dict[str, Any] | None = None, start: datetime | None = None, end: datetime | None = None,
+             include_data: bool = True) -> List[Dict[str, Any]]:
+        """
+        Documentos da execução atual do escopo que atendem aos filtros.
+
+        Os filtros de data selecionam os documentos cujo intervalo [dia_inicio,
+        dia_fim] cruza [start, end] (documentos sem intervalo sempre entram).
+        Com 'include_data' falso, o campo 'data' não é transferido. A lista
+        retornada é compartilhada com o cache e não deve ser alterada.
+        """
+        version = self.latest_version(scope)
+        if version is None:
+            return []
+
+        cache_key = self._cache_key(scope, version, "find", metric_type, location=location, group=group,
+                                    start=start, end=end, include_data=include_data)
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        query: Dict[str, Any] = {"scope": scope, "run_version": version}
+        if metric_type is not None:
+            query["metric_type"] = metric_type
+        if location is not None:
+            query["group.localidade"] = location
+        for name, value in (group or {}).items():
+            query[f"group.{name}"] = value
+        if start is not None:
+            query["dia_fim"] = {"$not": {"$lt": start}}
+        if end is not None:
+            query["dia_inicio"] = {"$not": {"$gt": end}}
+
+        projection = {"_id": 0, "metric_type": 1, "group": 1, "dia_inicio": 1, "dia_fim": 1, "computed_at": 1}
+        if include_data:
+            projection["data"] = 1
+        documents = self.mongo.find_documents(self.collection_name, query, projection=projection,
+                                              sort=[("metric_type", 1), ("group_key", 1)])
+        self.cache.set(cache_key, documents)
+        return documents
+
+    def get_frames(self, metric_type: str | None = None, scope: str = GLOBAL_SCOPE, **filters
+                   ) -> Dict[str, pd.DataFrame]:
+        """
+        Métricas da execução atual como DataFrames, um por tipo de métrica.
+
+        As colunas do grupo (ex.: 'localidade', 'periodo') vêm antes das colunas
+        da métrica. Aceita os mesmos filtros de 'find'.
+        """
+        import pandas as pd
+
+        version = self.latest_version(scope)
+        if version is None:
+            return {}
+
+        cache_key = self._cache_key(scope, version, "frames", metric_type, **filters)
+        cached = self.cache.get(cache_key)
+        if cached is None:
+            documents = self.find(metric_type, scope, **filters)
+            rows: Dict[str, List[Dict[str, Any]]] = {}
+            for document in documents:
+                group = document.get("group") or {}
+                rows.setdefault(document["metric_type"], []).extend({**group, **row} for row in document["data"])
+            cached = {name: pd.DataFrame(records) for name, records in rows.items()}
+            self.cache.set(cache_key, cached)
+        return {name: frame.copy() for name, frame in cached.items()}
+
+    def get_frame(self, metric_type: str, scope: str = GLOBAL_SCOPE, **filters) -> pd.DataFrame:
+        """Uma métrica da execução atual como DataFrame (vazio se não houver documentos)."""
+        frame = self.get_frames(metric_type, scope, **filters).get(metric_type)
+        if frame is None:
+            import pandas as pd
+            frame = pd.DataFrame()
+        return frame
+
+    def list_groups(self, metric_type: str, scope: str) -> List[Dict[str, Any]]:
+        """Grupos disponíveis para a métrica na execução atual (sem transferir os dados)."""
+        return [document["group"] for document in self.find(metric_type, scope, include_data=False)]
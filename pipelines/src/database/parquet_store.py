@@ -0,0 +1,7 @@
+"""
+O armazenamento Parquet é compartilhado entre 'data' (escrita) e 'pipelines'
+(leitura) e fica em 'common/storage', na raiz do repositório.
+"""
+from common.storage import ParquetStore, query_to_expression
+
+__all__ = ["ParquetStore", "query_to_expression"]
@@ -0,0 +1,6 @@
+"""Opções aceitas pela análise, sem dependências pesadas (importadas também pelos argumentos da CLI)."""
+
+# Períodos de agrupamento de 'dia' (ver grouped_metrics.add_period_column)
+PERIODS = ('month', 'season', 'year')
+# Modelos da previsão (ver forecasting.forecast_panel)
+MODELS = ('linear', 'seasonal')
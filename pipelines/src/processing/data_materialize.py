@@ -1,6 +1,8 @@
 import pandas as pd
 import numpy as np
-from sklearn.linear_model import LinearRegression
+
+from src.instrumentation import stage
+from src.processing.forecasting import fit_linear_trend, forecast_panel
 
 # --- Funções de Análise ---
 def calculate_descriptive_stats(df: pd.DataFrame) -> pd.DataFrame:
@@ -49,31 +51,229 @@ def forecast_temperature(df: pd.DataFrame, days_to_predict: int = 7) -> pd.DataF
     """Realiza uma previsão de temperatura máxima usando Regressão Linear."""
     print(f"📈 Gerando previsão de temperatura para os próximos {days_to_predict} dias...")
     
-    df_copy = df.copy()
-    df_copy['dia'] = pd.to_datetime(df_copy['dia'])
-    
-    # Prepara os dados para o modelo (dias ordinais)
-    df_copy.sort_values('dia', inplace=True)
-    df_copy.dropna(subset=['temperatura_max_c'], inplace=True)
-    df_copy['dias_ordinais'] = (df_copy['dia'] - df_copy['dia'].min()).dt.days
-    X = df_copy[['dias_ordinais']]
-    y = df_copy['temperatura_max_c']
-    
-    model = LinearRegression()
-    model.fit(X, y)
-    
-    last_ordinal_day = X['dias_ordinais'].max()
-    future_ordinal_days = np.arange(last_ordinal_day + 1, last_ordinal_day + 1 + days_to_predict).reshape(-1, 1)
-    
-    future_predictions = model.predict(future_ordinal_days)
-    
-    last_date = df_copy['dia'].max()
-    future_dates = [last_date + pd.Timedelta(days=i) for i in range(1, days_to_predict + 1)]
+    # Regressão em forma fechada sobre os dias ordinais (ver src.processing.forecasting)
+    series = pd.DataFrame({'dia': pd.to_datetime(df['dia']), 'temperatura_max_c': df['temperatura_max_c']})
+    forecast = forecast_panel(series, [], value_col='temperatura_max_c', horizon=days_to_predict)
     
     forecast_df = pd.DataFrame({
-        'dia_previsto': future_dates,
-        'temperatura_max_prevista_c': np.round(future_predictions, 2)
+        'dia_previsto': forecast['dia_previsto'],
+        'temperatura_max_prevista_c': np.round(forecast['valor_previsto'].to_numpy(dtype=np.float64), 2)
     })
     
     print("👍 Previsão gerada.")
-    return forecast_df
\ No newline at end of file
+    return forecast_df
+
+
+# --- Motor de métricas combinado ---
+NUMERIC_COLS = ['temperatura_max_c', 'temperatura_min_c', 'umidade_media_percent', 'indice_uv_max']
+STATS_REQUIRED_COLS = ['temperatura_max_c', 'temperatura_min_c']
+DESCRIBE_QUANTILES = [0.25, 0.5, 0.75]
+
+
+def normalize_metrics_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Normaliza os tipos da tabela de entrada uma única vez (colunas numéricas e 'dia').
+
+    Colunas que já possuem o tipo esperado não são convertidas nem copiadas.
+    """
+    for col in NUMERIC_COLS + ['codigo_clima']:
+        if col in df.columns and not pd.api.types.is_numeric_dtype(df[col]):
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+    if 'dia' in df.columns and not pd.api.types.is_datetime64_any_dtype(df['dia']):
+        df['dia'] = pd.to_datetime(df['dia'])
+    return df
+
+
+class ClimateMetricsEngine:
+    """
+    Calcula todas as métricas climáticas a partir de intermediários compartilhados.
+
+    Os tipos são normalizados uma vez e as colunas numéricas são lidas para uma
+    única matriz NumPy (somente leitura), reutilizada por estatísticas
+    descritivas, assimetria e correlação. Nenhuma cópia defensiva da tabela é
+    feita. Os resultados são numericamente equivalentes às funções
+    'calculate_*' e 'forecast_temperature' deste módulo.
+    """
+    def __init__(self, df: pd.DataFrame):
+        df = normalize_metrics_frame(df)
+        # Mesmas colunas que 'calculate_correlation_matrix' seleciona (numéricas, na ordem da tabela)
+        self.numeric_columns = list(df.select_dtypes(include=np.number).columns)
+        # Matriz em ordem de colunas: cada coluna é contígua para ordenações e produtos
+        self._matrix = np.empty((len(df), len(self.numeric_columns)), dtype=np.float64, order='F')
+        for position, col in enumerate(self.numeric_columns):
+            self._matrix[:, position] = df[col].to_numpy(dtype=np.float64, na_value=np.nan)
+        self._matrix.flags.writeable = False
+        self._codes = df['codigo_clima'] if 'codigo_clima' in df.columns else None
+        self._days = df['dia'].to_numpy(dtype='datetime64[ns]') if 'dia' in df.columns else None
+
+    def _column(self, name: str) -> np.ndarray:
+        return self._matrix[:, self.numeric_columns.index(name)]
+
+    def descriptive_stats(self) -> pd.DataFrame:
+        """Equivalente a 'calculate_descriptive_stats' (describe + moda, mediana e assimetria)."""
+        print("Calculando estatísticas descritivas...")
+        valid_rows = np.ones(self._matrix.shape[0], dtype=bool)
+        for col in STATS_REQUIRED_COLS:
+            valid_rows &= ~np.isnan(self._column(col))
+
+        rows = {}
+        for col in NUMERIC_COLS:
+            column = self._column(col)
+            rows[col] = _summarize_column(column[valid_rows & ~np.isnan(column)])
+
+        stats_df = pd.DataFrame.from_dict(rows, orient='index')
+        stats_df = stats_df.reset_index().rename(columns={'index': 'metrica'})
+        print("Estatísticas calculadas.")
+        return stats_df
+
+    def correlation_matrix(self, chunk_rows: int = 262_144) -> pd.DataFrame:
+        """Equivalente a 'calculate_correlation_matrix' (Pearson com observações completas por par)."""
+        print("Calculando a matriz de correlação...")
+        corr = _pairwise_pearson(self._matrix, chunk_rows)
+        correlation_matrix = pd.DataFrame(corr, index=self.numeric_columns, columns=self.numeric_columns)
+        correlation_matrix = correlation_matrix.reset_index().rename(columns={'index': 'variable'})
+        print("Matriz de correlação calculada.")
+        return correlation_matrix
+
+    def weather_code_probabilities(self) -> pd.DataFrame:
+        """Equivalente a 'calculate_weather_code_probabilities'."""
+        print("Calculando probabilidades dos códigos de clima...")
+        codes = self._codes.to_numpy(dtype=np.float64, na_value=np.nan)
+        codes = codes[~np.isnan(codes)]
+        values, counts = np.unique(codes, return_counts=True)
+        order = np.argsort(-counts, kind='stable')
+
+        probs_df = pd.DataFrame({
+            # Volta ao tipo original da coluna para manter os mesmos rótulos em texto
+            'codigo_clima': pd.Series(values[order]).astype(self._codes.dtype).astype(str),
+            'probabilidade_percent': counts[order] / codes.size * 100
+        })
+        print("👍 Probabilidades calculadas.")
+        return probs_df
+
+    def forecast(self, days_to_predict: int = 7) -> pd.DataFrame:
+        """Equivalente a 'forecast_temperature' (regressão linear da temperatura máxima no tempo)."""
+        print(f"📈 Gerando previsão de temperatura para os próximos {days_to_predict} dias...")
+        y = self._column('temperatura_max_c')
+        valid = ~np.isnan(y)
+        days = self._days[valid]
+        y = y[valid]
+
+        first_day, last_day = days.min(), days.max()
+        x = (days - first_day) // np.timedelta64(1, 'D')
+        x = x.astype(np.float64)
+        slope, intercept = fit_linear_trend(x, y, np.zeros(x.size, dtype=np.int64), 1)
+        slope, intercept = slope[0], intercept[0]
+
+        last_ordinal_day = x.max()
+        future_ordinal_days = np.arange(last_ordinal_day + 1, last_ordinal_day + 1 + days_to_predict)
+        future_predictions = intercept + slope * future_ordinal_days
+
+        forecast_df = pd.DataFrame({
+            'dia_previsto': pd.to_datetime(last_day) + pd.to_timedelta(np.arange(1, days_to_predict + 1), unit='D'),
+            'temperatura_max_prevista_c': np.round(future_predictions, 2)
+        })
+        print("👍 Previsão gerada.")
+        return forecast_df
+
+    def compute_all(self, days_to_predict: int = 7) -> dict[str, pd.DataFrame]:
+        """Calcula todas as métricas, indexadas pelo 'metric_type' usado na coleção de métricas."""
+        tasks = {
+            "descriptive_statistics": self.descriptive_stats,
+            "correlation_matrix": self.correlation_matrix,
+            "weather_code_probability": self.weather_code_probabilities,
+            "temperature_forecast": lambda: self.forecast(days_to_predict),
+        }
+        metrics = {}
+        for metric_type, compute in tasks.items():
+            with stage(f"analysis.metric.{metric_type}") as st:
+                metrics[metric_type] = compute()
+                st.rows(len(metrics[metric_type]), rows_in=self._matrix.shape[0])
+        return metrics
+
+
+def _summarize_column(values: np.ndarray) -> dict:
+    """Estatísticas de uma coluna sem nulos, a partir de uma única ordenação."""
+    n = values.size
+    if n == 0:
+        return {key: (0.0 if key == 'count' else np.nan)
+                for key in ['count', 'mean', 'std', 'min', '25%', '50%', '75%', 'max', 'mode', 'median', 'skew']}
+
+    ordered = np.sort(values)
+    mean = values.sum() / n
+    centered = values - mean
+    m2 = np.dot(centered, centered)
+    m3 = np.dot(centered * centered, centered)
+
+    # Interpolação linear, como em DataFrame.describe/quantile
+    positions = np.array(DESCRIBE_QUANTILES) * (n - 1)
+    lower = np.floor(positions).astype(np.int64)
+    upper = np.minimum(lower + 1, n - 1)
+    quantiles = ordered[lower] + (ordered[upper] - ordered[lower]) * (positions - lower)
+
+    # Moda: maior sequência de valores iguais no vetor ordenado (a menor em caso de empate)
+    boundaries = np.flatnonzero(np.diff(ordered)) + 1
+    run_starts = np.concatenate(([0], boundaries))
+    run_lengths = np.diff(np.concatenate((run_starts, [n])))
+    mode = ordered[run_starts[np.argmax(run_lengths)]]
+
+    return {
+        'count': float(n),
+        'mean': mean,
+        'std': np.sqrt(m2 / (n - 1)) if n > 1 else np.nan,
+        'min': ordered[0],
+        '25%': quantiles[0],
+        '50%': quantiles[1],
+        '75%': quantiles[2],
+        'max': ordered[-1],
+        'mode': mode,
+        'median': quantiles[1],
+        'skew': _adjusted_skew(n, m2, m3),
+    }
+
+
+def _adjusted_skew(n: int, m2: float, m3: float) -> float:
+    """Assimetria de Fisher-Pearson ajustada, com as mesmas regras de 'Series.skew'."""
+    if n < 3:
+        return np.nan
+    # Zera resíduos de ponto flutuante como o pandas faz
+    m2 = 0.0 if abs(m2) < 1e-14 else m2
+    m3 = 0.0 if abs(m3) < 1e-14 else m3
+    if m2 == 0:
+        return 0.0
+    return (n * (n - 1) ** 0.5 / (n - 2)) * (m3 / m2 ** 1.5)
+
+
+def _pairwise_pearson(matrix: np.ndarray, chunk_rows: int) -> np.ndarray:
+    """
+    Correlação de Pearson por par de colunas usando apenas as linhas em que ambas são válidas.
+
+    As somas são acumuladas em blocos de linhas, limitando a memória extra a
+    'chunk_rows' x colunas. Os dados são deslocados pela média de cada coluna
+    antes das somas para manter a precisão numérica.
+    """
+    k = matrix.shape[1]
+    shift = np.nanmean(matrix, axis=0) if matrix.shape[0] else np.zeros(k)
+    shift = np.nan_to_num(shift)
+    n = np.zeros((k, k))
+    sx = np.zeros((k, k))
+    sxx = np.zeros((k, k))
+    sxy = np.zeros((k, k))
+
+    for start in range(0, matrix.shape[0], chunk_rows):
+        block = matrix[start:start + chunk_rows] - shift
+        valid = (~np.isnan(block)).astype(np.float64)
+        block = np.nan_to_num(block, nan=0.0)
+        n += valid.T @ valid
+        sx += block.T @ valid
+        sxx += (block * block).T @ valid
+        sxy += block.T @ block
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cov = sxy - sx * sx.T / n
+        var_x = sxx - sx * sx / n
+        var_y = var_x.T
+        corr = cov / np.sqrt(var_x * var_y)
+    corr[(n < 2) | (var_x <= 0) | (var_y <= 0)] = np.nan
+    return np.clip(corr, -1.0, 1.0)
+
@@ -0,0 +1,136 @@
+from typing import List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.processing.choices import MODELS
+
+DAYS_PER_YEAR = 365.25
+
+
+def _days_since_epoch(days: np.ndarray) -> np.ndarray:
+    return (days.astype('datetime64[ns]') - np.datetime64(0, 'ns')) // np.timedelta64(1, 'D')
+
+
+def fit_linear_trend(t: np.ndarray, y: np.ndarray, codes: np.ndarray, n_series: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Regressão linear simples y = a + b·t de várias séries ao mesmo tempo, em forma fechada.
+
+    As somas de cada série são acumuladas com 'np.bincount' sobre o código da
+    série, com os dados centrados na média da série para manter a precisão.
+
+    Returns:
+        tuple: (inclinações, interceptos), um valor por série.
+    """
+    n = np.bincount(codes, minlength=n_series).astype(np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean_t = np.bincount(codes, weights=t, minlength=n_series) / n
+        mean_y = np.bincount(codes, weights=y, minlength=n_series) / n
+    t_centered = t - mean_t[codes]
+    sxx = np.bincount(codes, weights=t_centered * t_centered, minlength=n_series)
+    sxy = np.bincount(codes, weights=t_centered * (y - mean_y[codes]), minlength=n_series)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slope = np.where(sxx > 0, sxy / sxx, 0.0)
+    return slope, mean_y - slope * mean_t
+
+
+def _seasonal_design(t: np.ndarray, absolute_day: np.ndarray, t_offset: np.ndarray, harmonics: int) -> np.ndarray:
+    """Colunas [1, t, sen(kωd), cos(kωd), ...] com ω = 2π/365,25 e d = dia absoluto."""
+    columns = [np.ones_like(t), t - t_offset]
+    for k in range(1, harmonics + 1):
+        angle = 2 * np.pi * k * absolute_day / DAYS_PER_YEAR
+        columns.extend((np.sin(angle), np.cos(angle)))
+    return np.column_stack(columns)
+
+
+def fit_seasonal_trend(t: np.ndarray, absolute_day: np.ndarray, y: np.ndarray, codes: np.ndarray,
+                       n_series: int, harmonics: int = 2) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Tendência linear + harmônicos anuais de várias séries, por mínimos quadrados empilhados.
+
+    As equações normais (X'X e X'y) de todas as séries são montadas com
+    'np.bincount' e resolvidas de uma vez com a pseudoinversa em lote, o que
+    também cobre séries curtas ou mal condicionadas.
+
+    Returns:
+        tuple: (coeficientes (séries x parâmetros), média de t por série usada na centralização).
+    """
+    n = np.maximum(np.bincount(codes, minlength=n_series), 1)
+    mean_t = np.bincount(codes, weights=t, minlength=n_series) / n
+    design = _seasonal_design(t, absolute_day, mean_t[codes], harmonics)
+    p = design.shape[1]
+
+    xtx = np.empty((n_series, p, p))
+    xty = np.empty((n_series, p))
+    for i in range(p):
+        xty[:, i] = np.bincount(codes, weights=design[:, i] * y, minlength=n_series)
+        for j in range(i, p):
+            xtx[:, i, j] = xtx[:, j, i] = np.bincount(codes, weights=design[:, i] * design[:, j], minlength=n_series)
+    coefficients = np.einsum('sij,sj->si', np.linalg.pinv(xtx), xty)
+    return coefficients, mean_t
+
+
+def forecast_panel(panel: pd.DataFrame, key_cols: List[str], value_col: str = 'temperatura_max_c',
+                   day_col: str = 'dia', horizon: int = 7, model: str = 'linear',
+                   harmonics: int = 2) -> pd.DataFrame:
+    """
+    Prevê os próximos 'horizon' dias de todas as séries de um painel em uma única chamada.
+
+    Cada série é identificada pelas colunas 'key_cols' (ex.: ['localidade']);
+    linhas sem valor são ignoradas. No modelo 'linear', o resultado é o mesmo de
+    'forecast_temperature' aplicado a cada série: t conta os dias desde o
+    primeiro dia da série e as previsões começam no dia seguinte ao último.
+
+    Args:
+        panel (pd.DataFrame): Tabela com as chaves, o dia e o valor.
+        key_cols (list[str]): Colunas que identificam cada série ([] = série única).
+        value_col (str, optional): Coluna prevista. Defaults to 'temperatura_max_c'.
+        day_col (str, optional): Coluna de datas. Defaults to 'dia'.
+        horizon (int, optional): Dias a prever. Defaults to 7.
+        model (str, optional): 'linear' ou 'seasonal' (tendência + harmônicos anuais).
+        harmonics (int, optional): Número de harmônicos do modelo sazonal. Defaults to 2.
+
+    Returns:
+        pd.DataFrame: Colunas key_cols + ['dia_previsto', 'valor_previsto'], 'horizon' linhas por série.
+    """
+    if model not in MODELS:
+        raise ValueError(f"Modelo inválido: '{model}'. Use um de {MODELS}.")
+
+    y_all = panel[value_col].to_numpy(dtype=np.float64, na_value=np.nan)
+    valid = ~np.isnan(y_all)
+    if key_cols:
+        grouped = panel[valid].groupby(key_cols, observed=True, sort=True)
+        codes = grouped.ngroup().to_numpy()
+        keys = grouped.size().index.to_frame(index=False)
+    else:
+        codes = np.zeros(int(valid.sum()), dtype=np.int64)
+        keys = pd.DataFrame(index=[0])
+    n_series = len(keys)
+    if n_series == 0 or not valid.any():
+        return pd.DataFrame(columns=key_cols + ['dia_previsto', 'valor_previsto'])
+
+    y = y_all[valid]
+    absolute_day = _days_since_epoch(panel[day_col].to_numpy()[valid])
+    first_day = np.full(n_series, np.iinfo(np.int64).max)
+    last_day = np.full(n_series, np.iinfo(np.int64).min)
+    np.minimum.at(first_day, codes, absolute_day)
+    np.maximum.at(last_day, codes, absolute_day)
+    t = (absolute_day - first_day[codes]).astype(np.float64)
+
+    steps = np.arange(1, horizon + 1)
+    future_day = last_day[:, None] + steps[None, :]                      # (séries, horizonte)
+    future_t = (future_day - first_day[:, None]).astype(np.float64)
+
+    if model == 'linear':
+        slope, intercept = fit_linear_trend(t, y, codes, n_series)
+        predictions = intercept[:, None] + slope[:, None] * future_t
+    else:
+        coefficients, mean_t = fit_seasonal_trend(t, absolute_day.astype(np.float64), y, codes, n_series, harmonics)
+        design = _seasonal_design(future_t.ravel(), future_day.ravel().astype(np.float64),
+                                  np.repeat(mean_t, horizon), harmonics)
+        predictions = np.einsum('rp,rp->r', design, np.repeat(coefficients, horizon, axis=0)).reshape(n_series, horizon)
+
+    result = keys.loc[keys.index.repeat(horizon)].reset_index(drop=True) if key_cols else pd.DataFrame(index=range(horizon))
+    result['dia_previsto'] = pd.to_datetime(future_day.ravel(), unit='D')
+    result['valor_previsto'] = predictions.ravel()
+    return result
@@ -0,0 +1,283 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.processing.data_materialize import (
+    NUMERIC_COLS,
+    STATS_REQUIRED_COLS,
+    normalize_metrics_frame,
+)
+from src.processing.choices import PERIODS
+from src.processing.forecasting import forecast_panel
+from src.processing.rolling_metrics import (
+    ANOMALY_METRIC,
+    CLIMATOLOGY_METRICS,
+    EVENTS_METRIC,
+    ROLLING_METRIC,
+    Climatology,
+    extreme_events,
+    rolling_statistics,
+    temperature_anomalies,
+)
+
+PERIOD_COLUMN = 'periodo'
+# Estações meteorológicas do hemisfério sul (dezembro pertence ao verão do ano seguinte)
+SEASON_NAMES = ('verao', 'outono', 'inverno', 'primavera')
+# Abaixo deste número de séries, a previsão vetorizada em um só processo é mais rápida que o pool
+PARALLEL_MIN_SERIES = 2_000
+
+
+def add_period_column(df: pd.DataFrame, period: str) -> pd.DataFrame:
+    """
+    Adiciona a coluna categórica 'periodo' ('2024-01', '2024-verao' ou '2024') a partir de 'dia'.
+
+    O rótulo é calculado sobre códigos inteiros e formatado apenas uma vez por
+    período distinto, sem formatar datas linha a linha.
+    """
+    if period not in PERIODS:
+        raise ValueError(f"Período inválido: '{period}'. Use um de {PERIODS}.")
+
+    years = df['dia'].dt.year.to_numpy()
+    months = df['dia'].dt.month.to_numpy()
+    if period == 'month':
+        codes = years * 100 + months
+        label = lambda code: f"{code // 100:04d}-{code % 100:02d}"
+    elif period == 'season':
+        codes = (years + (months == 12)) * 10 + (months % 12) // 3
+        label = lambda code: f"{code // 10:04d}-{SEASON_NAMES[code % 10]}"
+    else:
+        codes = years
+        label = lambda code: f"{code:04d}"
+
+    uniques, inverse = np.unique(codes, return_inverse=True)
+    df[PERIOD_COLUMN] = pd.Categorical.from_codes(inverse, [label(code) for code in uniques])
+    return df
+
+
+def series_keys(group_keys: List[str]) -> List[str]:
+    """Colunas que identificam as séries diárias (as de agrupamento, sem o período)."""
+    return [key for key in group_keys if key != PERIOD_COLUMN]
+
+
+def _group_dict(group_keys: List[str], key: Any) -> Dict[str, Any]:
+    key = key if isinstance(key, tuple) else (key,)
+    return {name: (value.item() if isinstance(value, np.generic) else value) for name, value in zip(group_keys, key)}
+
+
+def _records_by_group(df: pd.DataFrame, group_keys: List[str]) -> Iterator[Tuple[tuple, List[Dict[str, Any]]]]:
+    """
+    Registros (sem as colunas de agrupamento) de cada grupo, na ordem das chaves.
+
+    As linhas são ordenadas por grupo e convertidas em registros de uma só vez;
+    cada grupo recebe uma fatia da lista, sem um DataFrame por grupo.
+    """
+    if df.empty:
+        return
+    grouper = df.groupby(group_keys, observed=True, sort=True)
+    codes = grouper.ngroup().to_numpy()
+    order = np.argsort(codes, kind='stable')
+    records = df.drop(columns=group_keys).iloc[order].to_dict('records')
+    bounds = np.concatenate(([0], np.cumsum(np.bincount(codes))))
+    for i, key in enumerate(grouper.size().index):
+        yield (key if isinstance(key, tuple) else (key,)), records[bounds[i]:bounds[i + 1]]
+
+
+# --- Métricas vetorizadas (groupby) ---
+def grouped_descriptive_stats(df: pd.DataFrame, group_keys: List[str]) -> pd.DataFrame:
+    """Estatísticas descritivas por grupo, no mesmo formato de 'calculate_descriptive_stats'."""
+    valid = df.dropna(subset=STATS_REQUIRED_COLS)
+    grouped = valid.groupby(group_keys, observed=True)[NUMERIC_COLS]
+
+    statistics = {
+        'count': grouped.count().astype(float),
+        'mean': grouped.mean(),
+        'std': grouped.std(),
+        'min': grouped.min(),
+        '25%': grouped.quantile(0.25),
+        '50%': grouped.quantile(0.5),
+        '75%': grouped.quantile(0.75),
+        'max': grouped.max(),
+        'mode': _grouped_mode(valid, group_keys),
+        'median': grouped.median(),
+        'skew': grouped.skew(),
+    }
+    # Cada estatística vira uma coluna; as variáveis viram linhas ('metrica')
+    long = pd.concat(
+        {name: frame.rename_axis(columns='metrica').stack(future_stack=True) for name, frame in statistics.items()},
+        axis=1
+    )
+    return long.reset_index()
+
+
+def _grouped_mode(df: pd.DataFrame, group_keys: List[str]) -> pd.DataFrame:
+    """Moda por grupo e coluna (o menor valor em caso de empate, como em DataFrame.mode)."""
+    modes = {}
+    for col in NUMERIC_COLS:
+        counts = df.groupby(group_keys + [col], observed=True).size().rename('n').reset_index()
+        counts = counts.sort_values(group_keys + ['n', col], ascending=[True] * len(group_keys) + [False, True])
+        modes[col] = counts.drop_duplicates(group_keys).set_index(group_keys)[col]
+    return pd.DataFrame(modes)
+
+
+def grouped_correlation_matrix(df: pd.DataFrame, group_keys: List[str]) -> pd.DataFrame:
+    """Matriz de correlação por grupo, no mesmo formato de 'calculate_correlation_matrix'."""
+    columns = [col for col in df.select_dtypes(include=np.number).columns if col not in group_keys]
+    corr = df.groupby(group_keys, observed=True)[columns].corr()
+    return corr.rename_axis(index=group_keys + ['variable']).reset_index()
+
+
+def grouped_weather_code_probabilities(df: pd.DataFrame, group_keys: List[str]) -> pd.DataFrame:
+    """Probabilidade de cada código de clima por grupo."""
+    probs = df.groupby(group_keys, observed=True)['codigo_clima'].value_counts(normalize=True) * 100
+    probs_df = probs.rename('probabilidade_percent').reset_index()
+    probs_df['codigo_clima'] = probs_df['codigo_clima'].astype(str)
+    return probs_df
+
+
+# --- Previsão por grupo ---
+def grouped_forecast(df: pd.DataFrame, group_keys: List[str], days_to_predict: int = 7,
+                     max_workers: int | None = None, model: str = 'linear') -> Dict[Any, list]:
+    """
+    Previsão de temperatura máxima por grupo.
+
+    Todas as séries são ajustadas de uma vez por 'forecast_panel'. Com muitas
+    séries, elas são divididas em blocos contíguos processados em um
+    ProcessPoolExecutor.
+    """
+    panel = df[group_keys + ['dia', 'temperatura_max_c']]
+    codes = panel.groupby(group_keys, observed=True, sort=True).ngroup().to_numpy()
+    n_series = int(codes.max()) + 1 if codes.size else 0
+    workers = max_workers or 1
+
+    if workers == 1 or n_series < PARALLEL_MIN_SERIES:
+        forecast = forecast_panel(panel, group_keys, horizon=days_to_predict, model=model)
+    else:
+        shard_of_row = codes * workers // n_series
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(forecast_panel, panel[shard_of_row == shard], group_keys,
+                                horizon=days_to_predict, model=model)
+                for shard in range(workers)
+            ]
+            forecast = pd.concat([future.result() for future in futures], ignore_index=True)
+
+    # O painel devolve 'days_to_predict' linhas consecutivas por série, na ordem das chaves
+    forecast['temperatura_max_prevista_c'] = np.round(forecast.pop('valor_previsto').to_numpy(dtype=np.float64), 2)
+    records = forecast[['dia_previsto', 'temperatura_max_prevista_c']].to_dict('records')
+    keys = forecast[group_keys].iloc[::days_to_predict].itertuples(index=False, name=None)
+    return {
+        key if len(group_keys) > 1 else key[0]: records[i * days_to_predict:(i + 1) * days_to_predict]
+        for i, key in enumerate(keys)
+    }
+
+
+# Métricas por grupo calculadas com groupby; a previsão ('temperature_forecast') é tratada à parte
+GROUPED_METRICS = {
+    "descriptive_statistics": grouped_descriptive_stats,
+    "correlation_matrix": grouped_correlation_matrix,
+    "weather_code_probability": grouped_weather_code_probabilities,
+}
+FORECAST_METRIC = "temperature_forecast"
+# Métricas sobre as séries diárias de cada localidade (ver rolling_metrics). As janelas e os eventos
+# atravessam os limites dos períodos; cada dia (ou evento) fica no grupo do seu período.
+SERIES_METRICS = {
+    ROLLING_METRIC: lambda df, keys, climatology: rolling_statistics(df, series_keys(keys), keys),
+    ANOMALY_METRIC: lambda df, keys, climatology: temperature_anomalies(df, series_keys(keys), keys, climatology),
+    EVENTS_METRIC: lambda df, keys, climatology: extreme_events(df, series_keys(keys), keys, climatology),
+}
+METRIC_TYPES = (*GROUPED_METRICS, FORECAST_METRIC, *SERIES_METRICS)
+
+
+def prepare_grouped_frame(df: pd.DataFrame, group_keys: List[str], period: str | None = None
+                          ) -> Tuple[pd.DataFrame, List[str]]:
+    """Normaliza a tabela e adiciona a coluna de período; retorna a tabela e as colunas de agrupamento."""
+    df = normalize_metrics_frame(df)
+    group_keys = list(group_keys)
+    if period:
+        df = add_period_column(df, period)
+        group_keys.append(PERIOD_COLUMN)
+    if not group_keys:
+        raise ValueError("Informe ao menos uma coluna de agrupamento ou um período.")
+    return df, group_keys
+
+
+def grouped_metric_documents(df: pd.DataFrame, group_keys: List[str], metric_type: str,
+                             days_to_predict: int = 7, max_workers: int | None = None,
+                             forecast_model: str = 'linear', climatology: Climatology | None = None
+                             ) -> List[Dict[str, Any]]:
+    """
+    Calcula um tipo de métrica por grupo sobre uma tabela já preparada ('prepare_grouped_frame').
+
+    As métricas de CLIMATOLOGY_METRICS exigem a normal climatológica das séries ('climatology').
+
+    Returns:
+        list[dict]: Documentos {'metric_type', 'group', 'dia_inicio', 'dia_fim', 'data'}, um por grupo.
+    """
+    # Intervalo de 'dia' coberto por cada grupo (usado nos filtros por data da camada de consulta)
+    coverage = df.groupby(group_keys, observed=True)['dia'].agg(['min', 'max'])
+    coverage = dict(zip(coverage.index.to_flat_index(), zip(coverage['min'], coverage['max'])))
+
+    def document(key: Any, data: list) -> Dict[str, Any]:
+        # O groupby devolve tuplas mesmo com uma única coluna; o índice do agg, não
+        lookup = key[0] if isinstance(key, tuple) and len(group_keys) == 1 else key
+        first_day, last_day = coverage.get(lookup, (None, None))
+        return {"metric_type": metric_type, "group": _group_dict(group_keys, key),
+                "dia_inicio": first_day, "dia_fim": last_day, "data": data}
+
+    if metric_type == FORECAST_METRIC:
+        forecasts = grouped_forecast(df, group_keys, days_to_predict, max_workers or os.cpu_count(), forecast_model)
+        return [document(key, records) for key, records in forecasts.items()]
+    if metric_type in SERIES_METRICS:
+        if metric_type in CLIMATOLOGY_METRICS and climatology is None:
+            raise ValueError(f"A métrica '{metric_type}' precisa da normal climatológica das séries.")
+        frame = SERIES_METRICS[metric_type](df, group_keys, climatology)
+    elif metric_type in GROUPED_METRICS:
+        frame = GROUPED_METRICS[metric_type](df, group_keys)
+    else:
+        raise ValueError(f"Métrica desconhecida: '{metric_type}'. Use uma de {METRIC_TYPES}.")
+
+    return [document(key, records) for key, records in _records_by_group(frame, group_keys)]
+
+
+def compute_grouped_metrics(df: pd.DataFrame, group_keys: List[str], period: str | None = None,
+                            days_to_predict: int = 7, max_workers: int | None = None,
+                            forecast_model: str = 'linear', climatology: Climatology | None = None
+                            ) -> List[Dict[str, Any]]:
+    """
+    Calcula as métricas por grupo e retorna um documento por (tipo de métrica, grupo).
+
+    Estatísticas, correlação e probabilidades são calculadas com groupby
+    vetorizado; as previsões de todos os grupos são ajustadas de uma vez e, com
+    muitos grupos, distribuídas entre processos. Janelas móveis, anomalias e
+    eventos extremos são calculados sobre a grade diária de cada localidade.
+
+    Args:
+        df (pd.DataFrame): Tabela de entrada.
+        group_keys (list[str]): Colunas que definem os grupos (ex.: ['localidade']).
+        period (str, optional): Se informado ('month', 'season' ou 'year'), agrupa
+                                também pelo período de 'dia'. Defaults to None.
+        days_to_predict (int, optional): Horizonte da previsão. Defaults to 7.
+        max_workers (int, optional): Processos usados na previsão. Defaults to os.cpu_count().
+        forecast_model (str, optional): 'linear' ou 'seasonal' (ver forecast_panel). Defaults to 'linear'.
+        climatology (Climatology, optional): Normal climatológica das séries (ver
+                                             rolling_metrics). Se omitida, é calculada a partir de 'df'.
+
+    Returns:
+        list[dict]: Documentos {'metric_type', 'group', 'dia_inicio', 'dia_fim', 'data'}.
+    """
+    df, group_keys = prepare_grouped_frame(df, group_keys, period)
+    if climatology is None:
+        climatology = Climatology.build(df, series_keys(group_keys))
+
+    print(f"Calculando métricas por grupo {group_keys}...")
+    documents = []
+    for metric_type in METRIC_TYPES:
+        documents += grouped_metric_documents(df, group_keys, metric_type, days_to_predict,
+                                              max_workers, forecast_model, climatology)
+
+    groups = sum(doc["metric_type"] == FORECAST_METRIC for doc in documents)
+    print(f"👍 {len(documents)} documentos de métricas gerados para {groups} grupos.")
+    return documents
@@ -0,0 +1,493 @@
+from datetime import datetime
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+
+from src.processing.data_materialize import (
+    DESCRIBE_QUANTILES,
+    NUMERIC_COLS,
+    STATS_REQUIRED_COLS,
+    ClimateMetricsEngine,
+    _adjusted_skew,
+    normalize_metrics_frame,
+)
+
+# Colunas da matriz de correlação (as numéricas do INPUT_SCHEMA, na mesma ordem)
+CORRELATION_COLS = ['codigo_clima'] + NUMERIC_COLS
+STATE_DOCUMENT_ID = "global"
+
+
+# --- Momentos (média, desvio padrão e assimetria) ---
+class MomentState:
+    """
+    Contagem, média e momentos centrais de 2ª e 3ª ordem de várias colunas.
+
+    Estados de lotes diferentes são combinados com as fórmulas de Chan/Terriberry,
+    sem reler os dados já processados.
+    """
+    def __init__(self, size: int):
+        self.n = np.zeros(size)
+        self.mean = np.zeros(size)
+        self.m2 = np.zeros(size)
+        self.m3 = np.zeros(size)
+        self.min = np.full(size, np.inf)
+        self.max = np.full(size, -np.inf)
+
+    @classmethod
+    def from_columns(cls, columns: List[np.ndarray]) -> "MomentState":
+        state = cls(len(columns))
+        for i, values in enumerate(columns):
+            values = values[~np.isnan(values)]
+            if values.size == 0:
+                continue
+            mean = values.mean()
+            centered = values - mean
+            state.n[i] = values.size
+            state.mean[i] = mean
+            state.m2[i] = np.dot(centered, centered)
+            state.m3[i] = np.dot(centered * centered, centered)
+            state.min[i] = values.min()
+            state.max[i] = values.max()
+        return state
+
+    def merge(self, other: "MomentState") -> "MomentState":
+        merged = MomentState(self.n.size)
+        n = self.n + other.n
+        with np.errstate(divide='ignore', invalid='ignore'):
+            delta = other.mean - self.mean
+            weight = np.where(n > 0, self.n * other.n / n, 0.0)
+            merged.mean = np.where(n > 0, self.mean + delta * np.where(n > 0, other.n / n, 0.0), 0.0)
+            merged.m2 = self.m2 + other.m2 + delta ** 2 * weight
+            merged.m3 = (self.m3 + other.m3
+                         + delta ** 3 * weight * np.where(n > 0, (self.n - other.n) / n, 0.0)
+                         + 3 * delta * np.where(n > 0, (self.n * other.m2 - other.n * self.m2) / n, 0.0))
+        merged.n = n
+        merged.min = np.minimum(self.min, other.min)
+        merged.max = np.maximum(self.max, other.max)
+        return merged
+
+    def to_dict(self) -> Dict[str, list]:
+        return {name: getattr(self, name).tolist() for name in ('n', 'mean', 'm2', 'm3', 'min', 'max')}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, list]) -> "MomentState":
+        state = cls(len(data['n']))
+        for name in ('n', 'mean', 'm2', 'm3', 'min', 'max'):
+            setattr(state, name, np.asarray(data[name], dtype=np.float64))
+        return state
+
+
+# --- Co-momentos (correlação com observações completas por par) ---
+class CoMomentState:
+    """
+    Co-momentos por par de colunas, considerando apenas as linhas em que ambas são válidas.
+
+    Para cada par (i, j) guarda a contagem, a média de i, a soma dos quadrados
+    dos desvios de i e o co-momento, todos restritos às linhas válidas do par.
+    """
+    def __init__(self, size: int):
+        self.n = np.zeros((size, size))
+        self.mean = np.zeros((size, size))
+        self.m2 = np.zeros((size, size))
+        self.c = np.zeros((size, size))
+
+    @classmethod
+    def from_matrix(cls, matrix: np.ndarray) -> "CoMomentState":
+        state = cls(matrix.shape[1])
+        if matrix.shape[0] == 0:
+            return state
+        # Desloca cada coluna pela sua média para manter a precisão das somas
+        valid_counts = (~np.isnan(matrix)).sum(axis=0)
+        shift = np.where(valid_counts > 0, np.nansum(matrix, axis=0) / np.maximum(valid_counts, 1), 0.0)
+        block = matrix - shift
+        valid = (~np.isnan(block)).astype(np.float64)
+        block = np.nan_to_num(block, nan=0.0)
+
+        n = valid.T @ valid
+        sx = block.T @ valid
+        sxx = (block * block).T @ valid
+        sxy = block.T @ block
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean_shifted = np.where(n > 0, sx / n, 0.0)
+            state.c = np.where(n > 0, sxy - sx * sx.T / n, 0.0)
+            state.m2 = np.where(n > 0, sxx - sx * sx / n, 0.0)
+        state.n = n
+        state.mean = np.where(n > 0, mean_shifted + shift[:, None], 0.0)
+        return state
+
+    def merge(self, other: "CoMomentState") -> "CoMomentState":
+        merged = CoMomentState(self.n.shape[0])
+        n = self.n + other.n
+        with np.errstate(divide='ignore', invalid='ignore'):
+            delta = other.mean - self.mean
+            weight = np.where(n > 0, self.n * other.n / n, 0.0)
+            merged.mean = np.where(n > 0, self.mean + delta * np.where(n > 0, other.n / n, 0.0), 0.0)
+        merged.n = n
+        merged.m2 = self.m2 + other.m2 + delta ** 2 * weight
+        merged.c = self.c + other.c + delta * delta.T * weight
+        return merged
+
+    def correlation(self) -> np.ndarray:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            corr = self.c / np.sqrt(self.m2 * self.m2.T)
+        corr[(self.n < 2) | (self.m2 <= 0) | (self.m2.T <= 0)] = np.nan
+        return np.clip(corr, -1.0, 1.0)
+
+    def to_dict(self) -> Dict[str, list]:
+        return {name: getattr(self, name).tolist() for name in ('n', 'mean', 'm2', 'c')}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, list]) -> "CoMomentState":
+        state = cls(len(data['n']))
+        for name in ('n', 'mean', 'm2', 'c'):
+            setattr(state, name, np.asarray(data[name], dtype=np.float64))
+        return state
+
+
+# --- Esboço de quantis ---
+class QuantileSketch:
+    """
+    Esboço combinável de quantis e moda.
+
+    Enquanto o número de valores distintos não passa de 'max_bins', guarda o
+    histograma exato (valor -> contagem), e quantis e moda são exatos. Acima
+    disso, os valores são comprimidos em centróides de um t-digest (função de
+    escala k1, parâmetro 'compression') e os resultados passam a ser aproximados.
+    """
+    def __init__(self, values: np.ndarray | None = None, weights: np.ndarray | None = None,
+                 exact: bool = True, max_bins: int = 20_000, compression: float = 200.0):
+        self.values = np.empty(0) if values is None else np.asarray(values, dtype=np.float64)
+        self.weights = np.empty(0) if weights is None else np.asarray(weights, dtype=np.float64)
+        self.exact = exact
+        self.max_bins = max_bins
+        self.compression = compression
+
+    @classmethod
+    def from_values(cls, values: np.ndarray, **kwargs) -> "QuantileSketch":
+        values, counts = np.unique(values[~np.isnan(values)], return_counts=True)
+        return cls(values, counts, **kwargs)._bounded()
+
+    @property
+    def count(self) -> float:
+        return float(self.weights.sum())
+
+    def merge(self, other: "QuantileSketch") -> "QuantileSketch":
+        values = np.concatenate((self.values, other.values))
+        weights = np.concatenate((self.weights, other.weights))
+        exact = self.exact and other.exact
+        if exact:
+            values, inverse = np.unique(values, return_inverse=True)
+            weights = np.bincount(inverse, weights=weights)
+        else:
+            order = np.argsort(values, kind='stable')
+            values, weights = values[order], weights[order]
+        merged = QuantileSketch(values, weights, exact, self.max_bins, self.compression)
+        return merged._bounded() if exact else merged._compress()
+
+    def _bounded(self) -> "QuantileSketch":
+        if self.exact and self.values.size > self.max_bins:
+            self.exact = False
+            return self._compress()
+        return self
+
+    def _compress(self) -> "QuantileSketch":
+        """Combina centróides vizinhos enquanto couberem em uma unidade da escala k1."""
+        total = self.weights.sum()
+        if total == 0:
+            return self
+        scale = lambda q: self.compression / (2 * np.pi) * np.arcsin(2 * np.clip(q, 0, 1) - 1)
+        values, weights = [], []
+        current_value, current_weight, cumulative = self.values[0], self.weights[0], 0.0
+        for value, weight in zip(self.values[1:], self.weights[1:]):
+            proposed = current_weight + weight
+            if scale((cumulative + proposed) / total) - scale(cumulative / total) <= 1.0:
+                current_value += (value - current_value) * weight / proposed
+                current_weight = proposed
+            else:
+                values.append(current_value)
+                weights.append(current_weight)
+                cumulative += current_weight
+                current_value, current_weight = value, weight
+        values.append(current_value)
+        weights.append(current_weight)
+        self.values, self.weights, self.exact = np.array(values), np.array(weights), False
+        return self
+
+    def quantiles(self, qs: List[float], minimum: float, maximum: float) -> np.ndarray:
+        """Quantis com interpolação linear (exatos no modo histograma)."""
+        n = self.count
+        if n == 0:
+            return np.full(len(qs), np.nan)
+        cumulative = np.cumsum(self.weights)
+        if self.exact:
+            positions = np.asarray(qs) * (n - 1)
+            lower = np.floor(positions)
+            upper = np.minimum(lower + 1, n - 1)
+            value_at = lambda rank: self.values[np.searchsorted(cumulative, rank, side='right')]
+            low_values = value_at(lower)
+            return low_values + (value_at(upper) - low_values) * (positions - lower)
+
+        centers = cumulative - self.weights / 2
+        ranks = np.asarray(qs) * n
+        knots_x = np.concatenate(([0.0], centers, [n]))
+        knots_y = np.concatenate(([minimum], self.values, [maximum]))
+        return np.interp(ranks, knots_x, knots_y)
+
+    def rank_error(self, qs: List[float]) -> np.ndarray:
+        """
+        Erro máximo de posição (fração de 'count') dos quantis 'qs': zero no modo histograma.
+
+        Um centróide da escala k1 cobre até 2π·sqrt(q(1-q))/compression das
+        posições em torno de q; a interpolação entre dois centróides vizinhos e
+        as fusões de esboços já comprimidos podem dobrar esse intervalo. Uma
+        posição a mais cobre os extremos, onde o limite da escala tende a zero.
+        """
+        qs = np.asarray(qs, dtype=np.float64)
+        if self.exact:
+            return np.zeros(qs.size)
+        return 4 * np.pi * np.sqrt(qs * (1 - qs)) / self.compression + 1 / max(self.count, 1.0)
+
+    def mode(self) -> float:
+        """Valor mais frequente (o menor em caso de empate); no modo t-digest, o centróide mais pesado."""
+        if self.values.size == 0:
+            return np.nan
+        return float(self.values[np.argmax(self.weights)])
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"exact": self.exact, "values": self.values.tolist(), "weights": self.weights.tolist()}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], **kwargs) -> "QuantileSketch":
+        return cls(data["values"], data["weights"], data["exact"], **kwargs)
+
+
+# --- Estado completo das métricas ---
+class ClimateStatsState:
+    """
+    Estado suficiente para as métricas globais, atualizável apenas com as linhas novas.
+
+    Reúne os momentos e esboços das estatísticas descritivas, os co-momentos da
+    correlação, o histograma dos códigos de clima e as somas da regressão
+    linear da previsão, além da marca d'água ('watermark') do último 'dia'
+    incorporado.
+    """
+    def __init__(self):
+        self.moments = MomentState(len(NUMERIC_COLS))
+        self.sketches = [QuantileSketch() for _ in NUMERIC_COLS]
+        self.comoments = CoMomentState(len(CORRELATION_COLS))
+        self.code_counts: Dict[int, float] = {}
+        # Regressão de temperatura_max_c (y) no tempo (x = dias desde 1970-01-01)
+        self.trend = CoMomentState(2)
+        self.trend_last_day: float | None = None
+        self.watermark: datetime | None = None
+        self.rows = 0
+
+    @property
+    def is_empty(self) -> bool:
+        return self.rows == 0
+
+    def update(self, df: pd.DataFrame) -> "ClimateStatsState":
+        """Incorpora um lote de linhas novas ao estado."""
+        if df.empty:
+            return self
+        df = normalize_metrics_frame(df)
+
+        # Estatísticas descritivas: linhas com temperaturas máxima e mínima válidas
+        valid = df.dropna(subset=STATS_REQUIRED_COLS)
+        columns = [valid[col].to_numpy(dtype=np.float64, na_value=np.nan) for col in NUMERIC_COLS]
+        self.moments = self.moments.merge(MomentState.from_columns(columns))
+        self.sketches = [sketch.merge(QuantileSketch.from_values(values)) for sketch, values in zip(self.sketches, columns)]
+
+        # Correlação: todas as linhas, observações completas por par
+        matrix = np.column_stack([df[col].to_numpy(dtype=np.float64, na_value=np.nan) for col in CORRELATION_COLS])
+        self.comoments = self.comoments.merge(CoMomentState.from_matrix(matrix))
+
+        # Histograma dos códigos de clima
+        codes = df['codigo_clima'].dropna().to_numpy(dtype=np.int64)
+        for code, count in zip(*np.unique(codes, return_counts=True)):
+            self.code_counts[int(code)] = self.code_counts.get(int(code), 0) + int(count)
+
+        # Somas da regressão linear (mesmas linhas usadas por 'forecast_temperature')
+        trend_rows = df.dropna(subset=['temperatura_max_c'])
+        x = (trend_rows['dia'].to_numpy(dtype='datetime64[ns]') - np.datetime64(0, 'ns')) // np.timedelta64(1, 'D')
+        y = trend_rows['temperatura_max_c'].to_numpy(dtype=np.float64)
+        if x.size:
+            self.trend = self.trend.merge(CoMomentState.from_matrix(np.column_stack((x.astype(np.float64), y))))
+            last_day = float(x.max())
+            self.trend_last_day = last_day if self.trend_last_day is None else max(self.trend_last_day, last_day)
+
+        latest = df['dia'].max()
+        if pd.notna(latest):
+            latest = pd.Timestamp(latest).to_pydatetime()
+            self.watermark = latest if self.watermark is None else max(self.watermark, latest)
+        self.rows += len(df)
+        return self
+
+    # --- Métricas derivadas do estado ---
+    def descriptive_stats(self) -> pd.DataFrame:
+        rows = {}
+        for i, col in enumerate(NUMERIC_COLS):
+            n = self.moments.n[i]
+            if n == 0:
+                rows[col] = {key: (0.0 if key == 'count' else np.nan) for key in
+                             ['count', 'mean', 'std', 'min', '25%', '50%', '75%', 'max', 'mode', 'median', 'skew']}
+                continue
+            minimum, maximum = self.moments.min[i], self.moments.max[i]
+            q25, q50, q75 = self.sketches[i].quantiles(DESCRIBE_QUANTILES, minimum, maximum)
+            rows[col] = {
+                'count': float(n),
+                'mean': self.moments.mean[i],
+                'std': np.sqrt(self.moments.m2[i] / (n - 1)) if n > 1 else np.nan,
+                'min': minimum, '25%': q25, '50%': q50, '75%': q75, 'max': maximum,
+                'mode': self.sketches[i].mode(),
+                'median': q50,
+                'skew': _adjusted_skew(int(n), self.moments.m2[i], self.moments.m3[i]),
+            }
+        return pd.DataFrame.from_dict(rows, orient='index').reset_index().rename(columns={'index': 'metrica'})
+
+    def correlation_matrix(self) -> pd.DataFrame:
+        corr = pd.DataFrame(self.comoments.correlation(), index=CORRELATION_COLS, columns=CORRELATION_COLS)
+        return corr.reset_index().rename(columns={'index': 'variable'})
+
+    def weather_code_probabilities(self) -> pd.DataFrame:
+        codes = sorted(self.code_counts)
+        counts = np.array([self.code_counts[code] for code in codes], dtype=np.float64)
+        order = np.argsort(-counts, kind='stable')
+        return pd.DataFrame({
+            'codigo_clima': [str(codes[i]) for i in order],
+            'probabilidade_percent': counts[order] / counts.sum() * 100 if counts.size else counts
+        })
+
+    def forecast(self, days_to_predict: int = 7) -> pd.DataFrame:
+        if self.trend_last_day is None:
+            return pd.DataFrame({'dia_previsto': pd.DatetimeIndex([]), 'temperatura_max_prevista_c': []})
+        # Médias, soma dos quadrados de x e co-momento sobre as linhas com y válido
+        mean_x, mean_y = self.trend.mean[0, 1], self.trend.mean[1, 0]
+        m2_x, c_xy = self.trend.m2[0, 1], self.trend.c[0, 1]
+        slope = c_xy / m2_x if m2_x else 0.0
+        intercept = mean_y - slope * mean_x
+
+        future_x = self.trend_last_day + np.arange(1, days_to_predict + 1)
+        return pd.DataFrame({
+            'dia_previsto': pd.to_datetime(future_x.astype(np.int64), unit='D'),
+            'temperatura_max_prevista_c': np.round(intercept + slope * future_x, 2)
+        })
+
+    def compute_all(self, days_to_predict: int = 7) -> dict[str, pd.DataFrame]:
+        """Mesmo formato de 'ClimateMetricsEngine.compute_all'."""
+        return {
+            "descriptive_statistics": self.descriptive_stats(),
+            "correlation_matrix": self.correlation_matrix(),
+            "weather_code_probability": self.weather_code_probabilities(),
+            "temperature_forecast": self.forecast(days_to_predict),
+        }
+
+    # --- Persistência ---
+    def to_document(self) -> Dict[str, Any]:
+        return {
+            "_id": STATE_DOCUMENT_ID,
+            "watermark": self.watermark,
+            "rows": self.rows,
+            "numeric_columns": NUMERIC_COLS,
+            "correlation_columns": CORRELATION_COLS,
+            "moments": self.moments.to_dict(),
+            "sketches": [sketch.to_dict() for sketch in self.sketches],
+            "comoments": self.comoments.to_dict(),
+            "code_counts": {str(code): count for code, count in self.code_counts.items()},
+            "trend": {**self.trend.to_dict(), "last_day": self.trend_last_day},
+            "updated_at": datetime.now(),
+        }
+
+    @classmethod
+    def from_document(cls, document: Dict[str, Any] | None) -> "ClimateStatsState":
+        state = cls()
+        if not document:
+            return state
+        if document.get("numeric_columns") != NUMERIC_COLS or document.get("correlation_columns") != CORRELATION_COLS:
+            print("⚠️ Estado salvo usa outras colunas; ele será recalculado do zero.")
+            return state
+        state.watermark = document.get("watermark")
+        state.rows = document.get("rows", 0)
+        state.moments = MomentState.from_dict(document["moments"])
+        state.sketches = [QuantileSketch.from_dict(data) for data in document["sketches"]]
+        state.comoments = CoMomentState.from_dict(document["comoments"])
+        state.code_counts = {int(code): count for code, count in document["code_counts"].items()}
+        state.trend = CoMomentState.from_dict(document["trend"])
+        state.trend_last_day = document["trend"]["last_day"]
+        return state
+
+
+def _quantile_rank_distances(values: np.ndarray, estimates: np.ndarray) -> np.ndarray:
+    """
+    Distância entre a posição dos quantis estimados, nos valores completos, e os quantis pedidos.
+
+    A posição de uma estimativa é o intervalo [menores, menores ou iguais] / n
+    dos valores ordenados; a distância é zero quando o quantil pedido está nele.
+    """
+    ordered = np.sort(values[~np.isnan(values)])
+    if ordered.size == 0:
+        return np.zeros(len(DESCRIBE_QUANTILES))
+    qs = np.asarray(DESCRIBE_QUANTILES)
+    low = np.searchsorted(ordered, estimates, side='left') / ordered.size
+    high = np.searchsorted(ordered, estimates, side='right') / ordered.size
+    return np.maximum(np.maximum(low - qs, qs - high), 0.0)
+
+
+def _verify_quantile_ranks(state: ClimateStatsState, df: pd.DataFrame, stats_df: pd.DataFrame) -> float:
+    """Confere os quartis dos esboços aproximados pela posição; devolve o maior erro de posição."""
+    valid = normalize_metrics_frame(df).dropna(subset=STATS_REQUIRED_COLS)
+    stats_df = stats_df.set_index('metrica')
+    worst = 0.0
+    for i, col in enumerate(NUMERIC_COLS):
+        sketch = state.sketches[i]
+        if sketch.exact:
+            continue
+        estimates = stats_df.loc[col, ['25%', '50%', '75%']].to_numpy(dtype=np.float64)
+        distances = _quantile_rank_distances(valid[col].to_numpy(dtype=np.float64, na_value=np.nan), estimates)
+        bound = sketch.rank_error(DESCRIBE_QUANTILES)
+        assert (distances <= bound).all(), \
+            f"descriptive_statistics.{col}: erro de posição dos quartis {distances} acima do limite {bound}"
+        worst = max(worst, float(distances.max()))
+    return worst
+
+
+def verify_against_full(state: ClimateStatsState, df: pd.DataFrame, days_to_predict: int = 7,
+                        rtol: float = 1e-6, atol: float = 1e-6) -> Dict[str, float]:
+    """
+    Compara as métricas do estado incremental com um recálculo completo sobre 'df'.
+
+    Nas colunas cujo esboço de quantis já foi comprimido (t-digest), a moda não
+    é comparada e os quartis e a mediana são conferidos pela posição nos
+    valores completos, com o erro máximo do esboço ('QuantileSketch.rank_error'),
+    e não pelas tolerâncias 'rtol'/'atol'.
+
+    Returns:
+        dict: Maior diferença absoluta encontrada por tipo de métrica (e, com
+              esboços aproximados, o maior erro de posição dos quartis em
+              'descriptive_statistics.quantile_rank'). Levanta AssertionError
+              se alguma passar da tolerância.
+    """
+    expected = ClimateMetricsEngine(df).compute_all(days_to_predict)
+    actual = state.compute_all(days_to_predict)
+    differences = {}
+    for metric_type, expected_df in expected.items():
+        actual_df = actual[metric_type]
+        if metric_type == "weather_code_probability":
+            expected_df = expected_df.sort_values('codigo_clima', ignore_index=True)
+            actual_df = actual_df.sort_values('codigo_clima', ignore_index=True)
+            assert expected_df['codigo_clima'].tolist() == actual_df['codigo_clima'].tolist(), metric_type
+        numeric = [col for col in expected_df.columns if pd.api.types.is_numeric_dtype(expected_df[col])]
+        a = actual_df[numeric].to_numpy(dtype=np.float64)
+        b = expected_df[numeric].to_numpy(dtype=np.float64)
+        assert a.shape == b.shape, metric_type
+        if metric_type == "descriptive_statistics":
+            # Linhas em NUMERIC_COLS; nas aproximadas, moda e quantis saem da comparação direta
+            approximate = np.array([not sketch.exact for sketch in state.sketches])
+            for col in ('mode', '25%', '50%', '75%', 'median'):
+                a[approximate, numeric.index(col)] = b[approximate, numeric.index(col)]
+            if approximate.any():
+                differences["descriptive_statistics.quantile_rank"] = _verify_quantile_ranks(state, df, actual_df)
+        np.testing.assert_allclose(a, b, rtol=rtol, atol=atol, equal_nan=True, err_msg=metric_type)
+        differences[metric_type] = float(np.nanmax(np.abs(a - b))) if a.size else 0.0
+    return differences
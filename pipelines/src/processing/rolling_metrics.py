@@ -0,0 +1,532 @@
+"""
+Métricas de janelas móveis e de anomalias sobre as séries diárias de cada localidade.
+
+- 'rolling_statistics': média e desvio padrão móveis de 7 e 30 dias.
+- 'temperature_anomalies': anomalia e escore z de cada dia em relação à
+  normal climatológica do dia do ano.
+- 'extreme_events': ondas de calor e de frio (sequências de dias acima ou
+  abaixo da normal, como no índice HWDI da OMM).
+
+Cada série (as colunas de agrupamento, sem o período) é colocada em uma grade
+diária contínua: todas as séries ficam em um único vetor, uma após a outra, e
+os dias sem medição ficam como NaN. As janelas móveis são diferenças de somas
+acumuladas e as sequências de eventos são obtidas por codificação de
+comprimento de sequência (run-length) sobre a grade, sem laços em Python por
+série ou por dia: o custo cresce linearmente com o número de linhas.
+
+A normal climatológica (média e desvio padrão por dia do ano) é calculada por
+série ('Climatology') e guardada no MongoDB pelo pipeline, junto com o
+intervalo de dias de que foi calculada. Ela é reaproveitada nas execuções
+seguintes e recalculada quando os dados passam desse intervalo (ver
+'Climatology.stale').
+
+No modo incremental, as métricas da execução anterior são mantidas e só o
+trecho final é recalculado ('incremental_window' e 'merge_incremental').
+"""
+from datetime import datetime
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.instrumentation import stage
+
+# Janelas das estatísticas móveis, em dias
+ROLLING_WINDOWS = (7, 30)
+# Fração mínima de dias com medição para que a janela tenha valor
+ROLLING_MIN_FRACTION = 0.75
+# Colunas das estatísticas móveis e das anomalias
+ROLLING_COLUMNS = ['temperatura_max_c', 'temperatura_min_c']
+CLIMATOLOGY_COLUMNS = ['temperatura_max_c', 'temperatura_min_c']
+
+# Dias do ano da normal: 29/02 tem posição própria e os demais dias têm a mesma posição em todos os anos
+DAYS_IN_YEAR = 366
+_MONTH_STARTS = np.cumsum([0, 31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30])
+# Janela centrada (em dias do ano, circular) usada para suavizar a normal
+CLIMATOLOGY_SMOOTHING_DAYS = 15
+# Medições mínimas na janela suavizada para que a normal do dia do ano seja usada
+CLIMATOLOGY_MIN_SAMPLES = 10
+# Dias novos de referência a partir dos quais uma normal completa (com valor em
+# todos os dias do ano) é recalculada; normais incompletas são recalculadas a cada dia novo
+CLIMATOLOGY_REFRESH_DAYS = 365
+
+# Onda de calor: ao menos EVENT_MIN_DAYS dias seguidos com temperatura máxima
+# EVENT_THRESHOLD_C acima da normal; onda de frio: idem com a mínima abaixo da normal.
+EVENT_MIN_DAYS = 5
+EVENT_THRESHOLD_C = 5.0
+EVENTS = {
+    "onda_de_calor": ('temperatura_max_c', 1.0),
+    "onda_de_frio": ('temperatura_min_c', -1.0),
+}
+
+ROLLING_METRIC = "rolling_statistics"
+ANOMALY_METRIC = "temperature_anomalies"
+EVENTS_METRIC = "extreme_events"
+# Métricas que dependem da normal climatológica
+CLIMATOLOGY_METRICS = (ANOMALY_METRIC, EVENTS_METRIC)
+ROLLING_METRIC_TYPES = (ROLLING_METRIC, *CLIMATOLOGY_METRICS)
+
+
+def day_of_year(days: np.ndarray) -> np.ndarray:
+    """Posição (0 a 365) de cada data no ano, com 29/02 na posição 59 e 01/03 sempre na 60."""
+    months = days.astype('datetime64[M]')
+    day_of_month = (days - months.astype('datetime64[D]')).astype(np.int64)
+    return _MONTH_STARTS[months.astype(np.int64) % 12] + day_of_month
+
+
+def _series_codes(df: pd.DataFrame, series_keys: List[str]) -> Tuple[np.ndarray, pd.DataFrame]:
+    """Código de série de cada linha e as chaves de cada série (uma linha por série, em ordem)."""
+    if not series_keys:
+        return np.zeros(len(df), dtype=np.int64), pd.DataFrame(index=range(1 if len(df) else 0))
+    grouper = df.groupby(series_keys, observed=True, sort=True)
+    return grouper.ngroup().to_numpy(dtype=np.int64), grouper.size().index.to_frame(index=False)
+
+
+class DailyGrid:
+    """
+    Séries diárias de várias localidades em uma grade contínua (uma posição por série e dia).
+
+    Linhas da mesma série no mesmo dia (ex.: várias localidades no escopo
+    global) ocupam a mesma posição e têm os valores combinados pela média.
+    """
+    def __init__(self, df: pd.DataFrame, series_keys: List[str]):
+        days = df['dia'].to_numpy(dtype='datetime64[D]')
+        rows = np.flatnonzero(~np.isnat(days))
+        codes, self.series = _series_codes(df, series_keys)
+        codes, day_numbers = codes[rows], days[rows].astype(np.int64)
+
+        n_series = len(self.series)
+        self.first_day = np.full(n_series, np.iinfo(np.int64).max)
+        last_day = np.full(n_series, np.iinfo(np.int64).min)
+        np.minimum.at(self.first_day, codes, day_numbers)
+        np.maximum.at(last_day, codes, day_numbers)
+        # Séries sem nenhum dia válido ficam vazias
+        lengths = np.where(last_day >= self.first_day, last_day - self.first_day + 1, 0)
+        self.offsets = np.concatenate(([0], np.cumsum(lengths)[:-1])).astype(np.int64)
+        self.size = int(lengths.sum())
+
+        self.series_of = np.repeat(np.arange(n_series), lengths)
+        self.series_start = self.offsets[self.series_of]
+        self.days = (self.first_day[self.series_of] + np.arange(self.size) - self.series_start).astype('datetime64[D]')
+
+        self._df = df
+        self._rows = rows
+        self._positions = self.offsets[codes] + day_numbers - self.first_day[codes]
+        self.observed = np.bincount(self._positions, minlength=self.size) > 0
+        # Uma linha de origem por posição, usada para copiar as colunas de agrupamento (ex.: 'periodo')
+        self.source_row = np.full(self.size, -1, dtype=np.int64)
+        self.source_row[self._positions] = rows
+
+    def column(self, name: str) -> np.ndarray:
+        """Valores da coluna na grade (média das linhas de cada posição; NaN nos dias sem medição)."""
+        values = self._df[name].to_numpy(dtype=np.float64, na_value=np.nan)[self._rows]
+        valid = ~np.isnan(values)
+        counts = np.bincount(self._positions[valid], minlength=self.size)
+        sums = np.bincount(self._positions[valid], weights=values[valid], minlength=self.size)
+        return np.divide(sums, counts, out=np.full(self.size, np.nan), where=counts > 0)
+
+    def keys_at(self, positions: np.ndarray, group_keys: List[str]) -> pd.DataFrame:
+        """Colunas de agrupamento das linhas de origem das posições informadas."""
+        return self._df[group_keys].iloc[self.source_row[positions]].reset_index(drop=True)
+
+
+# --- Estatísticas móveis ---
+def _window_sums(values: np.ndarray, window: int, series_start: np.ndarray) -> np.ndarray:
+    """Soma dos últimos 'window' dias de cada posição, sem atravessar o início da série."""
+    cumulative = np.concatenate(([0.0], np.cumsum(values)))
+    positions = np.arange(values.size)
+    start = np.maximum(positions - window + 1, series_start)
+    return cumulative[positions + 1] - cumulative[start]
+
+
+def rolling_mean_std(grid: DailyGrid, values: np.ndarray, window: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Média e desvio padrão amostral dos últimos 'window' dias de calendário, por série.
+
+    Equivalente a 'Series.asfreq("D").rolling(window, min_periods).mean()/.std()'
+    com min_periods = ROLLING_MIN_FRACTION x window.
+    """
+    valid = ~np.isnan(values)
+    # Valores centrados pela média da série, para manter a precisão das somas acumuladas
+    sums = np.bincount(grid.series_of[valid], weights=values[valid], minlength=len(grid.first_day))
+    counts = np.bincount(grid.series_of[valid], minlength=len(grid.first_day))
+    shift = np.divide(sums, counts, out=np.zeros(sums.size), where=counts > 0)[grid.series_of]
+    centered = np.where(valid, values - shift, 0.0)
+
+    n = _window_sums(valid.astype(np.float64), window, grid.series_start)
+    s = _window_sums(centered, window, grid.series_start)
+    ss = _window_sums(centered * centered, window, grid.series_start)
+
+    enough = n >= np.ceil(window * ROLLING_MIN_FRACTION)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = np.where(enough, shift + s / n, np.nan)
+        variance = np.maximum(ss - s * s / n, 0.0) / (n - 1)
+        std = np.where(enough & (n > 1), np.sqrt(variance), np.nan)
+    return mean, std
+
+
+def rolling_statistics(df: pd.DataFrame, series_keys: List[str], group_keys: List[str]) -> pd.DataFrame:
+    """Média e desvio padrão móveis (ROLLING_WINDOWS) de cada dia com medição, por série."""
+    grid = DailyGrid(df, series_keys)
+    positions = np.flatnonzero(grid.observed)
+    frame = grid.keys_at(positions, group_keys)
+    frame['dia'] = grid.days[positions].astype('datetime64[ns]')
+    for col in ROLLING_COLUMNS:
+        values = grid.column(col)
+        for window in ROLLING_WINDOWS:
+            mean, std = rolling_mean_std(grid, values, window)
+            frame[f'{col}_media_{window}d'] = mean[positions]
+            frame[f'{col}_desvio_{window}d'] = std[positions]
+    return frame
+
+
+# --- Normal climatológica ---
+class Climatology:
+    """
+    Normal climatológica por série e dia do ano: média e desvio padrão de CLIMATOLOGY_COLUMNS.
+
+    Para cada dia do ano, usa as medições dos dias vizinhos
+    (CLIMATOLOGY_SMOOTHING_DAYS, de forma circular) de todos os anos de
+    referência, o que dá amostras suficientes mesmo com poucos anos de dados.
+    'first_day' e 'last_day' guardam o intervalo de dias de referência de que a
+    normal de cada série foi calculada.
+    """
+    def __init__(self, series: pd.DataFrame, mean: Dict[str, np.ndarray], std: Dict[str, np.ndarray],
+                 reference: str, first_day: np.ndarray, last_day: np.ndarray):
+        self.series = series.reset_index(drop=True)
+        self.mean = mean
+        self.std = std
+        self.reference = reference
+        self.first_day = np.asarray(first_day, dtype='datetime64[D]')
+        self.last_day = np.asarray(last_day, dtype='datetime64[D]')
+
+    @classmethod
+    def build(cls, df: pd.DataFrame, series_keys: List[str], reference: str = "all") -> "Climatology":
+        """
+        Calcula a normal de cada série de 'df'.
+
+        Args:
+            reference (str): 'all' (todos os dias de 'df') ou um intervalo de
+                             anos 'AAAA-AAAA' (ex.: '1991-2020').
+        """
+        df = df[_reference_mask(df, reference)]
+        codes, series = _series_codes(df, series_keys)
+        days = df['dia'].to_numpy(dtype='datetime64[D]')
+        first_day, last_day = _day_range(codes, days, len(series))
+        cells = codes * DAYS_IN_YEAR + np.where(np.isnat(days), 0, day_of_year(days))
+        shape = (len(series), DAYS_IN_YEAR)
+
+        mean, std = {}, {}
+        for col in CLIMATOLOGY_COLUMNS:
+            values = df[col].to_numpy(dtype=np.float64, na_value=np.nan)
+            valid = ~np.isnan(values) & ~np.isnat(days)
+            n = _smooth(np.bincount(cells[valid], minlength=shape[0] * shape[1]).reshape(shape))
+            s = _smooth(np.bincount(cells[valid], weights=values[valid], minlength=shape[0] * shape[1]).reshape(shape))
+            ss = _smooth(np.bincount(cells[valid], weights=values[valid] ** 2,
+                                     minlength=shape[0] * shape[1]).reshape(shape))
+            enough = n >= CLIMATOLOGY_MIN_SAMPLES
+            with np.errstate(divide='ignore', invalid='ignore'):
+                mean[col] = np.where(enough, s / n, np.nan)
+                std[col] = np.where(enough, np.sqrt(np.maximum(ss - s * s / n, 0.0) / (n - 1)), np.nan)
+        return cls(series, mean, std, reference, first_day, last_day)
+
+    def merge(self, other: "Climatology") -> "Climatology":
+        """Junta as séries das duas normais; as de 'other' substituem as de mesma chave e vão para o final."""
+        if not len(self.series):
+            return other
+        kept = other._index(self.series) < 0
+        return Climatology(
+            pd.concat([self.series[kept], other.series], ignore_index=True),
+            {col: np.vstack([self.mean[col][kept], other.mean[col]]) for col in CLIMATOLOGY_COLUMNS},
+            {col: np.vstack([self.std[col][kept], other.std[col]]) for col in CLIMATOLOGY_COLUMNS},
+            self.reference,
+            np.concatenate([self.first_day[kept], other.first_day]),
+            np.concatenate([self.last_day[kept], other.last_day]),
+        )
+
+    @property
+    def complete(self) -> np.ndarray:
+        """Se a normal de cada série tem valor em todos os dias do ano."""
+        if not len(self.series):
+            return np.zeros(0, dtype=bool)
+        return np.logical_and.reduce([~np.isnan(self.mean[col]).any(axis=1) for col in CLIMATOLOGY_COLUMNS])
+
+    def _index(self, series: pd.DataFrame) -> np.ndarray:
+        """Linha da normal de cada série de 'series' (-1 se a série não estiver na normal)."""
+        if series.shape[1] == 0:
+            return np.zeros(len(series), dtype=np.int64) if len(self.series) else np.full(len(series), -1)
+        known = pd.MultiIndex.from_frame(self.series.astype(object))
+        return known.get_indexer(pd.MultiIndex.from_frame(series.astype(object)))
+
+    def stale(self, df: pd.DataFrame, series_keys: List[str]) -> pd.DataFrame:
+        """
+        Linhas de 'df' cujas séries precisam ter a normal (re)calculada.
+
+        Uma série entra quando ainda não está na normal ou quando os dias de
+        referência de 'df' passam do intervalo de que a normal foi calculada:
+        a cada dia novo enquanto a normal é incompleta (menos de um ano de
+        histórico) e, depois, a cada CLIMATOLOGY_REFRESH_DAYS dias novos.
+        """
+        if not len(self.series):
+            return df
+        codes, series = _series_codes(df, series_keys)
+        rows = self._index(series)
+        known = rows >= 0
+        rows = np.maximum(rows, 0)
+        in_reference = _reference_mask(df, self.reference)
+        first_day, last_day = _day_range(codes[in_reference], df['dia'].to_numpy(dtype='datetime64[D]')[in_reference],
+                                         len(series))
+
+        # Dias de referência de 'df' fora do intervalo de que a normal foi calculada, por série
+        with np.errstate(invalid='ignore'):
+            before = (self.first_day[rows] - first_day).astype(np.int64)
+            after = (last_day - self.last_day[rows]).astype(np.int64)
+        has_days = ~np.isnat(first_day)
+        stored_empty = np.isnat(self.first_day[rows])
+        new_days = np.where(known & has_days & ~stored_empty, np.maximum(before, 0) + np.maximum(after, 0), 0)
+
+        refresh = (~known | (has_days & stored_empty) | ((new_days > 0) & ~self.complete[rows])
+                   | (new_days >= CLIMATOLOGY_REFRESH_DAYS))
+        return df[refresh[codes]]
+
+    def lookup(self, grid: DailyGrid, col: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Média e desvio padrão normais de cada posição da grade (NaN se a série não estiver na normal)."""
+        rows = self._index(grid.series)[grid.series_of]
+        cells = np.maximum(rows, 0) * DAYS_IN_YEAR + day_of_year(grid.days)
+        known = rows >= 0
+        return (np.where(known, self.mean[col].ravel()[cells], np.nan),
+                np.where(known, self.std[col].ravel()[cells], np.nan))
+
+    # --- Persistência ---
+    def to_documents(self, baseline: str) -> List[Dict[str, Any]]:
+        """Um documento por série, identificado pela normal ('baseline') e pelas chaves da série."""
+        # Sem colunas de série (escopo global), 'to_dict' não devolve registros
+        groups = self.series.astype(object).to_dict('records') if self.series.shape[1] else [{}] * len(self.series)
+        documents = []
+        for i, group in enumerate(groups):
+            group_key = "|".join(f"{name}={value}" for name, value in group.items())
+            documents.append({
+                "_id": f"{baseline}|{group_key}" if group_key else baseline,
+                "baseline": baseline,
+                "reference": self.reference,
+                "group": group,
+                "smoothing_days": CLIMATOLOGY_SMOOTHING_DAYS,
+                "dia_inicio": _to_datetime(self.first_day[i]),
+                "dia_fim": _to_datetime(self.last_day[i]),
+                "columns": {col: {"media": _to_list(self.mean[col][i]), "desvio": _to_list(self.std[col][i])}
+                            for col in CLIMATOLOGY_COLUMNS},
+                "updated_at": datetime.now(),
+            })
+        return documents
+
+    @classmethod
+    def from_documents(cls, documents: List[Dict[str, Any]], series_keys: List[str],
+                       reference: str) -> "Climatology":
+        """
+        Reconstrói a normal a partir dos documentos salvos.
+
+        Documentos de outra configuração ou sem o intervalo de dias (gravados
+        por versões anteriores) são ignorados, e suas séries são recalculadas.
+        """
+        documents = [
+            document for document in documents
+            if document.get("smoothing_days") == CLIMATOLOGY_SMOOTHING_DAYS
+            and set(document.get("columns", {})) == set(CLIMATOLOGY_COLUMNS)
+            and "dia_inicio" in document
+        ]
+        series = (pd.DataFrame([document["group"] for document in documents], columns=series_keys)
+                  if series_keys else pd.DataFrame(index=range(len(documents))))
+        return cls(
+            series,
+            {col: _from_lists([document["columns"][col]["media"] for document in documents])
+             for col in CLIMATOLOGY_COLUMNS},
+            {col: _from_lists([document["columns"][col]["desvio"] for document in documents])
+             for col in CLIMATOLOGY_COLUMNS},
+            reference,
+            np.array([document["dia_inicio"] or "NaT" for document in documents], dtype='datetime64[D]'),
+            np.array([document["dia_fim"] or "NaT" for document in documents], dtype='datetime64[D]'),
+        )
+
+
+def _reference_mask(df: pd.DataFrame, reference: str) -> np.ndarray:
+    """Linhas de 'df' dentro dos anos de referência ('all' ou 'AAAA-AAAA')."""
+    if reference == "all":
+        return np.ones(len(df), dtype=bool)
+    first_year, last_year = (int(year) for year in reference.split("-"))
+    years = df['dia'].dt.year
+    return ((years >= first_year) & (years <= last_year)).to_numpy()
+
+
+def _day_range(codes: np.ndarray, days: np.ndarray, n_series: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Primeiro e último dia válido de cada série (NaT se a série não tiver nenhum)."""
+    valid = ~np.isnat(days)
+    day_numbers = days[valid].astype(np.int64)
+    first_day = np.full(n_series, np.iinfo(np.int64).max)
+    last_day = np.full(n_series, np.iinfo(np.int64).min)
+    np.minimum.at(first_day, codes[valid], day_numbers)
+    np.maximum.at(last_day, codes[valid], day_numbers)
+    empty = last_day < first_day
+    return (np.where(empty, np.datetime64('NaT'), first_day.astype('datetime64[D]')),
+            np.where(empty, np.datetime64('NaT'), last_day.astype('datetime64[D]')))
+
+
+def _to_datetime(day: np.datetime64) -> datetime | None:
+    """Dia da grade como datetime (BSON não tem tipo de data sem hora)."""
+    return None if np.isnat(day) else pd.Timestamp(day).to_pydatetime()
+
+
+def _smooth(matrix: np.ndarray) -> np.ndarray:
+    """Soma circular de cada linha em uma janela centrada de CLIMATOLOGY_SMOOTHING_DAYS dias do ano."""
+    half = CLIMATOLOGY_SMOOTHING_DAYS // 2
+    padded = np.concatenate([matrix[:, -half:], matrix, matrix[:, :half]], axis=1).astype(np.float64)
+    cumulative = np.concatenate([np.zeros((matrix.shape[0], 1)), np.cumsum(padded, axis=1)], axis=1)
+    return cumulative[:, 2 * half + 1:] - cumulative[:, :-(2 * half + 1)]
+
+
+def _to_list(values: np.ndarray) -> List[float | None]:
+    """Valores para o BSON, com None no lugar de NaN."""
+    cells = values.astype(object)
+    cells[np.isnan(values)] = None
+    return cells.tolist()
+
+
+def _from_lists(rows: List[list]) -> np.ndarray:
+    if not rows:
+        return np.empty((0, DAYS_IN_YEAR))
+    return np.array(rows, dtype=np.float64)  # None vira NaN
+
+
+# --- Anomalias e eventos extremos ---
+def temperature_anomalies(df: pd.DataFrame, series_keys: List[str], group_keys: List[str],
+                          climatology: Climatology) -> pd.DataFrame:
+    """Anomalia (valor - normal) e escore z ((valor - normal) / desvio normal) de cada dia com medição."""
+    grid = DailyGrid(df, series_keys)
+    positions = np.flatnonzero(grid.observed)
+    frame = grid.keys_at(positions, group_keys)
+    frame['dia'] = grid.days[positions].astype('datetime64[ns]')
+    for col in CLIMATOLOGY_COLUMNS:
+        normal, deviation = climatology.lookup(grid, col)
+        anomaly = grid.column(col) - normal
+        with np.errstate(divide='ignore', invalid='ignore'):
+            zscore = np.where(deviation > 0, anomaly / deviation, np.nan)
+        frame[f'{col}_anomalia'] = anomaly[positions]
+        frame[f'{col}_zscore'] = zscore[positions]
+    return frame
+
+
+def _runs(condition: np.ndarray, series_start: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Início e comprimento de cada sequência de posições verdadeiras, sem atravessar o início das séries."""
+    positions = np.flatnonzero(condition)
+    if positions.size == 0:
+        return positions, positions
+    # Uma sequência começa quando a posição anterior é falsa ou quando uma nova série começa
+    breaks = (np.diff(positions) != 1) | (series_start[positions[1:]] == positions[1:])
+    starts = np.concatenate(([0], np.flatnonzero(breaks) + 1))
+    lengths = np.diff(np.concatenate((starts, [positions.size])))
+    return starts, lengths
+
+
+def extreme_events(df: pd.DataFrame, series_keys: List[str], group_keys: List[str],
+                   climatology: Climatology) -> pd.DataFrame:
+    """
+    Ondas de calor e de frio: sequências de ao menos EVENT_MIN_DAYS dias além de EVENT_THRESHOLD_C da normal.
+
+    Um dia sem medição interrompe a sequência. Com agrupamento por período, o
+    evento pertence ao período do seu primeiro dia.
+    """
+    grid = DailyGrid(df, series_keys)
+    frames = []
+    for event, (col, sign) in EVENTS.items():
+        normal, _ = climatology.lookup(grid, col)
+        excess = sign * (grid.column(col) - normal)
+        with np.errstate(invalid='ignore'):
+            condition = excess > EVENT_THRESHOLD_C
+        starts, lengths = _runs(condition, grid.series_start)
+        keep = lengths >= EVENT_MIN_DAYS
+        if not keep.any():
+            continue
+
+        run_excess = excess[condition]
+        first = np.flatnonzero(condition)[starts[keep]]
+        frame = grid.keys_at(first, group_keys)
+        frame['evento'] = event
+        frame['inicio'] = grid.days[first].astype('datetime64[ns]')
+        frame['fim'] = grid.days[first + lengths[keep] - 1].astype('datetime64[ns]')
+        frame['duracao_dias'] = lengths[keep]
+        frame['excesso_max_c'] = np.round(np.maximum.reduceat(run_excess, starts)[keep], 2)
+        frame['excesso_medio_c'] = np.round((np.add.reduceat(run_excess, starts) / lengths)[keep], 2)
+        frames.append(frame)
+
+    if not frames:
+        return pd.DataFrame(columns=[*group_keys, 'evento', 'inicio', 'fim', 'duracao_dias',
+                                     'excesso_max_c', 'excesso_medio_c'])
+    return pd.concat(frames, ignore_index=True).sort_values([*group_keys, 'inicio'], ignore_index=True)
+
+
+# --- Atualização incremental ---
+def incremental_window(previous: Dict[str, pd.DataFrame]) -> Tuple[pd.Timestamp, pd.Timestamp] | None:
+    """
+    Trecho final a recalcular quando as métricas de 'previous' (da execução anterior) recebem dias novos.
+
+    Devolve (início, último dia da execução anterior), ou None se 'previous'
+    não tiver todas as métricas de ROLLING_METRIC_TYPES. O início fica
+    max(ROLLING_WINDOWS) dias antes do último dia (as janelas dos dias novos
+    ficam completas) e é recuado para antes de qualquer evento anterior que o
+    atravesse, de modo que os eventos que começam a partir dele sejam
+    sequências inteiras.
+    """
+    if any(metric_type not in previous for metric_type in ROLLING_METRIC_TYPES) or previous[ROLLING_METRIC].empty:
+        return None
+    last_day = pd.Timestamp(previous[ROLLING_METRIC]['dia'].max())
+    start = last_day - pd.Timedelta(days=max(ROLLING_WINDOWS))
+    events = previous[EVENTS_METRIC]
+    while not events.empty:
+        crossing = events[(events['inicio'] <= start) & (events['fim'] >= start)]
+        if crossing.empty:
+            break
+        start = pd.Timestamp(crossing['inicio'].min()) - pd.Timedelta(days=1)
+    return start, last_day
+
+
+def merge_incremental(previous: Dict[str, pd.DataFrame], recomputed: Dict[str, pd.DataFrame],
+                      window: Tuple[pd.Timestamp, pd.Timestamp]) -> dict[str, pd.DataFrame]:
+    """
+    Junta as métricas da execução anterior com as recalculadas sobre o trecho de 'incremental_window'.
+
+    As linhas diárias posteriores ao último dia anterior e os eventos que
+    começam a partir do início do trecho vêm de 'recomputed'; as demais são
+    mantidas de 'previous'.
+    """
+    start, last_day = window
+    cuts = {ROLLING_METRIC: ('dia', last_day + pd.Timedelta(days=1)),
+            ANOMALY_METRIC: ('dia', last_day + pd.Timedelta(days=1)),
+            EVENTS_METRIC: ('inicio', start)}
+    merged = {}
+    for metric_type, frame in recomputed.items():
+        column, cut = cuts[metric_type]
+        kept = previous[metric_type]
+        parts = [kept[kept[column] < cut]] if not kept.empty else []
+        parts.append(frame[frame[column] >= cut])
+        merged[metric_type] = pd.concat(parts, ignore_index=True)
+    return merged
+
+
+def compute_rolling_metrics(df: pd.DataFrame, climatology: Climatology | None,
+                            metric_types: Tuple[str, ...] = ROLLING_METRIC_TYPES) -> dict[str, pd.DataFrame]:
+    """
+    Métricas deste módulo para a tabela inteira (escopo global, uma única série), indexadas pelo 'metric_type'.
+
+    'climatology' só é usada (e exigida) pelas métricas de CLIMATOLOGY_METRICS.
+    """
+    tasks = {
+        ROLLING_METRIC: lambda: rolling_statistics(df, [], []),
+        ANOMALY_METRIC: lambda: temperature_anomalies(df, [], [], climatology),
+        EVENTS_METRIC: lambda: extreme_events(df, [], [], climatology),
+    }
+    metrics = {}
+    for metric_type in metric_types:
+        compute = tasks[metric_type]
+        with stage(f"analysis.metric.{metric_type}") as st:
+            metrics[metric_type] = compute()
+            st.rows(len(metrics[metric_type]), rows_in=len(df))
+    return metrics
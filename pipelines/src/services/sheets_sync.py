@@ -0,0 +1,170 @@
+import hashlib
+import json
+import os
+from numbers import Real
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+from gspread.utils import rowcol_to_a1
+
+# Linhas e colunas mínimas de uma aba nova (mesmo tamanho usado pelo export completo)
+NEW_SHEET_ROWS = 100
+NEW_SHEET_COLS = 20
+
+
+def _cell_value(value: Any) -> Any:
+    """Representação de uma célula igual à do 'set_with_dataframe' (nulos viram '')."""
+    if pd.isnull(value) is True:
+        return ""
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, Real):
+        return value
+    return str(value)
+
+
+def dataframe_to_rows(df: pd.DataFrame) -> List[List[Any]]:
+    """Converte o DataFrame nas linhas da planilha: cabeçalho seguido dos valores."""
+    rows = [[str(col) for col in df.columns]]
+    rows.extend([_cell_value(value) for value in row] for row in df.itertuples(index=False, name=None))
+    return rows
+
+
+def _row_hash(row: List[Any]) -> str:
+    return hashlib.blake2b(json.dumps(row, default=str).encode(), digest_size=8).hexdigest()
+
+
+def _changed_runs(old_hashes: List[str], new_hashes: List[str]) -> List[Tuple[int, int]]:
+    """Intervalos [início, fim) de linhas consecutivas que mudaram, foram criadas ou removidas."""
+    runs, start = [], None
+    for i in range(max(len(old_hashes), len(new_hashes))):
+        old = old_hashes[i] if i < len(old_hashes) else None
+        new = new_hashes[i] if i < len(new_hashes) else ""  # linha removida (diferente de "desconhecida")
+        if old != new and start is None:
+            start = i
+        elif old == new and start is not None:
+            runs.append((start, i))
+            start = None
+    if start is not None:
+        runs.append((start, max(len(old_hashes), len(new_hashes))))
+    return runs
+
+
+class SheetsSnapshot:
+    """
+    Registro local do que foi escrito em cada aba na última exportação.
+
+    Guarda, por aba, o número de colunas e um hash por linha. O arquivo só é
+    atualizado depois que a escrita na planilha termina com sucesso.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.sheets: Dict[str, Dict[str, Any]] = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.sheets = json.load(f)
+
+    def get(self, sheet_name: str) -> Dict[str, Any]:
+        return self.sheets.get(sheet_name, {"cols": 0, "row_hashes": []})
+
+    def set(self, sheet_name: str, cols: int, row_hashes: List[str]):
+        self.sheets[sheet_name] = {"cols": cols, "row_hashes": row_hashes}
+
+    def discard(self, sheet_name: str):
+        """Esquece o conteúdo da aba: a próxima exportação reescreve a grade inteira."""
+        self.sheets.pop(sheet_name, None)
+
+    def record(self, sheet_name: str, df: pd.DataFrame):
+        """Registra o DataFrame como o conteúdo atual da aba (ex.: depois de reescrevê-la por inteiro)."""
+        rows = dataframe_to_rows(df)
+        self.set(sheet_name, len(rows[0]), [_row_hash(row) for row in rows])
+
+    def save(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.sheets, f)
+        os.replace(tmp_path, self.path)
+
+
+def sync_dataframes(spreadsheet, dataframes: Dict[str, pd.DataFrame], snapshot: SheetsSnapshot,
+                    force: bool = False) -> Dict[str, int]:
+    """
+    Envia para a planilha apenas as linhas que mudaram desde a última exportação.
+
+    As linhas de cada DataFrame são comparadas por hash com o snapshot; os
+    intervalos alterados de todas as abas são escritos em uma única chamada
+    'values_batch_update'. Linhas que deixaram de existir são apagadas
+    (preenchidas com ''), e as abas só são redimensionadas quando os dados não
+    cabem nelas, também em uma única chamada 'batch_update'.
+
+    Args:
+        spreadsheet: Planilha do gspread (ou objeto com a mesma interface).
+        dataframes (dict): Nome da aba -> DataFrame.
+        snapshot (SheetsSnapshot): Estado da última exportação; é atualizado ao final.
+        force (bool, optional): Ignora o snapshot e reescreve todas as linhas. Defaults to False.
+
+    Returns:
+        dict: Estatísticas {'sheets_created', 'sheets_resized', 'ranges', 'cells'}.
+    """
+    worksheets = {worksheet.title: worksheet for worksheet in spreadsheet.worksheets()}
+    data, resize_requests, new_snapshots = [], [], {}
+    stats = {"sheets_created": 0, "sheets_resized": 0, "ranges": 0, "cells": 0}
+
+    for sheet_name, df in dataframes.items():
+        rows = dataframe_to_rows(df)
+        cols = len(rows[0])
+        row_hashes = [_row_hash(row) for row in rows]
+        worksheet = worksheets.get(sheet_name)
+        if worksheet is not None and (force or sheet_name not in snapshot.sheets):
+            # Conteúdo desconhecido (hash None): a grade atual inteira é reescrita ou apagada
+            previous = {"cols": worksheet.col_count, "row_hashes": [None] * worksheet.row_count}
+        else:
+            previous = snapshot.get(sheet_name)
+
+        if worksheet is None:
+            print(f"  - Aba '{sheet_name}' não encontrada. Criando nova aba...")
+            worksheet = spreadsheet.add_worksheet(
+                title=sheet_name, rows=max(len(rows), NEW_SHEET_ROWS), cols=max(cols, NEW_SHEET_COLS)
+            )
+            stats["sheets_created"] += 1
+            previous = {"cols": 0, "row_hashes": []}
+        elif len(rows) > worksheet.row_count or cols > worksheet.col_count:
+            resize_requests.append({"updateSheetProperties": {
+                "properties": {"sheetId": worksheet.id, "gridProperties": {
+                    "rowCount": max(len(rows), worksheet.row_count),
+                    "columnCount": max(cols, worksheet.col_count),
+                }},
+                "fields": "gridProperties(rowCount,columnCount)",
+            }})
+            stats["sheets_resized"] += 1
+
+        # Se o número de colunas mudou, todas as linhas mudam e as colunas que sobraram são apagadas
+        width = max(cols, previous["cols"])
+        old_hashes = previous["row_hashes"] if previous["cols"] == cols else [None] * len(previous["row_hashes"])
+        runs = _changed_runs(old_hashes, row_hashes)
+        for start, end in runs:
+            values = [
+                (rows[i] if i < len(rows) else []) + [""] * (width - (cols if i < len(rows) else 0))
+                for i in range(start, end)
+            ]
+            cell_range = f"{rowcol_to_a1(start + 1, 1)}:{rowcol_to_a1(end, width)}"
+            quoted_name = sheet_name.replace("'", "''")
+            data.append({"range": f"'{quoted_name}'!{cell_range}", "values": values})
+            stats["cells"] += (end - start) * width
+        stats["ranges"] += len(runs)
+        new_snapshots[sheet_name] = (cols, row_hashes)
+        print(f"  - Aba '{sheet_name}': {sum(end - start for start, end in runs)} linhas alteradas.")
+
+    if resize_requests:
+        spreadsheet.batch_update({"requests": resize_requests})
+    if data:
+        spreadsheet.values_batch_update({"valueInputOption": "USER_ENTERED", "data": data})
+
+    for sheet_name, (cols, row_hashes) in new_snapshots.items():
+        snapshot.set(sheet_name, cols, row_hashes)
+    snapshot.save()
+    return stats
@@ -0,0 +1,119 @@
+"""
+Etapas da análise executadas pelo orquestrador (ver common/orchestration).
+
+Cada função recebe as saídas das etapas de que depende ('inputs', pelo nome da
+etapa) e os parâmetros que declara ('params'). As métricas são etapas
+separadas, executadas em paralelo sobre a mesma tabela de entrada, e
+retornam documentos no formato publicado pela MetricsStore. As anomalias e os
+eventos extremos dependem também da etapa 'climatology' (a normal climatológica).
+"""
+from typing import Any, Dict, List
+
+# 'main' vem antes de 'src': ele coloca a raiz do repositório (com 'common') no sys.path
+from main import _load_climatology, _open_input_store, _store_metrics, build_metric_documents
+from src.config import INPUT_SCHEMA, MONGO_COLLECTION_INPUT
+from src.database.metrics_store import metrics_scope
+from src.processing.data_materialize import ClimateMetricsEngine
+from src.processing.grouped_metrics import METRIC_TYPES, grouped_metric_documents, prepare_grouped_frame, series_keys
+from src.processing.rolling_metrics import ROLLING_METRIC_TYPES, compute_rolling_metrics
+
+DAYS_TO_PREDICT = 7
+
+
+def input_fingerprint(inputs: Dict[str, Any], params: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Impressão digital da coleção de entrada (total, último 'dia' e última gravação).
+
+    Executada sempre: 'load_input' depende dela, e não da saída da ingestão,
+    para ver também as gravações feitas fora do DAG (ex.: 'data/main.py --locations').
+    """
+    with _open_input_store() as source:
+        return {"collection": MONGO_COLLECTION_INPUT, **source.collection_fingerprint(MONGO_COLLECTION_INPUT)}
+
+
+def load_input(inputs: Dict[str, Any], params: Dict[str, Any]) -> Dict[str, Any]:
+    """Lê a tabela de entrada (já preparada para o agrupamento, se houver) e as colunas de agrupamento."""
+    group_keys = params["group_keys"] or []
+    schema = {**INPUT_SCHEMA, **{key: 'category' for key in group_keys}}
+    with _open_input_store() as source:
+        df = source.load_dataframe(MONGO_COLLECTION_INPUT, schema)
+    if df.empty:
+        raise ValueError(f"Nenhum dado encontrado na coleção de origem '{MONGO_COLLECTION_INPUT}'.")
+
+    if group_keys or params["period"]:
+        df, group_keys = prepare_grouped_frame(df, group_keys, params["period"])
+        return {"frame": df, "group_keys": group_keys}
+    return {"frame": df, "group_keys": None}
+
+
+def climatology(inputs: Dict[str, Any], params: Dict[str, Any]):
+    """Normal climatológica das séries da tabela de entrada (lida da coleção ou calculada e salva)."""
+    source = inputs["load_input"]
+    return _load_climatology(source["frame"], series_keys(source["group_keys"] or []))
+
+
+def _metric_documents(metric_type: str, inputs: Dict[str, Any], params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    source = inputs["load_input"]
+    if source["group_keys"]:
+        return grouped_metric_documents(source["frame"], source["group_keys"], metric_type, DAYS_TO_PREDICT,
+                                        max_workers=1, forecast_model=params["forecast_model"],
+                                        climatology=inputs.get("climatology"))
+    if metric_type in ROLLING_METRIC_TYPES:
+        return build_metric_documents(
+            compute_rolling_metrics(source["frame"], inputs.get("climatology"), metric_types=(metric_type,))
+        )
+
+    engine = ClimateMetricsEngine(source["frame"])
+    compute = {
+        "descriptive_statistics": engine.descriptive_stats,
+        "correlation_matrix": engine.correlation_matrix,
+        "weather_code_probability": engine.weather_code_probabilities,
+        "temperature_forecast": lambda: engine.forecast(DAYS_TO_PREDICT),
+    }[metric_type]
+    return build_metric_documents({metric_type: compute()})
+
+
+def descriptive_statistics(inputs: Dict[str, Any], params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return _metric_documents("descriptive_statistics", inputs, params)
+
+
+def correlation_matrix(inputs: Dict[str, Any], params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return _metric_documents("correlation_matrix", inputs, params)
+
+
+def weather_code_probability(inputs: Dict[str, Any], params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return _metric_documents("weather_code_probability", inputs, params)
+
+
+def temperature_forecast(inputs: Dict[str, Any], params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return _metric_documents("temperature_forecast", inputs, params)
+
+
+def rolling_statistics(inputs: Dict[str, Any], params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return _metric_documents("rolling_statistics", inputs, params)
+
+
+def temperature_anomalies(inputs: Dict[str, Any], params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return _metric_documents("temperature_anomalies", inputs, params)
+
+
+def extreme_events(inputs: Dict[str, Any], params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return _metric_documents("extreme_events", inputs, params)
+
+
+def publish_metrics(inputs: Dict[str, Any], params: Dict[str, Any]) -> Dict[str, Any]:
+    """Publica os documentos de todas as métricas como uma nova execução do escopo."""
+    documents = [document for metric_type in METRIC_TYPES for document in inputs[metric_type]]
+    days = inputs["load_input"]["frame"]["dia"]
+    scope = metrics_scope(params["group_keys"], params["period"])
+    _store_metrics(scope, documents, coverage=(days.min(), days.max()))
+    return {"scope": scope, "documents": len(documents)}
+
+
+def export(inputs: Dict[str, Any], params: Dict[str, Any]) -> Dict[str, Any]:
+    """Exporta as métricas publicadas do escopo para o Google Sheets."""
+    import export_to_gsheets
+
+    scope = inputs["publish_metrics"]["scope"]
+    export_to_gsheets.main(params["export_mode"], scope=scope)
+    return {"scope": scope, "mode": params["export_mode"]}
@@ -0,0 +1,29 @@
+"""
+Configuração dos testes do pacote 'pipelines'.
+
+Os testes importam os módulos como os scripts do pacote ('main', 'src.*'),
+com a pasta do pacote e a raiz do repositório no sys.path. Como 'data' também
+tem um pacote 'src', cada suíte roda em um processo próprio ('./climate test').
+"""
+import os
+import sys
+
+import pytest
+
+PACKAGE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+REPO_ROOT = os.path.dirname(PACKAGE_DIR)
+for path in (REPO_ROOT, PACKAGE_DIR):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+
+@pytest.fixture
+def mongo_client():
+    """Cliente MongoDB em memória (mongomock) compartilhado pelos handlers durante o teste."""
+    import mongomock
+    from common.database import set_client
+
+    client = mongomock.MongoClient()
+    set_client(client)
+    yield client
+    set_client(None)
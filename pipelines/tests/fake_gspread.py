@@ -0,0 +1,101 @@
+"""
+Planilha falsa com a parte da interface do gspread usada pela exportação.
+
+Guarda a grade de cada aba em memória e conta as chamadas à API
+('batch_update', 'values_batch_update', 'update_cells', 'clear', ...), para
+que os testes verifiquem o conteúdo final e quantas requisições foram feitas.
+"""
+from collections import Counter
+from typing import Any, Dict, List
+
+import gspread
+from gspread.utils import a1_to_rowcol
+
+
+class FakeWorksheet:
+    def __init__(self, spreadsheet: "FakeSpreadsheet", sheet_id: int, title: str, rows: int, cols: int):
+        self.spreadsheet = spreadsheet
+        self.id = sheet_id
+        self.title = title
+        self.row_count = int(rows)
+        self.col_count = int(cols)
+        self.cells: Dict[tuple, Any] = {}
+
+    def clear(self):
+        self.spreadsheet.calls["clear"] += 1
+        self.cells.clear()
+
+    def resize(self, rows: int | None = None, cols: int | None = None):
+        self.spreadsheet.calls["resize"] += 1
+        self._set_size(rows, cols)
+
+    def update_cells(self, cell_list, value_input_option: str | None = None):
+        self.spreadsheet.calls["update_cells"] += 1
+        for cell in cell_list:
+            self.write(cell.row, cell.col, cell.value)
+
+    def write(self, row: int, col: int, value: Any):
+        if row > self.row_count or col > self.col_count:
+            raise ValueError(f"Célula ({row}, {col}) fora da grade {self.row_count}x{self.col_count} de '{self.title}'.")
+        self.cells[(row, col)] = value
+
+    def _set_size(self, rows: int | None, cols: int | None):
+        self.row_count = int(rows) if rows is not None else self.row_count
+        self.col_count = int(cols) if cols is not None else self.col_count
+        self.cells = {(row, col): value for (row, col), value in self.cells.items()
+                      if row <= self.row_count and col <= self.col_count}
+
+    def get_all_values(self) -> List[List[str]]:
+        """Valores como texto, sem as linhas e colunas vazias do final (como no gspread)."""
+        filled = [(row, col) for (row, col), value in self.cells.items() if value not in ("", None)]
+        if not filled:
+            return []
+        rows, cols = max(row for row, _ in filled), max(col for _, col in filled)
+        return [[str(self.cells.get((row, col), "")) for col in range(1, cols + 1)] for row in range(1, rows + 1)]
+
+
+class FakeSpreadsheet:
+    def __init__(self):
+        self.calls: Counter = Counter()
+        # Intervalos recebidos em cada 'values_batch_update'
+        self.sent_ranges: List[List[str]] = []
+        self._worksheets: List[FakeWorksheet] = []
+
+    def worksheets(self) -> List[FakeWorksheet]:
+        self.calls["worksheets"] += 1
+        return list(self._worksheets)
+
+    def worksheet(self, title: str) -> FakeWorksheet:
+        self.calls["worksheet"] += 1
+        return self._find(title)
+
+    def _find(self, title: str) -> FakeWorksheet:
+        for worksheet in self._worksheets:
+            if worksheet.title == title:
+                return worksheet
+        raise gspread.exceptions.WorksheetNotFound(title)
+
+    def add_worksheet(self, title: str, rows: int, cols: int) -> FakeWorksheet:
+        self.calls["add_worksheet"] += 1
+        worksheet = FakeWorksheet(self, len(self._worksheets) + 1, title, rows, cols)
+        self._worksheets.append(worksheet)
+        return worksheet
+
+    def batch_update(self, body: Dict[str, Any]):
+        self.calls["batch_update"] += 1
+        for request in body["requests"]:
+            properties = request["updateSheetProperties"]["properties"]
+            worksheet = next(sheet for sheet in self._worksheets if sheet.id == properties["sheetId"])
+            grid = properties["gridProperties"]
+            worksheet._set_size(grid.get("rowCount"), grid.get("columnCount"))
+
+    def values_batch_update(self, body: Dict[str, Any]):
+        self.calls["values_batch_update"] += 1
+        self.sent_ranges.append([item["range"] for item in body["data"]])
+        for item in body["data"]:
+            sheet_name, cell_range = item["range"].rsplit("!", 1)
+            worksheet = self._find(sheet_name[1:-1].replace("''", "'"))
+            first_row, first_col = a1_to_rowcol(cell_range.split(":")[0])
+            for i, values in enumerate(item["values"]):
+                for j, value in enumerate(values):
+                    worksheet.write(first_row + i, first_col + j, value)
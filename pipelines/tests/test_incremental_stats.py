@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import make_input_frame
+from src.processing.incremental_stats import ClimateStatsState, QuantileSketch, verify_against_full
+
+
+@pytest.fixture(scope="module")
+def frame():
+    df = make_input_frame(days=1500, locations=3, seed=11)
+    # Valores contínuos: milhares de valores distintos por coluna
+    rng = np.random.default_rng(11)
+    for col in ["temperatura_max_c", "temperatura_min_c", "umidade_media_percent", "indice_uv_max"]:
+        df[col] = df[col] + rng.normal(0, 0.01, len(df))
+    return df.sort_values("dia", ignore_index=True)
+
+
+def _state_in_chunks(df, chunks: int = 5, max_bins: int | None = None) -> ClimateStatsState:
+    state = ClimateStatsState()
+    if max_bins is not None:
+        state.sketches = [QuantileSketch(max_bins=max_bins) for _ in state.sketches]
+    for chunk in np.array_split(np.arange(len(df)), chunks):
+        state.update(df.iloc[chunk])
+    return state
+
+
+def test_exact_state_matches_full_recompute(frame):
+    state = _state_in_chunks(frame)
+    assert all(sketch.exact for sketch in state.sketches)
+
+    differences = verify_against_full(state, frame)
+
+    assert "descriptive_statistics.quantile_rank" not in differences
+    assert max(differences.values()) < 1e-6
+
+
+def test_compressed_sketch_is_checked_against_its_error_bound(frame):
+    state = _state_in_chunks(frame, max_bins=500)
+    assert not any(sketch.exact for sketch in state.sketches)
+
+    differences = verify_against_full(state, frame)
+
+    bound = state.sketches[0].rank_error([0.5])[0]
+    assert 0 <= differences["descriptive_statistics.quantile_rank"] <= bound
+
+
+def test_compressed_quartile_outside_the_bound_fails(frame, monkeypatch):
+    state = _state_in_chunks(frame, max_bins=500)
+    original = ClimateStatsState.descriptive_stats
+
+    def shifted(self):
+        stats = original(self)
+        stats.loc[0, "50%"] = stats.loc[0, "75%"]
+        return stats
+
+    monkeypatch.setattr(ClimateStatsState, "descriptive_stats", shifted)
+    with pytest.raises(AssertionError, match="erro de posição"):
+        verify_against_full(state, frame)
+
+
+def test_rank_error_is_zero_for_exact_histograms():
+    sketch = QuantileSketch.from_values(np.array([1.0, 2.0, 2.0, 3.0]))
+    assert sketch.exact
+    assert (sketch.rank_error([0.25, 0.5, 0.75]) == 0).all()
@@ -0,0 +1,75 @@
+"""
+Equivalência numérica entre o ClimateMetricsEngine e as funções 'calculate_*'
+e 'forecast_temperature', que ele substitui no pipeline.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import make_input_frame
+from src.processing.data_materialize import (
+    ClimateMetricsEngine,
+    calculate_correlation_matrix,
+    calculate_descriptive_stats,
+    calculate_weather_code_probabilities,
+    forecast_temperature,
+)
+
+
+def assert_frames_equivalent(expected: pd.DataFrame, actual: pd.DataFrame, name: str,
+                             rtol: float = 1e-9, atol: float = 1e-9):
+    """Mesmas colunas e valores: numéricos dentro da tolerância, os demais comparados como texto."""
+    assert list(actual.columns) == list(expected.columns), name
+    assert len(actual) == len(expected), name
+    for col in expected.columns:
+        if pd.api.types.is_numeric_dtype(expected[col]):
+            np.testing.assert_allclose(actual[col].to_numpy(float), expected[col].to_numpy(float),
+                                       rtol=rtol, atol=atol, err_msg=f"{name}.{col}")
+        else:
+            assert actual[col].astype(str).tolist() == expected[col].astype(str).tolist(), f"{name}.{col}"
+
+
+@pytest.fixture(scope="module")
+def frame() -> pd.DataFrame:
+    return make_input_frame(days=730, locations=4, seed=7, missing_rate=0.05)
+
+
+@pytest.fixture(scope="module")
+def engine(frame) -> ClimateMetricsEngine:
+    return ClimateMetricsEngine(frame)
+
+
+def test_descriptive_stats_match_legacy(frame, engine):
+    assert_frames_equivalent(calculate_descriptive_stats(frame.copy()), engine.descriptive_stats(),
+                             "descriptive_statistics")
+
+
+@pytest.mark.parametrize("chunk_rows", [262_144, 500])
+def test_correlation_matrix_matches_legacy(frame, engine, chunk_rows):
+    assert_frames_equivalent(calculate_correlation_matrix(frame.copy()), engine.correlation_matrix(chunk_rows),
+                             "correlation_matrix")
+
+
+def test_weather_code_probabilities_match_legacy(frame, engine):
+    assert_frames_equivalent(calculate_weather_code_probabilities(frame.copy()), engine.weather_code_probabilities(),
+                             "weather_code_probability")
+
+
+def test_forecast_matches_legacy(frame, engine):
+    assert_frames_equivalent(forecast_temperature(frame.copy(), days_to_predict=7), engine.forecast(7),
+                             "temperature_forecast")
+
+
+def test_compute_all_matches_legacy_with_missing_codes():
+    df = make_input_frame(days=200, locations=2, seed=3)
+    df.loc[::11, "codigo_clima"] = pd.NA
+    legacy = {
+        "descriptive_statistics": calculate_descriptive_stats(df.copy()),
+        "correlation_matrix": calculate_correlation_matrix(df.copy()),
+        "weather_code_probability": calculate_weather_code_probabilities(df.copy()),
+        "temperature_forecast": forecast_temperature(df.copy(), days_to_predict=7),
+    }
+    metrics = ClimateMetricsEngine(df).compute_all(days_to_predict=7)
+    assert list(metrics) == list(legacy)
+    for metric_type, expected in legacy.items():
+        assert_frames_equivalent(expected, metrics[metric_type], metric_type)
@@ -0,0 +1,144 @@
+import pandas as pd
+import pytest
+
+import export_to_gsheets
+from src.services.sheets_sync import SheetsSnapshot, sync_dataframes
+from tests.fake_gspread import FakeSpreadsheet
+
+
+def _frame(rows: int = 5, offset: float = 0.0) -> pd.DataFrame:
+    return pd.DataFrame({
+        "localidade": [f"Cidade {i}" for i in range(rows)],
+        "media": [20.0 + i + offset for i in range(rows)],
+        "dias": list(range(rows)),
+    })
+
+
+def _as_text(df: pd.DataFrame) -> list:
+    return [[str(col) for col in df.columns]] + [[str(value) for value in row] for row in df.itertuples(index=False)]
+
+
+@pytest.fixture
+def snapshot_path(tmp_path):
+    return str(tmp_path / "sheets_snapshot.json")
+
+
+def test_first_export_creates_sheet_and_writes_everything(snapshot_path):
+    spreadsheet = FakeSpreadsheet()
+    df = _frame()
+
+    stats = sync_dataframes(spreadsheet, {"estatisticas": df}, SheetsSnapshot(snapshot_path))
+
+    assert stats["sheets_created"] == 1
+    assert stats["ranges"] == 1
+    assert spreadsheet.calls["values_batch_update"] == 1
+    assert spreadsheet._find("estatisticas").get_all_values() == _as_text(df)
+
+
+def test_unchanged_reexport_sends_no_ranges(snapshot_path):
+    spreadsheet = FakeSpreadsheet()
+    df = _frame()
+    sync_dataframes(spreadsheet, {"estatisticas": df}, SheetsSnapshot(snapshot_path))
+    calls = spreadsheet.calls.copy()
+
+    stats = sync_dataframes(spreadsheet, {"estatisticas": df.copy()}, SheetsSnapshot(snapshot_path))
+
+    assert stats["ranges"] == 0
+    assert stats["cells"] == 0
+    assert spreadsheet.calls["values_batch_update"] == calls["values_batch_update"]
+    assert spreadsheet.calls["batch_update"] == calls["batch_update"]
+
+
+def test_one_changed_row_sends_one_range(snapshot_path):
+    spreadsheet = FakeSpreadsheet()
+    df = _frame()
+    sync_dataframes(spreadsheet, {"estatisticas": df}, SheetsSnapshot(snapshot_path))
+
+    changed = df.copy()
+    changed.loc[2, "media"] = 99.5
+    stats = sync_dataframes(spreadsheet, {"estatisticas": changed}, SheetsSnapshot(snapshot_path))
+
+    assert stats["ranges"] == 1
+    # A linha de dados 2 é a linha 4 da planilha (cabeçalho na linha 1)
+    assert spreadsheet.sent_ranges[-1] == ["'estatisticas'!A4:C4"]
+    assert spreadsheet._find("estatisticas").get_all_values() == _as_text(changed)
+
+
+def test_removed_rows_are_cleared(snapshot_path):
+    spreadsheet = FakeSpreadsheet()
+    sync_dataframes(spreadsheet, {"estatisticas": _frame(5)}, SheetsSnapshot(snapshot_path))
+
+    shorter = _frame(3)
+    stats = sync_dataframes(spreadsheet, {"estatisticas": shorter}, SheetsSnapshot(snapshot_path))
+
+    assert stats["ranges"] == 1
+    assert spreadsheet._find("estatisticas").get_all_values() == _as_text(shorter)
+
+
+def test_growing_past_the_grid_resizes_in_one_batch(snapshot_path):
+    spreadsheet = FakeSpreadsheet()
+    sync_dataframes(spreadsheet, {"a": _frame(3), "b": _frame(3)}, SheetsSnapshot(snapshot_path))
+    assert spreadsheet._find("a").row_count == 100
+
+    bigger = {"a": _frame(150), "b": _frame(120)}
+    stats = sync_dataframes(spreadsheet, bigger, SheetsSnapshot(snapshot_path))
+
+    assert stats["sheets_resized"] == 2
+    assert spreadsheet.calls["batch_update"] == 1
+    assert spreadsheet.calls["values_batch_update"] == 2
+    for name, df in bigger.items():
+        assert spreadsheet._find(name).row_count == len(df) + 1
+        assert spreadsheet._find(name).get_all_values() == _as_text(df)
+
+
+def test_new_tab_is_added_next_to_existing_ones(snapshot_path):
+    spreadsheet = FakeSpreadsheet()
+    sync_dataframes(spreadsheet, {"a": _frame(3)}, SheetsSnapshot(snapshot_path))
+
+    stats = sync_dataframes(spreadsheet, {"a": _frame(3), "b": _frame(4)}, SheetsSnapshot(snapshot_path))
+
+    assert stats["sheets_created"] == 1
+    assert stats["ranges"] == 1
+    assert spreadsheet.sent_ranges[-1] == ["'b'!A1:C5"]
+    assert [worksheet.title for worksheet in spreadsheet._worksheets] == ["a", "b"]
+
+
+def test_column_change_rewrites_and_clears_extra_columns(snapshot_path):
+    spreadsheet = FakeSpreadsheet()
+    sync_dataframes(spreadsheet, {"a": _frame(3)}, SheetsSnapshot(snapshot_path))
+
+    narrower = _frame(3).drop(columns=["dias"])
+    sync_dataframes(spreadsheet, {"a": narrower}, SheetsSnapshot(snapshot_path))
+
+    assert spreadsheet._find("a").get_all_values() == _as_text(narrower)
+
+
+def test_force_rewrites_unchanged_rows(snapshot_path):
+    spreadsheet = FakeSpreadsheet()
+    df = _frame()
+    sync_dataframes(spreadsheet, {"a": df}, SheetsSnapshot(snapshot_path))
+
+    stats = sync_dataframes(spreadsheet, {"a": df}, SheetsSnapshot(snapshot_path), force=True)
+
+    assert stats["ranges"] == 1
+    assert stats["cells"] == 100 * 20
+
+
+def test_full_export_updates_the_snapshot(snapshot_path, monkeypatch):
+    """Uma exportação 'full' seguida de uma 'diff' com os mesmos dados não envia nada."""
+    monkeypatch.setattr(export_to_gsheets, "GSHEETS_SNAPSHOT_PATH", snapshot_path)
+    spreadsheet = FakeSpreadsheet()
+    sync_dataframes(spreadsheet, {"a": _frame(5)}, SheetsSnapshot(snapshot_path))
+
+    changed = _frame(4, offset=1.5)
+    export_to_gsheets.update_google_sheet({"a": changed}, spreadsheet=spreadsheet)
+    assert spreadsheet._find("a").get_all_values() == _as_text(changed)
+
+    stats = sync_dataframes(spreadsheet, {"a": changed}, SheetsSnapshot(snapshot_path))
+    assert stats["ranges"] == 0
+
+    # E a exportação seguinte volta a enviar só o que mudou em relação ao 'full'
+    changed.loc[0, "dias"] = 42
+    stats = sync_dataframes(spreadsheet, {"a": changed}, SheetsSnapshot(snapshot_path))
+    assert spreadsheet.sent_ranges[-1] == ["'a'!A2:C2"]
+    assert spreadsheet._find("a").get_all_values() == _as_text(changed)
@@ -0,0 +1,10 @@
+"""
+Configuração dos testes do código compartilhado ('common') e das ferramentas
+da raiz do repositório ('benchmarks'), com a raiz do repositório no sys.path.
+"""
+import os
+import sys
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
@@ -0,0 +1,16 @@
+"""O '--help' de cada linha de comando fica dentro do orçamento de imports (ver benchmarks/import_budget.py)."""
+import pytest
+
+from benchmarks.import_budget import COMMANDS, DEFAULT_BUDGET_MS, FORBIDDEN_MODULES, measure
+
+
+@pytest.mark.parametrize("name", list(COMMANDS))
+def test_help_stays_within_the_import_budget(name):
+    cwd, command = COMMANDS[name]
+    # Vale a menor de três execuções, como no script
+    runs = [measure(cwd, command) for _ in range(3)]
+
+    heavy = sorted(set(runs[0][1]).intersection(FORBIDDEN_MODULES))
+    assert heavy == [], f"'{name} --help' importa {', '.join(heavy)}"
+    elapsed = min(ms for ms, _ in runs)
+    assert elapsed <= DEFAULT_BUDGET_MS, f"'{name} --help': {elapsed:.1f} ms > {DEFAULT_BUDGET_MS} ms"
@@ -0,0 +1,75 @@
+import threading
+import time
+
+import pytest
+
+from common import instrumentation
+from common.instrumentation import count, stage
+
+
+def _records_for(name: str) -> list:
+    return [record for record in instrumentation.records() if record["stage"] == name]
+
+
+def test_with_block_records_rows_counters_and_parent():
+    with stage("test.parent"):
+        with stage("test.child", kind="unit") as st:
+            count("test.items", 3)
+            st.rows(5, rows_in=10)
+
+    record = _records_for("test.child")[-1]
+    assert record["parent"] == "test.parent"
+    assert record["labels"] == {"kind": "unit"}
+    assert record["rows_out"] == 5 and record["rows_in"] == 10
+    assert record["counters"] == {"test.items": 3}
+    assert record["status"] == "ok"
+
+
+def test_error_is_recorded_and_propagated():
+    with pytest.raises(RuntimeError):
+        with stage("test.error"):
+            raise RuntimeError("falhou")
+    assert _records_for("test.error")[-1]["error"] == "RuntimeError: falhou"
+
+
+def test_decorated_function_is_safe_across_threads():
+    """Chamadas concorrentes de uma função decorada não compartilham o estado da medição."""
+    barrier = threading.Barrier(4)
+
+    @stage("test.threaded")
+    def work(seconds: float):
+        barrier.wait()
+        time.sleep(seconds)
+
+    threads = [threading.Thread(target=work, args=(0.05 * (i + 1),)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    walls = sorted(record["wall_s"] for record in _records_for("test.threaded")[-4:])
+    assert len(walls) == 4
+    for i, wall in enumerate(walls):
+        assert 0.05 * (i + 1) <= wall < 0.05 * (i + 1) + 0.15
+
+
+def test_decorated_recursive_function_records_each_call():
+    @stage("test.recursive")
+    def depth(n: int) -> int:
+        return 0 if n == 0 else 1 + depth(n - 1)
+
+    assert depth(3) == 3
+    recursive = _records_for("test.recursive")[-4:]
+    assert [record["parent"] for record in recursive] == ["test.recursive"] * 3 + [None]
+
+
+def test_same_instance_reused_in_nested_with_blocks():
+    measured = stage("test.reused")
+    with measured:
+        time.sleep(0.02)
+        with measured:
+            pass
+
+    inner, outer = _records_for("test.reused")[-2:]
+    assert inner["parent"] == "test.reused" and outer["parent"] is None
+    assert outer["wall_s"] >= 0.02 > inner["wall_s"]
@@ -0,0 +1,50 @@
+import pandas as pd
+import pytest
+
+from common.storage.parquet_store import ParquetStore
+
+SCHEMA = {"localidade": "string", "dia": "datetime64[ns]", "temperatura_max_c": "float64"}
+
+
+@pytest.fixture
+def store(tmp_path):
+    with ParquetStore(str(tmp_path)) as store:
+        yield store
+
+
+def _frame(locations, days):
+    return pd.DataFrame({
+        "localidade": locations,
+        "dia": pd.to_datetime(days),
+        "temperatura_max_c": [float(i) for i in range(len(days))],
+    })
+
+
+def test_numeric_looking_locations_stay_strings(store):
+    df = _frame(["3550308", "0123"], ["2024-01-01", "2024-02-01"])
+    store.upsert_collection("entrada", df, ["localidade", "dia"])
+
+    loaded = store.load_dataframe("entrada", SCHEMA, {"localidade": "0123"})
+    assert loaded["localidade"].tolist() == ["0123"]
+
+    latest = store.get_latest_values_by("entrada", "dia", "localidade")
+    assert sorted(latest) == ["0123", "3550308"]
+
+
+def test_collection_without_locations_has_no_location_column(store):
+    df = _frame(["x", "x"], ["2023-12-31", "2024-01-01"]).drop(columns="localidade")
+    store.upsert_collection("sem_localidade", df, ["dia"])
+
+    loaded = store.load_dataframe("sem_localidade", {"dia": "datetime64[ns]", "temperatura_max_c": "float64"},
+                                  {"dia": {"$gte": pd.Timestamp("2024-01-01")}})
+    assert loaded["dia"].tolist() == [pd.Timestamp("2024-01-01")]
+    assert "localidade" not in store._dataset("sem_localidade").schema.names
+
+
+def test_upsert_replaces_repeated_keys(store):
+    store.upsert_collection("entrada", _frame(["a", "a"], ["2024-01-01", "2024-01-02"]), ["localidade", "dia"])
+    update = _frame(["a"], ["2024-01-02"]).assign(temperatura_max_c=9.5)
+    store.upsert_collection("entrada", update, ["localidade", "dia"])
+
+    loaded = store.load_dataframe("entrada", SCHEMA).sort_values("dia")
+    assert loaded["temperatura_max_c"].tolist() == [0.0, 9.5]